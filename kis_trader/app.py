@@ -3,21 +3,30 @@ from config import Config
 from db import db
 
 
-def create_app():
+def create_app(overrides: dict = None):
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.config.update(overrides or {})
     app.config["CURRENT_MODE"] = "paper"
 
     db.init_app(app)
+    import models  # noqa: F401  create_all 전에 테이블 정의 등록
     with app.app_context():
         db.create_all()
 
-    from routers import dashboard_bp, strategies_bp, orders_bp, auction_bp, settings_bp
+    import profiling
+    profiling.init_app(app)
+
+    from routers import (dashboard_bp, strategies_bp, orders_bp, auction_bp, settings_bp, backtest_bp,
+                         screener_bp, monitoring_bp)
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(strategies_bp)
     app.register_blueprint(orders_bp)
     app.register_blueprint(auction_bp)
     app.register_blueprint(settings_bp)
+    app.register_blueprint(backtest_bp)
+    app.register_blueprint(screener_bp)
+    app.register_blueprint(monitoring_bp)
 
     from scheduler import init_scheduler
     init_scheduler(app)
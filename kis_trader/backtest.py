@@ -0,0 +1,369 @@
+"""
+벡터화 백테스트
+- 저장된 일봉(daily_bars)을 (봉 × 종목) 배열로 한 번에 읽고, 전략 클래스의 signals() 로
+  전 구간 매수/매도 신호를 종목 전체에 대해 한 번에 계산 (ml 만 종목별 모델이라 종목마다)
+- 포지션은 봉 순서로 한 번 훑되 모든 (전략, 종목) 열을 배열 연산으로 함께 갱신
+  · 보유 중: 손절/익절 → 매도 신호, 미보유: 매수 신호 (runner._evaluate_and_order 와 같은 순서)
+  · 체결가는 신호 봉 종가 ± 슬리피지, 수수료는 매수·매도 양쪽, 매도 시 거래세
+  · 수량은 전략 buy_qty 고정, 현금 한도는 보지 않음
+- 결과: 합계·전략별 손익 곡선, 거래 목록, 총수익률/CAGR/MDD/승률
+한계
+- EMA 계열(RSI/MACD)은 조회 구간 첫 봉부터 누적 → 실전(최근 100봉 기준)과 초반 값이 조금 다를 수 있음
+- ml 은 지금 저장된 모델로 과거 전체를 예측하므로 학습 구간과 겹치는 기간 성과는 과대평가됨
+- 같은 종목을 여러 전략이 봐도 열마다 따로 보유 (실계좌는 종목 잔고 하나를 공유)
+- 10년 구간을 보려면 BAR_STORE_INITIAL_BARS 를 늘려 일봉을 먼저 적재해야 함
+
+실행: cd kis_trader && python backtest.py --type ma --stocks 005930,000660 \\
+          --params '{"short_period": 5, "long_period": 20}' --start 20160101
+"""
+import argparse
+import json
+import logging
+import time
+from datetime import datetime
+import numpy as np
+from flask import current_app
+from bar_store import load_matrix
+from market_calendar import is_trading_day
+from strategies.base import BaseStrategy
+from strategies.indicators import FIELDS, IndicatorSet
+from strategies.runner import STRATEGY_MAP
+
+logger = logging.getLogger(__name__)
+
+_REASONS = ("signal", "stop_loss", "take_profit")
+# ConditionStrategy 가 current 로 마지막 봉을 덮어쓰는 필드
+_CURRENT_FIELDS = ("price", "change_rate", "volume", "open", "high", "low")
+
+
+class BarMatrix:
+    """(봉 × 종목) 일봉 배열 + 지표 계산용으로 종목마다 봉을 위로 모은 사본
+
+    휴장·거래정지로 빠진 칸을 건너뛰어야 load_bars 와 같은 연속 봉이 되므로 지표는 모은 쪽에서 계산하고
+    신호만 원래 날짜 자리로 되돌린다. 같은 인스턴스로 여러 전략·파라미터를 돌리면 지표 메모를 공유한다.
+    """
+
+    def __init__(self, dates, codes: list, close, mask, order, packed: dict):
+        self.dates = dates
+        self.codes = list(codes)
+        self.close = close
+        self.mask = mask
+        self.order = order
+        self.packed = packed
+        self.lengths = mask.sum(axis=0)
+        self.ind = IndicatorSet.from_arrays(None, **packed)
+
+    @classmethod
+    def from_fields(cls, dates, codes: list, fields: dict, mask) -> "BarMatrix":
+        order = np.argsort(~mask, axis=0, kind="stable")
+        packed = {f: np.take_along_axis(v, order, axis=0) for f, v in fields.items()}
+        return cls(dates, codes, fields["close"], mask, order, packed)
+
+    def last_dates(self) -> np.ndarray:
+        """종목별 마지막 저장 봉 날짜 (봉이 없으면 "")"""
+        out = np.full(len(self.codes), "", dtype="<U8")
+        stored = self.lengths > 0
+        if len(self.dates):
+            rows = self.order[np.maximum(self.lengths - 1, 0), np.arange(len(self.codes))]
+            out[stored] = self.dates[rows[stored]]
+        return out
+
+    def with_quotes(self, cols, quotes: dict, now: datetime = None) -> tuple:
+        """cols 열만 골라 현재가를 당일 봉으로 붙인 지표 입력 → (IndicatorSet, current, last)
+
+        quotes 는 cols 순서의 필드별 배열(price·open·high·low·volume·change_rate). 당일 봉을 붙이는 규칙은
+        load_bars 와 같고(개장일 장중이고 오늘 봉이 아직 없을 때, 저장 봉이 없으면 항상), last 는 종목별 마지막 봉 행,
+        current 는 ConditionStrategy 처럼 마지막 봉을 현재가로 덮어쓸 필드다.
+        """
+        now = now or datetime.now()
+        today = now.strftime("%Y%m%d")
+        session = now.hour >= 9 and is_trading_day(now.date())
+        lengths = self.lengths[cols]
+        append = (lengths == 0) | (session & (self.last_dates()[cols] < today))
+        last = lengths - 1 + append
+        rows, at = last[append], np.flatnonzero(append)
+
+        packed = {}
+        for f in FIELDS:
+            values = np.zeros((len(self.dates) + 1, len(lengths)), dtype=np.int64)
+            values[:-1] = self.packed[f][:, cols]
+            packed[f] = values
+        price = np.asarray(quotes["price"]).astype(np.int64)
+        for f in ("open", "high", "low"):
+            bar = np.asarray(quotes[f]).astype(np.int64)
+            packed[f][rows, at] = np.where(bar > 0, bar, price)[append]
+        packed["close"][rows, at] = price[append]
+        packed["volume"][rows, at] = np.asarray(quotes["volume"]).astype(np.int64)[append]
+        current = {f: np.asarray(quotes[f], dtype=np.float64) for f in _CURRENT_FIELDS}
+        return IndicatorSet.from_arrays(None, **packed), current, last
+
+    def trim_memo(self, max_items: int) -> None:
+        """계산해 둔 지표가 max_items 개를 넘으면 비움 (파라미터 탐색에서 메모리 상한)"""
+        if len(self.ind._memo) > max_items:
+            self.ind = IndicatorSet.from_arrays(None, **self.packed)
+
+    def signals(self, strategy_type: str, params: dict) -> tuple:
+        """전략 하나를 종목 전체에 적용 → (buy, sell) bool[T, S]"""
+        cls = STRATEGY_MAP[strategy_type]
+        if strategy_type == "ml":  # 종목별 모델 → 열마다 1차원으로
+            packed_buy = np.zeros(self.mask.shape, dtype=bool)
+            packed_sell = np.zeros(self.mask.shape, dtype=bool)
+            for j, code in enumerate(self.codes):
+                n = self.lengths[j]
+                if n:
+                    ind = IndicatorSet.from_arrays(None, **{f: v[:n, j] for f, v in self.packed.items()})
+                    packed_buy[:n, j], packed_sell[:n, j] = cls(code, params).signals(ind)
+        else:
+            packed_buy, packed_sell = cls("", params).signals(self.ind)
+        buy = np.zeros(self.mask.shape, dtype=bool)
+        sell = np.zeros(self.mask.shape, dtype=bool)
+        np.put_along_axis(buy, self.order, packed_buy, axis=0)
+        np.put_along_axis(sell, self.order, packed_sell, axis=0)
+        return buy & self.mask, sell & self.mask
+
+
+def _max_drawdown(equity: np.ndarray) -> float:
+    if not len(equity):
+        return 0.0
+    peak = np.maximum.accumulate(equity)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd = np.where(peak > 0, equity / peak - 1, 0.0)
+    return float(dd.min())
+
+
+def _sharpe(equity: np.ndarray) -> float:
+    """일간 손익 곡선 수익률의 연율화 샤프 (무위험 수익률 0)"""
+    if len(equity) < 3:
+        return 0.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(equity) / equity[:-1]
+    returns = returns[np.isfinite(returns)]
+    std = returns.std()
+    return float(returns.mean() / std * np.sqrt(252)) if std > 0 else 0.0
+
+
+def _summary(dates: np.ndarray, equity: np.ndarray, initial_cash: float, pnl: np.ndarray) -> dict:
+    final = float(equity[-1]) if len(equity) else initial_cash
+    cagr = 0.0
+    if len(dates) > 1 and final > 0:
+        years = (datetime.strptime(dates[-1], "%Y%m%d")
+                 - datetime.strptime(dates[0], "%Y%m%d")).days / 365.25
+        if years > 0:
+            cagr = (final / initial_cash) ** (1 / years) - 1
+    return {
+        "final_equity": round(final),
+        "total_return_pct": round((final / initial_cash - 1) * 100, 2),
+        "cagr_pct": round(cagr * 100, 2),
+        "mdd_pct": round(_max_drawdown(equity) * 100, 2),
+        "sharpe": round(_sharpe(equity), 3),
+        "trades": int(len(pnl)),
+        "win_rate_pct": round(float((pnl > 0).mean()) * 100, 2) if len(pnl) else 0.0,
+    }
+
+
+def costs(initial_cash: float = None, commission: float = None, slippage: float = None,
+          sell_tax: float = None) -> dict:
+    """지정하지 않은 비용 항목은 BACKTEST_* 설정값 (앱 컨텍스트 필요)"""
+    cfg = current_app.config
+    pick = lambda value, key, default: float(value if value is not None else cfg.get(key, default))  # noqa: E731
+    return {
+        "initial_cash": pick(initial_cash, "BACKTEST_INITIAL_CASH", 10_000_000),
+        "commission": pick(commission, "BACKTEST_COMMISSION", 0.00015),
+        "slippage": pick(slippage, "BACKTEST_SLIPPAGE", 0.0005),
+        "sell_tax": pick(sell_tax, "BACKTEST_SELL_TAX", 0.002),
+    }
+
+
+def check_specs(specs: list) -> None:
+    for spec in specs:
+        if spec.get("type") not in STRATEGY_MAP:
+            raise ValueError(f"unknown strategy type: {spec.get('type')}")
+        if STRATEGY_MAP[spec["type"]].signals is BaseStrategy.signals:
+            raise ValueError(f"strategy type {spec['type']} cannot be backtested")
+        if not spec.get("stocks"):
+            raise ValueError("stocks is required")
+
+
+def simulate(bars: BarMatrix, specs: list, initial_cash: float, commission: float,
+             slippage: float, sell_tax: float, detail: bool = True, max_trades: int = None) -> dict:
+    """specs 를 bars 위에서 한 번에 실행 → 합계·전략별 요약 (detail 이면 종목별 손익·손익 곡선·거래 목록까지)
+
+    DB·앱 컨텍스트 없이 배열만 쓰므로 optimizer 의 작업 프로세스에서도 그대로 부른다.
+    """
+    t_start = time.perf_counter()
+    dates, codes, T = bars.dates, bars.codes, len(bars.dates)
+    index = {code: j for j, code in enumerate(codes)}
+
+    # 열 = (전략, 종목) 쌍
+    col_spec, col_stock, buys, sells, qty, stop, take = [], [], [], [], [], [], []
+    for k, spec in enumerate(specs):
+        params = spec.get("params") or {}
+        cols = [index[code] for code in spec["stocks"]]
+        buy, sell = bars.signals(spec["type"], params)
+        engine = STRATEGY_MAP[spec["type"]]("", params)
+        buys.append(buy[:, cols])
+        sells.append(sell[:, cols])
+        col_spec += [k] * len(cols)
+        col_stock += cols
+        qty += [engine.get_quantity()] * len(cols)
+        stop += [engine.stop_loss_pct] * len(cols)
+        take += [engine.take_profit_pct] * len(cols)
+    buy, sell = np.hstack(buys), np.hstack(sells)
+    col_spec, col_stock = np.array(col_spec), np.array(col_stock)
+    qty, stop, take = np.array(qty, dtype=np.int64), np.array(stop), np.array(take)
+    valid = bars.mask[:, col_stock]
+    close = bars.close[:, col_stock].astype(np.float64)
+    t_signals = time.perf_counter()
+
+    # 포지션 진행: 봉마다 전 열을 함께 (열 수가 많아도 봉 수만큼만 반복)
+    C = buy.shape[1]
+    held = np.zeros(C, dtype=np.int64)
+    entry = np.zeros(C)
+    cost = np.zeros(C)
+    position = np.zeros((T, C), dtype=np.int64)
+    cashflow = np.zeros((T, C))
+    trade_parts = []
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for t in range(T):
+            px = close[t]
+            holding = (held > 0) & valid[t]
+            change = (px - entry) / entry * 100
+            # 0: 매도 신호, 1: 손절, 2: 익절 (runner 처럼 손절/익절을 먼저 봄)
+            reason = np.where(holding & (change <= stop), 1, np.where(holding & (change >= take), 2, 0))
+            exits = (reason > 0) | (holding & sell[t])
+            entries = (held == 0) & valid[t] & buy[t]
+            if exits.any():
+                j = np.flatnonzero(exits)
+                fill = px[j] * (1 - slippage)
+                proceeds = fill * held[j] * (1 - commission - sell_tax)
+                cashflow[t, j] += proceeds
+                trade_parts.append((t, j, 1, fill, held[j], proceeds - cost[j], reason[j]))
+                held[j] = 0
+            if entries.any():
+                j = np.flatnonzero(entries)
+                fill = px[j] * (1 + slippage)
+                cost[j] = fill * qty[j] * (1 + commission)
+                cashflow[t, j] -= cost[j]
+                entry[j] = fill
+                held[j] = qty[j]
+                trade_parts.append((t, j, 0, fill, qty[j], np.zeros(len(j)), np.zeros(len(j), np.int64)))
+            position[t] = held
+
+    # 손익 곡선: 누적 현금 흐름 + 보유 수량 × 마지막 종가 (거래 없는 날은 직전 종가 유지)
+    last_row = np.where(valid, np.arange(T)[:, None], 0)
+    np.maximum.accumulate(last_row, axis=0, out=last_row)
+    marked = np.take_along_axis(close, last_row, axis=0)
+    col_value = np.cumsum(cashflow, axis=0) + position * marked
+    equity = initial_cash + col_value.sum(axis=1)
+
+    if trade_parts:
+        t_i, j_i, side, price, n, pnl, why = (
+            np.concatenate([np.broadcast_to(part[i], len(part[1])) for part in trade_parts])
+            for i in range(7))
+    else:
+        t_i = j_i = side = n = np.zeros(0, dtype=np.int64)
+        price = pnl = np.zeros(0)
+        why = np.zeros(0, dtype=np.int64)
+    closed = side == 1
+    result = {
+        "start": str(dates[0]) if T else None, "end": str(dates[-1]) if T else None, "bars": T,
+        "stocks": len(codes), "initial_cash": initial_cash,
+        "commission": commission, "slippage": slippage, "sell_tax": sell_tax,
+        **_summary(dates, equity, initial_cash, pnl[closed]),
+        "open_positions": int((position[-1] > 0).sum()) if T else 0,
+        "elapsed_ms": {"signal_ms": round((t_signals - t_start) * 1000, 1),
+                       "simulate_ms": round((time.perf_counter() - t_signals) * 1000, 1)},
+    }
+    strategies = []
+    for k, spec in enumerate(specs):
+        in_spec = col_spec == k
+        summary = {
+            "type": spec["type"], "params": spec.get("params") or {},
+            **_summary(dates, initial_cash + col_value[:, in_spec].sum(axis=1), initial_cash,
+                       pnl[closed & in_spec[j_i]]),
+        }
+        if detail:
+            summary["stocks"] = list(spec["stocks"])
+            summary["pnl_by_stock"] = {codes[col_stock[j]]: round(float(col_value[-1, j]) if T else 0.0)
+                                       for j in np.flatnonzero(in_spec)}
+        strategies.append(summary)
+    result["strategies"] = strategies
+    if not detail:
+        return result
+
+    trades = [{
+        "date": str(dates[t]), "strategy": int(col_spec[j]), "stock_code": codes[col_stock[j]],
+        "side": "sell" if s else "buy", "price": round(float(p), 2), "quantity": int(q),
+        **({"pnl": round(float(g)), "reason": _REASONS[r]} if s else {}),
+    } for t, j, s, p, q, g, r in zip(t_i, j_i, side, price, n, pnl, why)]
+    trades.sort(key=lambda tr: tr["date"])
+    if max_trades is not None:
+        trades = trades[-max_trades:] if max_trades > 0 else []
+    return {
+        **result,
+        "equity": [{"date": str(d), "equity": round(float(e))} for d, e in zip(dates, equity)],
+        "trade_list": trades,
+    }
+
+
+def run_backtest(specs: list, start: str = None, end: str = None, initial_cash: float = None,
+                 commission: float = None, slippage: float = None, sell_tax: float = None,
+                 max_trades: int = None) -> dict:
+    """specs: [{"type", "params", "stocks"}] → 손익 곡선·거래 목록·요약 (앱 컨텍스트 필요)
+
+    max_trades 를 주면 거래 목록은 최근 것부터 그 수만 돌려준다 (요약 통계는 전체 기준).
+    """
+    check_specs(specs)
+    cost_args = costs(initial_cash, commission, slippage, sell_tax)
+    t0 = time.perf_counter()
+    codes = sorted({code for spec in specs for code in spec["stocks"]})
+    dates, fields, mask = load_matrix(codes, start, end)
+    bars = BarMatrix.from_fields(dates, codes, fields, mask)
+    t1 = time.perf_counter()
+    result = simulate(bars, specs, **cost_args, max_trades=max_trades)
+    elapsed = result["elapsed_ms"]
+    elapsed["load_ms"] = round((t1 - t0) * 1000, 1)
+    elapsed["total_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    logger.info(f"Backtest {len(specs)} strategies × {len(codes)} stocks, {result['bars']} bars: "
+                f"load {elapsed['load_ms']:.0f}ms, signals {elapsed['signal_ms']:.0f}ms, "
+                f"simulate {elapsed['simulate_ms']:.0f}ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="저장된 일봉으로 전략 백테스트")
+    parser.add_argument("--type", required=True, choices=sorted(STRATEGY_MAP))
+    parser.add_argument("--stocks", required=True, help="종목코드, 쉼표 구분")
+    parser.add_argument("--params", default="{}", help="전략 params JSON")
+    parser.add_argument("--start", help="YYYYMMDD")
+    parser.add_argument("--end", help="YYYYMMDD")
+    parser.add_argument("--cash", type=float)
+    parser.add_argument("--commission", type=float)
+    parser.add_argument("--slippage", type=float)
+    parser.add_argument("--sell-tax", type=float)
+    parser.add_argument("--sync", choices=("paper", "real"), help="실행 전 일봉 저장소를 이 모드로 동기화")
+    parser.add_argument("--trades", type=int, default=20, help="출력할 최근 거래 수")
+    parser.add_argument("--equity", action="store_true", help="손익 곡선 전체 출력")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from app import create_app
+    app = create_app({"TESTING": True})  # 스케줄러 미기동
+    codes = [c.strip() for c in args.stocks.split(",") if c.strip()]
+    with app.app_context():
+        if args.sync:
+            from bar_store import sync_bars
+            for code in codes:
+                sync_bars(code, args.sync)
+        result = run_backtest(
+            [{"type": args.type, "params": json.loads(args.params), "stocks": codes}],
+            start=args.start, end=args.end, initial_cash=args.cash, commission=args.commission,
+            slippage=args.slippage, sell_tax=args.sell_tax, max_trades=args.trades,
+        )
+    if not args.equity:
+        result.pop("equity")
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
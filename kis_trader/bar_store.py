@@ -0,0 +1,162 @@
+"""
+일봉 로컬 저장소 (SQLite daily_bars)
+- 마지막 저장 봉 이후 날짜만 KIS 에서 받아 추가 (하루 한 번 + 장 마감 후 한 번)
+- 완결된 봉만 저장하고, 장중 당일 봉은 읽을 때 현재가로 만들어 붙임 (KRX 개장일만, market_calendar)
+- 전략·ML 재학습은 load_bars() 로 네트워크 없이 필요한 행 수만 읽음
+- 백테스트·스크리너는 load_matrix() 로 여러 종목을 (봉 × 종목) 배열로 한 번에 읽음
+"""
+import logging
+from datetime import datetime, timedelta
+import numpy as np
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+from db import db
+from market_calendar import is_trading_day
+from models import DailyBar, BarSyncState
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = ("date", "open", "high", "low", "close", "volume")
+_FIELDS = _COLUMNS[1:]
+
+
+def _completed_through(now: datetime) -> str:
+    """저장 가능한 마지막 봉 날짜: 장 마감 집계 후면 오늘, 아니면 어제"""
+    close_hhmm = int(current_app.config.get("BAR_STORE_CLOSE_HHMM", 1540))
+    day = now.date() if now.hour * 100 + now.minute >= close_hhmm else now.date() - timedelta(days=1)
+    return day.strftime("%Y%m%d")
+
+
+def _insert(stock_code: str, rows: list) -> None:
+    values = [{"stock_code": stock_code, **{c: r[c] for c in _COLUMNS}} for r in rows]
+    for i in range(0, len(values), 500):  # SQLite 바인딩 변수 한도 내로 나눠 삽입
+        db.session.execute(insert(DailyBar).values(values[i:i + 500]).on_conflict_do_nothing())
+
+
+def sync_bars(stock_code: str, mode: str = "paper") -> int:
+    """저장소를 최신 완결 봉까지 채움 → 새로 저장한 봉 수
+
+    이미 오늘 기준으로 확인했으면 네트워크 호출 없이 반환한다. 마지막 저장 봉과
+    새로 받은 같은 날짜 봉의 종가가 다르면(수정주가 반영) 해당 종목을 전부 다시 받는다.
+    겹치는 봉을 받지 못했으면(빈 응답·거래정지) 이력을 그대로 두고 확인 시점도 올리지 않아
+    다음 실행에서 다시 시도한다.
+
+    여러 스레드·워커 프로세스가 같은 종목을 동시에 채워도 안전하다: 봉은 (종목, 날짜) 충돌 시 무시하고,
+    확인 기록은 upsert 라 먼저 끝난 쪽과 부딪히지 않는다 (재적재 삭제·삽입은 한 쓰기 트랜잭션).
+    """
+    from kis_api import get_daily_ohlcv
+
+    through = _completed_through(datetime.now())
+    state = db.session.get(BarSyncState, stock_code)
+    if state and state.synced_through >= through:
+        return 0
+
+    initial = int(current_app.config.get("BAR_STORE_INITIAL_BARS", 100))
+    last = db.session.execute(
+        select(func.max(DailyBar.date)).where(DailyBar.stock_code == stock_code)
+    ).scalar()
+
+    rows, resync = [], False
+    if last:
+        fetched = [r for r in get_daily_ohlcv(stock_code, mode, count=None, start_date=last)
+                   if r["date"] <= through]
+        stored_last = db.session.get(DailyBar, (stock_code, last))
+        overlap = next((r for r in fetched if r["date"] == last), None)
+        if overlap is None:
+            logger.info(f"Bar store {stock_code}: overlap bar {last} not returned, retrying next run")
+            return 0
+        if overlap["close"] == stored_last.close:
+            rows = [r for r in fetched if r["date"] > last]
+        else:
+            logger.info(f"Bar store resync {stock_code}: adjusted prices")
+            resync, last = True, None
+    if not last:
+        rows = [r for r in get_daily_ohlcv(stock_code, mode, count=initial)
+                if r["date"] <= through]
+        if not rows:
+            return 0  # 빈 응답 — 이력은 그대로, 다음 실행에서 다시 시도
+        if resync:
+            DailyBar.query.filter_by(stock_code=stock_code).delete()
+
+    _insert(stock_code, rows)
+    synced_at = datetime.utcnow()
+    db.session.execute(
+        insert(BarSyncState).values(stock_code=stock_code, synced_through=through, synced_at=synced_at)
+        .on_conflict_do_update(index_elements=["stock_code"],
+                               set_={"synced_through": through, "synced_at": synced_at})
+    )
+    db.session.commit()
+    return len(rows)
+
+
+def synced_codes(codes: list) -> set:
+    """codes 중 한 번이라도 적재가 끝난(동기화 기록이 있는) 종목"""
+    found = set()
+    for i in range(0, len(codes), 500):
+        found.update(db.session.execute(
+            select(BarSyncState.stock_code).where(BarSyncState.stock_code.in_(codes[i:i + 500]))
+        ).scalars())
+    return found
+
+
+def load_bars(stock_code: str, count: int = 100, current: dict = None) -> list:
+    """저장된 일봉 최근 count 개 (get_daily_ohlcv 와 같은 형식, 최신순)
+
+    current(현재가 dict)를 주면 개장일 장중에 아직 저장되지 않은 당일 봉을 현재가로 만들어 맨 앞에 붙인다.
+    """
+    result = db.session.execute(
+        select(DailyBar.date, DailyBar.open, DailyBar.high, DailyBar.low,
+               DailyBar.close, DailyBar.volume)
+        .where(DailyBar.stock_code == stock_code)
+        .order_by(DailyBar.date.desc())
+        .limit(count)
+    ).all()
+    bars = [dict(zip(_COLUMNS, row)) for row in result]
+
+    if current and current.get("price"):
+        now = datetime.now()
+        today = now.strftime("%Y%m%d")
+        if now.hour >= 9 and (not bars or bars[0]["date"] < today) and is_trading_day(now.date()):
+            bars.insert(0, {
+                "date": today,
+                "open": current.get("open") or current["price"],
+                "high": current.get("high") or current["price"],
+                "low": current.get("low") or current["price"],
+                "close": current["price"],
+                "volume": current.get("volume", 0),
+            })
+            bars = bars[:count]
+    return bars
+
+
+def load_matrix(codes: list, start: str = None, end: str = None) -> tuple:
+    """저장된 일봉 → (dates[T], {필드: int64[T, S]}, mask[T, S]) — 봉이 없는 칸은 0, mask False
+
+    수백만 행이라 ORM 행 객체를 거치지 않고 DB-API 커서로 종목별 정수 튜플을 바로 배열로 만든다.
+    """
+    where, bounds = "", []
+    if start:
+        where, bounds = where + " AND date >= ?", bounds + [start]
+    if end:
+        where, bounds = where + " AND date <= ?", bounds + [end]
+    sql = (f"SELECT CAST(date AS INTEGER), {', '.join(_FIELDS)} FROM {DailyBar.__tablename__} "
+           f"WHERE stock_code = ?{where}")
+    cursor = db.session.connection().connection.cursor()
+    try:
+        per_stock = []
+        for code in codes:
+            cursor.execute(sql, [code] + bounds)
+            per_stock.append(np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 1 + len(_FIELDS)))
+    finally:
+        cursor.close()
+
+    dates = np.unique(np.concatenate([a[:, 0] for a in per_stock])) if codes else np.zeros(0, np.int64)
+    shape = (len(dates), len(codes))
+    values = np.zeros((len(_FIELDS),) + shape, dtype=np.int64)
+    mask = np.zeros(shape, dtype=bool)
+    for j, a in enumerate(per_stock):
+        rows = np.searchsorted(dates, a[:, 0])
+        values[:, rows, j] = a[:, 1:].T
+        mask[rows, j] = True
+    return dates.astype("<U8"), dict(zip(_FIELDS, values)), mask
@@ -0,0 +1,134 @@
+"""
+HTTP 커넥션 풀 벤치마크
+로컬 HTTPS 스탠드인(자체 서명 인증서)에 현재가 조회와 같은 형태의 요청을 보내
+호출마다 새 연결(requests.get) vs kis_http 풀링 세션의 지연시간을 비교한다.
+
+실행: cd kis_trader && python benchmarks/bench_http_pool.py --n 300
+"""
+import argparse
+import datetime
+import json
+import os
+import ssl
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kis_http import build_session  # noqa: E402
+
+BODY = json.dumps({"rt_cd": "0", "output": {
+    "stck_prpr": "70000", "prdy_ctrt": "1.23", "acml_vol": "1000",
+    "stck_hgpr": "70500", "stck_lwpr": "69000", "stck_oprc": "69500",
+}}).encode()
+
+
+def _self_signed_cert(tmpdir: str) -> tuple:
+    """127.0.0.1 용 자체 서명 인증서 생성 → (cert_path, key_path)"""
+    import ipaddress
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([
+            x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+        ]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(tmpdir, "cert.pem")
+    key_path = os.path.join(tmpdir, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        ))
+    return cert_path, key_path
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive 허용
+    disable_nagle_algorithm = True  # 헤더/본문 분할 전송 시 delayed-ACK 40ms 지연 방지
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server(cert_path: str, key_path: str) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert_path, key_path)
+    server.socket = ctx.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _measure(fn, n: int) -> list:
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def _report(label: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<22} mean {statistics.mean(samples):7.2f} ms   "
+          f"p50 {statistics.median(samples):7.2f} ms   p95 {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=200, help="방식별 요청 수")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cert_path, key_path = _self_signed_cert(tmpdir)
+        server = _start_server(cert_path, key_path)
+        url = f"https://127.0.0.1:{server.server_address[1]}/uapi/domestic-stock/v1/quotations/inquire-price"
+        params = {"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": "005930"}
+
+        session = build_session(pool_size=4)
+
+        unpooled = _measure(lambda: requests.get(url, params=params, verify=cert_path, timeout=5), args.n)
+        pooled = _measure(lambda: session.get(url, params=params, verify=cert_path, timeout=5), args.n)
+
+        print(f"로컬 HTTPS 스탠드인, 방식별 {args.n}회")
+        _report("requests.get (매번 연결)", unpooled)
+        _report("kis_http 풀 세션", pooled)
+        print(f"평균 지연 개선: x{statistics.mean(unpooled) / statistics.mean(pooled):.1f}")
+
+        session.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
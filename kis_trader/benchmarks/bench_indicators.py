@@ -0,0 +1,140 @@
+"""
+지표 계산 벤치마크
+종목 S 개 × 종목당 전략 K 개(ma / rsi_macd / ml 특성)가 한 사이클에 should_buy·should_sell 을
+한 번씩 부르는 상황에서, 기존 pandas/ta 경로(전략·호출마다 DataFrame 재구성)와
+strategies.indicators 엔진(종목별 한 번 계산 후 공유)의 시간을 비교하고 결과가 같은지 확인한다.
+
+실행: cd kis_trader && python benchmarks/bench_indicators.py --stocks 100 --per-stock 3 --bars 100
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import ta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from strategies import indicators  # noqa: E402
+from strategies.ml_strategy import _build_features  # noqa: E402
+
+
+def make_bars(n: int, seed: int) -> list:
+    rng = random.Random(seed)
+    price = rng.randint(100, 5000) * 10
+    bars = []
+    for i in range(n):
+        price = max(100, price + rng.randint(-30, 30) * 10)
+        bars.append({"date": f"{20000101 + i}", "open": price, "high": price + 50,
+                     "low": price - 50, "close": price, "volume": rng.randint(1000, 10 ** 7)})
+    bars.reverse()  # load_bars 와 같은 최신순
+    return bars
+
+
+def pandas_ma(ohlcv):
+    df = pd.DataFrame(ohlcv).sort_values("date")
+    return df["close"].rolling(5).mean().values, df["close"].rolling(20).mean().values
+
+
+def pandas_rsi_macd(ohlcv):
+    df = pd.DataFrame(ohlcv).sort_values("date")
+    rsi = ta.momentum.RSIIndicator(df["close"], 14).rsi()
+    macd = ta.trend.MACD(df["close"], window_slow=26, window_fast=12, window_sign=9)
+    return rsi.values[-1], macd.macd().values[-1], macd.macd_signal().values[-1]
+
+
+def pandas_features(ohlcv):
+    df = pd.DataFrame(ohlcv).sort_values("date")
+    df["ma5"] = df["close"].rolling(5).mean()
+    df["ma20"] = df["close"].rolling(20).mean()
+    df["ma60"] = df["close"].rolling(60).mean()
+    df["rsi"] = ta.momentum.RSIIndicator(df["close"], 14).rsi()
+    df["macd_diff"] = ta.trend.MACD(df["close"]).macd_diff()
+    df["vol_ratio"] = df["volume"] / df["volume"].rolling(20).mean()
+    df["ret1"] = df["close"].pct_change(1)
+    df["ret5"] = df["close"].pct_change(5)
+    return df[["ma5", "ma20", "ma60", "rsi", "macd_diff", "vol_ratio", "ret1", "ret5"]].dropna().values
+
+
+def engine_ma(code, ohlcv):
+    ind = indicators.for_bars(code, ohlcv)
+    return ind.sma(5), ind.sma(20)
+
+
+def engine_rsi_macd(code, ohlcv):
+    ind = indicators.for_bars(code, ohlcv)
+    macd, signal, _ = ind.macd(12, 26, 9)
+    return ind.rsi(14)[-1], macd[-1], signal[-1]
+
+
+def engine_features(code, ohlcv):
+    X = _build_features(indicators.for_bars(code, ohlcv))
+    return X[~np.isnan(X).any(axis=1)]
+
+
+def cycle(universe: dict, per_stock: int, ma, rsi_macd, features, with_code: bool) -> list:
+    out = []
+    kinds = (ma, rsi_macd, features)
+    for code, bars in universe.items():
+        for k in range(per_stock):
+            fn = kinds[k % len(kinds)]
+            for _ in range(2):  # should_buy + should_sell
+                out.append(fn(code, bars) if with_code else fn(bars))
+    return out
+
+
+def same(a, b) -> bool:
+    if isinstance(a, tuple) and not isinstance(a[0], np.ndarray):
+        return np.array_equal(np.array(a, dtype=float), np.array(b, dtype=float), equal_nan=True)
+    if isinstance(a, tuple):
+        return all(np.array_equal(x, y, equal_nan=True) for x, y in zip(a, b))
+    return np.array_equal(a, b, equal_nan=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pandas/ta vs NumPy 지표 엔진")
+    parser.add_argument("--stocks", type=int, default=100)
+    parser.add_argument("--per-stock", type=int, default=3)
+    parser.add_argument("--bars", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    universe = {f"{i:06d}": make_bars(args.bars, i) for i in range(args.stocks)}
+    ref = cycle(universe, args.per_stock, pandas_ma, pandas_rsi_macd, pandas_features, False)
+    indicators.clear()
+    got = cycle(universe, args.per_stock, engine_ma, engine_rsi_macd, engine_features, True)
+    mismatches = sum(not same(a, b) for a, b in zip(ref, got))
+
+    def timed(fn) -> float:
+        best = float("inf")
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    t_pandas = timed(lambda: cycle(universe, args.per_stock, pandas_ma, pandas_rsi_macd,
+                                   pandas_features, False))
+
+    def engine_cold():
+        indicators.clear()  # 새 봉이 들어온 사이클: 종목마다 한 번씩 계산
+        cycle(universe, args.per_stock, engine_ma, engine_rsi_macd, engine_features, True)
+
+    t_cold = timed(engine_cold)
+    t_warm = timed(lambda: cycle(universe, args.per_stock, engine_ma, engine_rsi_macd,
+                                 engine_features, True))
+
+    calls = len(ref)
+    print(f"{args.stocks} stocks × {args.per_stock} strategies, {args.bars} bars, {calls} evaluations")
+    print(f"pandas/ta      {t_pandas * 1000:9.1f} ms  ({t_pandas / calls * 1e6:8.1f} µs/eval)")
+    print(f"engine (cold)  {t_cold * 1000:9.1f} ms  ({t_cold / calls * 1e6:8.1f} µs/eval)  "
+          f"x{t_pandas / t_cold:.1f}")
+    print(f"engine (warm)  {t_warm * 1000:9.1f} ms  ({t_warm / calls * 1e6:8.1f} µs/eval)  "
+          f"x{t_pandas / t_warm:.1f}")
+    print(f"result mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+run_strategies 부하 테스트
+로컬 REST 스탠드인(simulator.rest_server)을 띄우고 임시 DB 에 전략 N 개를 만든 뒤
+run_strategies 를 여러 번 돌려 사이클 시간, 클라이언트 속도 제한 대기, 서버 측 거절(EGW00201) 수를 본다.
+장 시간 검사는 건너뛴다.
+
+실행: cd kis_trader && python benchmarks/load_run_strategies.py --strategies 300 --stocks 100 \\
+          --latency 0.03 --server-rate 20 --client-rate 18
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from simulator.rest_server import RestStandInServer  # noqa: E402
+
+STRATEGY_PARAMS = {
+    "ma": {"short_period": 5, "long_period": 20},
+    "rsi_macd": {},
+    "condition": {"action": "both",
+                  "conditions": [{"indicator": "change_rate", "operator": ">", "value": 0.1}]},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="run_strategies 부하 테스트 (로컬 스탠드인)")
+    parser.add_argument("--strategies", type=int, default=300)
+    parser.add_argument("--stocks", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.03, help="서버 응답 지연(초)")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--server-rate", type=float, default=20, help="서버 초당 허용 건수")
+    parser.add_argument("--client-rate", type=float, default=18, help="KIS_PAPER_RATE_LIMIT")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    sim = RestStandInServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                            rate_limit=args.server_rate, seed=args.seed).start()
+    tmp = tempfile.mkdtemp(prefix="kis-load-")
+
+    from app import create_app
+    app = create_app({
+        "TESTING": True,  # 스케줄러 미기동
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'load.db')}",
+        "QUOTE_CACHE_PATH": os.path.join(tmp, "cache.db"),
+        "PAPER_BASE_URL": sim.url,
+        "KIS_PAPER_APP_KEY": "sim-key",
+        "KIS_PAPER_APP_SECRET": "sim-secret",
+        "KIS_PAPER_ACCOUNT_NO": "50000000",
+        "KIS_PAPER_RATE_LIMIT": args.client_rate,
+        "BAR_STORE_INITIAL_BARS": 200,
+    })
+
+    import kis_api
+    from db import db
+    from models import Order, Strategy
+    from strategies import runner
+    runner.is_market_hours = lambda: True
+    runner.is_auction_time = lambda: False
+
+    rng = random.Random(args.seed)
+    codes = [f"{rng.randint(0, 999999):06d}" for _ in range(args.stocks)]
+    types = list(STRATEGY_PARAMS)
+    with app.app_context():
+        for i in range(args.strategies):
+            kind = types[i % len(types)]
+            db.session.add(Strategy(name=f"load-{i}", stock_code=codes[i % len(codes)],
+                                    strategy_type=kind, params=STRATEGY_PARAMS[kind], mode="paper"))
+        db.session.commit()
+
+    cycles = []
+    for r in range(args.rounds):
+        start = time.perf_counter()
+        runner.run_strategies(app)
+        cycles.append(time.perf_counter() - start)
+        print(f"round {r + 1}: {cycles[-1]:.2f}s")
+
+    with app.app_context():
+        orders = Order.query.count()
+    print(f"strategies={args.strategies} stocks={args.stocks} orders={orders}")
+    print(f"first cycle {cycles[0]:.2f}s (bar store fill)")
+    if len(cycles) > 1:
+        print(f"steady cycle avg {sum(cycles[1:]) / (len(cycles) - 1):.2f}s")
+    print("client limiter:", json.dumps(kis_api.limiter_stats(), ensure_ascii=False))
+    print("server:", json.dumps(sim.stats(), ensure_ascii=False))
+    sim.stop()
+
+
+if __name__ == "__main__":
+    main()
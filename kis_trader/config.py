@@ -21,11 +21,131 @@ class Config:
     KIS_REAL_ACCOUNT_NO = os.getenv("KIS_REAL_ACCOUNT_NO", "")
 
     KIS_ACCOUNT_SUFFIX = os.getenv("KIS_ACCOUNT_SUFFIX", "01")
+    KIS_HTS_ID = os.getenv("KIS_HTS_ID", "")  # 실시간 체결통보 구독용 (비우면 미구독)
+
+    # 토큰은 현재가 공유 캐시(QUOTE_CACHE_PATH)에 두고 워커 간 리스로 한 번만 발급
+    KIS_TOKEN_RECHECK_SECONDS = 10  # 메모리 토큰을 공유 캐시와 대조하는 주기 (무효화 반영 지연)
+    KIS_TOKEN_LEASE = 30            # 발급 중인 워커를 기다리는 최대 시간
 
     # URL
-    PAPER_BASE_URL = "https://openapivts.koreainvestment.com:29443"
+    # 모의 URL 은 로컬 스탠드인(simulator.rest_server)으로 바꿔 부하 테스트 가능
+    PAPER_BASE_URL = os.getenv("KIS_PAPER_BASE_URL", "https://openapivts.koreainvestment.com:29443")
     REAL_BASE_URL  = "https://openapi.koreainvestment.com:9443"
+    PAPER_WS_URL = os.getenv("KIS_PAPER_WS_URL", "ws://ops.koreainvestment.com:31000")
+    REAL_WS_URL  = os.getenv("KIS_REAL_WS_URL", "ws://ops.koreainvestment.com:21000")
+
+    # HTTP 커넥션 풀 (kis_http)
+    KIS_POOL_SIZE = int(os.getenv("KIS_POOL_SIZE", "10"))
+    KIS_MAX_RETRIES = int(os.getenv("KIS_MAX_RETRIES", "3"))
+    KIS_RETRY_BACKOFF = float(os.getenv("KIS_RETRY_BACKOFF", "0.3"))
+    KIS_CONNECT_TIMEOUT = 3.05
+    KIS_TIMEOUTS = {
+        "token": 10,
+        "price": 5,
+        "multi_price": 5,
+        "daily_chart": 15,
+        "index_price": 5,
+        "order": 10,
+        "balance": 10,
+        "holiday": 5,
+    }
+
+    # 앱키당 초당 호출 한도 (서버 한도보다 약간 낮게, 모의 서버가 훨씬 낮음)
+    KIS_REAL_RATE_LIMIT = float(os.getenv("KIS_REAL_RATE_LIMIT", "18"))
+    KIS_PAPER_RATE_LIMIT = float(os.getenv("KIS_PAPER_RATE_LIMIT", "2"))
+    # 한도를 모든 프로세스가 QUOTE_CACHE_PATH 의 공유 버킷으로 나눠 씀 (끄면 프로세스마다 따로)
+    KIS_RATE_LIMIT_SHARED = os.getenv("KIS_RATE_LIMIT_SHARED", "1") == "1"
+
+    # 현재가 공유 캐시 (gunicorn 워커 간 SQLite 파일 공유)
+    QUOTE_CACHE_PATH = os.path.join(BASE_DIR, "kis_cache.db")
+    QUOTE_CACHE_TTL = float(os.getenv("QUOTE_CACHE_TTL", "1.0"))
+    QUOTE_CACHE_LEASE = 5.0
+
+    # 잔고 스냅샷 캐시 (자체 주문 제출 시 즉시 무효화)
+    BALANCE_CACHE_TTL = float(os.getenv("BALANCE_CACHE_TTL", "5"))
+    BALANCE_MAX_PAGES = 20
+
+    # 기간별 시세 과거 페이지 동시 조회 수
+    KIS_CHART_PAGE_CONCURRENCY = 4
+
+    # 비동기 클라이언트(kis_async) 동시 호출 수 — 커넥션 풀 크기 이하로
+    KIS_ASYNC_CONCURRENCY = int(os.getenv("KIS_ASYNC_CONCURRENCY", "8"))
+
+    # 일봉 저장소 (bar_store)
+    BAR_STORE_INITIAL_BARS = 1000  # 최초 적재/재적재 시 받을 봉 수 (약 4년)
+    BAR_STORE_CLOSE_HHMM = 1540    # 이 시각 이후 당일 봉을 완결로 보고 저장
+
+    # KRX 휴장일 (market_calendar) — 실전 키가 있으면 KIS 휴장일조회가 우선, 없을 때 이 목록으로 판정
+    MARKET_HOLIDAYS = tuple(d for d in os.getenv("MARKET_HOLIDAYS", "").split(",") if d)  # YYYYMMDD,...
+
+    # ML
+    ML_TRAIN_BARS = 750            # 약 3년치 일봉으로 학습
+    ML_MODEL_CACHE_MB = 512        # 메모리에 올려 둘 모델 파일 크기 합 상한
+    ML_MODEL_MMAP = os.getenv("ML_MODEL_MMAP", "0") == "1"  # joblib mmap_mode="r" 로 로드
+    ML_RETRAIN_WORKERS = int(os.getenv("ML_RETRAIN_WORKERS", "0"))  # 학습 프로세스 수 (0=CPU 코어 수)
+    ML_RETRAIN_FETCH_CONCURRENCY = 4
+    ML_RETRAIN_WARM_START = os.getenv("ML_RETRAIN_WARM_START", "0") == "1"  # 기존 모델에 트리만 추가
+    ML_WARM_START_TREES = 20       # 재학습마다 추가할 트리 수
+    ML_MAX_TREES = 300             # 넘으면 100개로 새로 학습
+
+    # 실시간 웹소켓 시세 (realtime)
+    REALTIME_ENABLED = os.getenv("REALTIME_ENABLED", "0") == "1"
+    REALTIME_SYNC_SECONDS = 30            # 활성 전략 ↔ 구독 목록 동기화 주기
+    REALTIME_EVAL_MIN_INTERVAL = 1.0      # 종목별 전략 재평가 최소 간격(초)
+    REALTIME_ORDER_COOLDOWN_SECONDS = 60  # 최근 주문이 있으면 실시간 평가 생략
+
+    # 전략 실행기: (종목, 모드) 그룹 동시 평가 수 — 커넥션 풀 크기 이하로
+    RUNNER_CONCURRENCY = int(os.getenv("RUNNER_CONCURRENCY", "4"))
+    # 샤드 작업 프로세스 (shards) — 0 이면 스케줄러 프로세스에서 직접 실행
+    RUNNER_WORKERS = int(os.getenv("RUNNER_WORKERS", "0"))  # 종목 해시로 전략을 나눠 맡을 프로세스 수
+    RUNNER_HEARTBEAT_SECONDS = 5    # 작업 프로세스 생존 신호 주기
+    RUNNER_WORKER_TTL = 15          # 이 시간 동안 신호가 없으면 빠진 것으로 보고 종목 재배정
+    RUNNER_HASH_VNODES = 64         # 해시 링에서 작업 프로세스 하나가 차지하는 가상 노드 수
+
+    # 백테스트 (backtest) — 비율은 체결 금액 기준
+    BACKTEST_INITIAL_CASH = 10_000_000
+    BACKTEST_COMMISSION = float(os.getenv("BACKTEST_COMMISSION", "0.00015"))  # 매수·매도 각각
+    BACKTEST_SLIPPAGE = float(os.getenv("BACKTEST_SLIPPAGE", "0.0005"))      # 종가 대비 불리하게
+    BACKTEST_SELL_TAX = float(os.getenv("BACKTEST_SELL_TAX", "0.002"))       # 매도 시 거래세
+    BACKTEST_MAX_TRADES = 1000     # API 응답에 넣을 최근 거래 수
+
+    # 파라미터 탐색 (optimizer)
+    OPTIMIZER_WORKERS = int(os.getenv("OPTIMIZER_WORKERS", "0"))  # 작업 프로세스 수 (0=CPU 코어 수)
+    OPTIMIZER_BATCH = 8            # 작업 하나에 함께 시뮬레이션할 조합 수
+    OPTIMIZER_MAX_POINTS = 5000    # 한 번에 평가할 수 있는 조합 수 상한
+    OPTIMIZER_MEMO_ITEMS = 64      # 작업 프로세스가 들고 있을 지표 배열 수
+    OPTIMIZER_JOB_TTL = 300        # 진행 기록이 이보다 오래 없는 실행 중 작업은 죽은 것으로 보고 정리(초)
+
+    # 포트폴리오 전략 (strategy_type="portfolio")
+    PORTFOLIO_MAX_UNIVERSE = 500   # 전략 하나의 유니버스 종목 수 상한
+    PORTFOLIO_HISTORY_DAYS = 400   # 순위 계산용 일봉 이력(달력일)
+    PORTFOLIO_BAR_SYNC_MINUTES = 30  # 유니버스 일봉 적재·증분 작업 주기(분) — 이미 받은 종목은 DB 확인만
+
+    # 전 종목 스크리너 (screener)
+    SCREENER_ENABLED = os.getenv("SCREENER_ENABLED", "0") == "1"  # 스케줄러로 스냅샷 주기 갱신
+    SCREENER_MODE = os.getenv("SCREENER_MODE", "")  # 시세 조회 모드 (비우면 CURRENT_MODE)
+    SCREENER_MASTER_BASE_URL = os.getenv("SCREENER_MASTER_BASE_URL",
+                                         "https://new.real.download.dws.co.kr/common/master")
+    SCREENER_UNIVERSE_PATH = os.path.join(BASE_DIR, "screener_universe.json")
+    SCREENER_REFRESH_SECONDS = 60  # 스냅샷 갱신 주기
+    SCREENER_REFRESH_BUDGET = 20   # 한 번의 갱신에 쓸 최대 시간(초) — 남은 종목은 다음 갱신에서
+    SCREENER_MAX_AGE = 60          # 이보다 오래된 시세만 다시 조회(초)
+    SCREENER_BATCH = 30            # 멀티종목 시세 호출당 종목 수 (최대 30)
+    SCREENER_CONCURRENCY = 4       # 동시 호출 수 (속도 제한은 배치 레인이 따로 지킴)
+    SCREENER_HISTORY_DAYS = 400    # 지표 계산용 일봉 이력(달력일)
+    SCREENER_HISTORY_TTL = 3600    # 일봉 이력 배열을 다시 읽는 주기(초)
+    SCREENER_MAX_RESULTS = 500     # /api/screener 한 번에 돌려줄 최대 종목 수
+    SCREENER_REQUEST_BUDGET = 5    # 요청의 refresh=true 갱신에 쓸 최대 시간(초)
+
+    # 느린 사이클 기록기 (profiling) — /api/debug/slow-cycles
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+    PROFILING_SLOW_SECONDS = 10          # 스케줄러 작업이 이보다 길어지면 스택 샘플링 시작
+    PROFILING_SLOW_REQUEST_SECONDS = 2   # Flask 요청 기준 (요청 추적은 느린 것만 보관)
+    PROFILING_TRACES = 50                # 보관할 최근 추적 수
+    PROFILING_SAMPLE_INTERVAL = 0.01     # 샘플링 간격(초)
 
-    # 스케줄러
+    # 스케줄러 (워커 여러 개면 잠금 파일을 잡은 한 프로세스만 실행)
+    SCHEDULER_LOCK_PATH = os.path.join(BASE_DIR, "scheduler.lock")
+    SCHEDULER_LEADER_RETRY_SECONDS = 2   # 대기 워커가 리더 자리를 다시 시도하는 주기
     STRATEGY_INTERVAL_SECONDS = 60
     AUCTION_CHECK_INTERVAL_SECONDS = 30
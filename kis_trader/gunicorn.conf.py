@@ -0,0 +1,12 @@
+"""
+gunicorn 설정 — kis_trader/ 에서 gunicorn 을 실행하면 자동으로 읽힘 (다른 곳에서는 -c gunicorn.conf.py)
+
+  gunicorn --preload -w 4 -b 0.0.0.0:6000 run:app
+
+설정 파일은 마스터(arbiter)가 앱을 로드하기 전에 읽으므로 여기서 마스터 pid 를 남겨 두면,
+--preload(또는 preload_app = True)로 마스터에서 create_app 이 실행될 때 스케줄러 리더 선출을
+fork 된 워커로 미룬다 (leader.py 참조). 워커는 pid 가 달라 그대로 선출에 참가한다.
+"""
+import os
+
+os.environ["SCHEDULER_ARBITER_PID"] = str(os.getpid())
@@ -1,11 +1,27 @@
 """
 한국투자증권 Open API 래퍼
-- 토큰 자동 갱신 (DB 캐시)
+- 토큰 자동 갱신 (메모리 캐시 + 워커 공유 캐시 + DB, 발급은 워커 간 리스로 한 번만)
 - 모의/실전 URL·키 자동 전환
-- 현재가, 일봉, 주문(매수/매도), 잔고, 지수 조회
+- 현재가(단건·멀티종목), 일봉, 주문(매수/매도), 잔고, 지수 조회
+- 모든 호출은 kis_http 의 모드별 keep-alive 커넥션 풀을 사용
+- 모드별 토큰 버킷 속도 제한 + 우선순위 레인 (주문 > 전략 > UI > 배치)
+  (버킷은 워커 공유 SQLite 행 — 모든 프로세스 합계가 앱키당 한도 이내)
+- 현재가는 짧은 TTL 의 워커 공유 캐시(quote_cache)를 거침
+- 잔고는 연속조회로 전부 받아 짧게 캐시, 자체 주문 시 무효화
+- 엔드포인트·모드별 지연 시간, 상태 코드, 재시도, 속도 제한 대기를 metrics 로 기록
 """
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 import requests
-from datetime import datetime, timedelta
+import kis_http
+import metrics
+import profiling
+import quote_cache
+from datetime import datetime, timedelta, timezone
 from flask import current_app
 from db import db
 from models import KisToken
@@ -24,35 +40,309 @@ def _credentials(mode: str) -> tuple:
     return cfg["KIS_REAL_APP_KEY"], cfg["KIS_REAL_APP_SECRET"], cfg["KIS_REAL_ACCOUNT_NO"]
 
 
-def get_token(mode: str) -> str:
-    """액세스 토큰 반환 (캐시 유효하면 재사용)"""
-    app_key, app_secret, _ = _credentials(mode)
-    token_row = KisToken.query.filter_by(mode=mode).first()
-    now = datetime.utcnow()
+# ── 호출 속도 제한 ──────────────────────────────────────────────
+# 레인 순서가 우선순위: 앞 레인에 대기자가 있으면 뒤 레인은 토큰을 받지 못한다.
+LANES = ("order", "strategy", "ui", "batch")
+_LANE_PRIORITY = {name: i for i, name in enumerate(LANES)}
+_current_lane = contextvars.ContextVar("kis_lane", default="strategy")
+
+
+@contextmanager
+def lane(name: str):
+    """with lane("ui"): 블록 안의 KIS 호출을 해당 레인으로 보낸다"""
+    if name not in _LANE_PRIORITY:
+        raise ValueError(f"unknown lane: {name}")
+    reset = _current_lane.set(name)
+    try:
+        yield
+    finally:
+        _current_lane.reset(reset)
+
+
+class LocalBucket:
+    """프로세스 하나만 쓰는 토큰 버킷 (초당 rate 건, 최대 capacity 건 누적)"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def take(self) -> float:
+        """토큰 1개를 가져오면 0, 모자라면 다음 토큰까지 남은 초 (RateLimiter 락 안에서 호출)"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class SharedBucket:
+    """같은 앱키를 쓰는 모든 프로세스(gunicorn 워커, 스케줄러 리더, 샤드 작업 프로세스)가 나눠 쓰는 토큰 버킷
+
+    quote_cache 와 같은 SQLite 파일(WAL)의 buckets 행 하나를 BEGIN IMMEDIATE 트랜잭션으로 갱신한다.
+    프로세스 수와 관계없이 합계가 rate 를 넘지 않는다 (레인 우선순위는 프로세스 안에서만 적용).
+    """
+
+    def __init__(self, path: str, key: str, rate: float, capacity: int):
+        self.path = path
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets "
+                         "(key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self) -> float:
+        """토큰 1개를 가져오면 0, 모자라면 다음 토큰까지 남은 초 (모자랄 때는 행을 쓰지 않음)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key=?", (self.key,)).fetchone()
+            tokens = self.capacity if row is None else min(self.capacity, row[0] + max(now - row[1], 0) * self.rate)
+            if tokens < 1:
+                return (1 - tokens) / self.rate
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                         (self.key, tokens - 1, now))
+            return 0.0
+        finally:
+            conn.execute("COMMIT")
+
+
+class RateLimiter:
+    """토큰 버킷 (초당 rate 건, 최대 burst 건 누적) + 레인별 우선순위 대기
+
+    bucket 을 주지 않으면 프로세스 로컬 버킷 — 워커가 여럿이면 워커 수만큼 한도가 늘어나므로
+    운영에서는 SharedBucket 을 쓴다 (KIS_RATE_LIMIT_SHARED).
+    """
+
+    def __init__(self, rate: float, burst: int, bucket=None):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self._bucket = bucket or LocalBucket(self.rate, self.capacity)
+        self._cond = threading.Condition()
+        self._waiting = [0] * len(LANES)
+        self._stats = {name: {"count": 0, "wait_total": 0.0, "wait_max": 0.0} for name in LANES}
+
+    def acquire(self, lane_name: str = "strategy") -> float:
+        """토큰 1개 획득까지 대기 → 대기 시간(초)"""
+        prio = _LANE_PRIORITY[lane_name]
+        start = time.monotonic()
+        with self._cond:
+            self._waiting[prio] += 1
+            try:
+                while True:
+                    # 상위 레인 대기면 알림까지, 토큰 부족이면 다음 토큰 생성 시점까지
+                    delay = 0.05
+                    if not any(self._waiting[:prio]):
+                        delay = self._bucket.take()
+                        if delay == 0:
+                            break
+                    self._cond.wait(max(delay, 0.001))
+            finally:
+                self._waiting[prio] -= 1
+                self._cond.notify_all()
+            waited = time.monotonic() - start
+            st = self._stats[lane_name]
+            st["count"] += 1
+            st["wait_total"] += waited
+            st["wait_max"] = max(st["wait_max"], waited)
+        return waited
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                name: {
+                    "count": st["count"],
+                    "queued": self._waiting[_LANE_PRIORITY[name]],
+                    "wait_avg_ms": round(st["wait_total"] / st["count"] * 1000, 2) if st["count"] else 0.0,
+                    "wait_max_ms": round(st["wait_max"] * 1000, 2),
+                }
+                for name, st in self._stats.items()
+            }
+
+
+_limiters: dict = {}
+_limiters_lock = threading.Lock()
+
+
+def _limiter(mode: str) -> RateLimiter:
+    limiter = _limiters.get(mode)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(mode)
+            if limiter is None:
+                cfg = current_app.config
+                rate = float(cfg["KIS_PAPER_RATE_LIMIT"] if mode == "paper" else cfg["KIS_REAL_RATE_LIMIT"])
+                burst = max(1, int(rate))
+                bucket = None
+                if cfg.get("KIS_RATE_LIMIT_SHARED", True):
+                    bucket = SharedBucket(cfg["QUOTE_CACHE_PATH"], f"kis:{mode}", rate, burst)
+                limiter = RateLimiter(rate, burst, bucket)
+                _limiters[mode] = limiter
+    return limiter
+
 
-    if token_row and token_row.expires_at and token_row.expires_at > now + timedelta(minutes=5):
-        return token_row.access_token
+def limiter_stats() -> dict:
+    """모드별·레인별 호출 수, 현재 대기 수, 평균/최대 대기 시간"""
+    return {mode: limiter.stats() for mode, limiter in _limiters.items()}
 
-    url = f"{_base_url(mode)}/oauth2/tokenP"
+
+_API_SECONDS = metrics.histogram(
+    "kis_api_request_seconds", "KIS REST call latency per attempt (excluding rate-limit wait)", ("endpoint", "mode"))
+_API_RESPONSES = metrics.counter(
+    "kis_api_responses_total", "KIS REST responses by HTTP status (error = no response)", ("endpoint", "mode", "status"))
+_API_RETRIES = metrics.counter(
+    "kis_api_retries_total", "KIS REST calls retried after a rate-limit rejection", ("endpoint", "mode"))
+_LIMIT_WAIT = metrics.histogram(
+    "kis_rate_limit_wait_seconds", "Time spent waiting for a rate-limit token", ("mode", "lane"))
+metrics.gauge(
+    "kis_rate_limit_queued", "Callers currently waiting for a rate-limit token",
+    lambda: {(mode, name): st["queued"] for mode, lanes in limiter_stats().items() for name, st in lanes.items()},
+    ("mode", "lane"))
+
+
+_THROTTLE_ATTEMPTS = 3
+
+
+def _is_throttled(resp: requests.Response) -> bool:
+    """KIS 초당 거래건수 초과 응답(EGW00201) 여부"""
+    return resp.status_code >= 400 and "EGW00201" in resp.text
+
+
+def _request(mode: str, method: str, path: str, endpoint: str,
+             lane_name: str = None, **kwargs) -> requests.Response:
+    """속도 제한을 거쳐 풀링된 세션으로 KIS 호출 (endpoint 는 타임아웃 조회 키)
+
+    서버가 초당 건수 초과로 거절한 요청은 접수되지 않은 것이므로 주문도 재시도한다.
+    """
+    url = f"{_base_url(mode)}{path}"
+    limiter = _limiter(mode)
+    lane_name = lane_name or _current_lane.get()
+    with profiling.span(f"kis {endpoint}", mode=mode, lane=lane_name):
+        for attempt in range(_THROTTLE_ATTEMPTS):
+            _LIMIT_WAIT.observe(limiter.acquire(lane_name), mode, lane_name)
+            start = time.perf_counter()
+            try:
+                resp = kis_http.request(mode, method, url, endpoint, **kwargs)
+            except requests.RequestException:
+                _API_RESPONSES.inc(endpoint, mode, "error")
+                raise
+            finally:
+                _API_SECONDS.observe(time.perf_counter() - start, endpoint, mode)
+            _API_RESPONSES.inc(endpoint, mode, resp.status_code)
+            if not _is_throttled(resp) or attempt == _THROTTLE_ATTEMPTS - 1:
+                break  # 마지막 시도가 거절되면 기다리지 않고 바로 오류
+            _API_RETRIES.inc(endpoint, mode)
+            time.sleep((attempt + 1) / limiter.rate)
+        resp.raise_for_status()
+    return resp
+
+
+# 프로세스 로컬 토큰 캐시: mode → (access_token, expires_at(epoch), 공유 캐시 확인 시각)
+_token_cache: dict = {}
+_token_locks = {"paper": threading.Lock(), "real": threading.Lock()}
+_TOKEN_MARGIN = timedelta(minutes=5)
+
+
+def _token_valid(data: dict) -> bool:
+    return data["expires_at"] > time.time() + _TOKEN_MARGIN.total_seconds()
+
+
+def _issue_token(mode: str) -> dict:
+    """DB 에 남은 유효 토큰 또는 tokenP 신규 발급 (워커 간 리스를 잡은 한 프로세스에서만 실행)"""
+    now = datetime.utcnow()
+    token_row = KisToken.query.filter_by(mode=mode).first()
+    if token_row and token_row.expires_at and token_row.expires_at > now + _TOKEN_MARGIN:
+        return {"access_token": token_row.access_token,
+                "expires_at": token_row.expires_at.replace(tzinfo=timezone.utc).timestamp()}
+
+    app_key, app_secret, _ = _credentials(mode)
     body = {
         "grant_type": "client_credentials",
         "appkey": app_key,
         "appsecret": app_secret,
     }
-    resp = requests.post(url, json=body, timeout=10)
-    resp.raise_for_status()
+    resp = _request(mode, "POST", "/oauth2/tokenP", "token", lane_name="order", json=body)
     data = resp.json()
-    new_token = data["access_token"]
-    expires_in = int(data.get("expires_in", 86400))
+    expires_at = now + timedelta(seconds=int(data.get("expires_in", 86400)))
 
     if not token_row:
         token_row = KisToken(mode=mode)
         db.session.add(token_row)
-    token_row.access_token = new_token
-    token_row.expires_at = now + timedelta(seconds=expires_in)
+    token_row.access_token = data["access_token"]
+    token_row.expires_at = expires_at
     token_row.updated_at = now
     db.session.commit()
-    return new_token
+    return {"access_token": data["access_token"], "expires_at": expires_at.replace(tzinfo=timezone.utc).timestamp()}
+
+
+def invalidate_token_cache() -> None:
+    """DB·공유 캐시 토큰 삭제 → 다른 워커도 KIS_TOKEN_RECHECK_SECONDS 안에 알아채고 재발급된 토큰으로 교체"""
+    KisToken.query.delete()
+    db.session.commit()
+    cache = quote_cache.get_cache()
+    for mode in ("paper", "real"):
+        cache.delete(f"token:{mode}")
+    _token_cache.clear()
+
+
+def get_token(mode: str) -> str:
+    """액세스 토큰 반환 (메모리 캐시 → 워커 공유 캐시 → DB → 신규 발급 순)
+
+    메모리 캐시는 KIS_TOKEN_RECHECK_SECONDS 동안 파일·DB 를 건드리지 않고 쓰고,
+    그 뒤에는 공유 캐시의 토큰과 대조한다 (다른 워커의 재발급·무효화 반영).
+    발급이 필요하면 프로세스 안에서는 모드별 락, 워커 간에는 공유 캐시의 inflight 리스로
+    한 곳에서만 tokenP 를 호출하고 나머지는 그 결과를 기다린다 (tokenP 는 분당 1회 제한).
+    """
+    recheck = float(current_app.config.get("KIS_TOKEN_RECHECK_SECONDS", 10))
+    cached = _token_cache.get(mode)
+    if cached and time.time() - cached[2] < recheck and _token_valid({"expires_at": cached[1]}):
+        return cached[0]
+
+    with _token_locks.setdefault(mode, threading.Lock()):
+        cached = _token_cache.get(mode)
+        if cached and time.time() - cached[2] < recheck and _token_valid({"expires_at": cached[1]}):
+            return cached[0]
+        data = quote_cache.get_cache().shared_value(
+            f"token:{mode}", lambda: _issue_token(mode), _token_valid,
+            lease=float(current_app.config.get("KIS_TOKEN_LEASE", 30)),
+        )
+        _token_cache[mode] = (data["access_token"], data["expires_at"], time.time())
+        return data["access_token"]
+
+
+_approval_cache: dict = {}
+
+
+def get_approval_key(mode: str) -> str:
+    """웹소켓 접속용 승인키 (프로세스 내 23시간 캐시)"""
+    cached = _approval_cache.get(mode)
+    if cached and cached[1] > datetime.utcnow():
+        return cached[0]
+    app_key, app_secret, _ = _credentials(mode)
+    body = {
+        "grant_type": "client_credentials",
+        "appkey": app_key,
+        "secretkey": app_secret,
+    }
+    resp = _request(mode, "POST", "/oauth2/Approval", "token", lane_name="order", json=body)
+    approval_key = resp.json()["approval_key"]
+    _approval_cache[mode] = (approval_key, datetime.utcnow() + timedelta(hours=23))
+    return approval_key
 
 
 def _headers(mode: str, tr_id: str) -> dict:
@@ -67,15 +357,24 @@ def _headers(mode: str, tr_id: str) -> dict:
     }
 
 
-def get_current_price(stock_code: str, mode: str = "paper") -> dict:
-    """현재가 조회 → {"price": 70000, "change_rate": 1.23, "volume": ...}"""
-    url = f"{_base_url(mode)}/uapi/domestic-stock/v1/quotations/inquire-price"
+def get_current_price(stock_code: str, mode: str = "paper", max_age: float = None) -> dict:
+    """현재가 조회 → {"price": 70000, "change_rate": 1.23, "volume": ...}
+
+    QUOTE_CACHE_TTL(기본 1초) 동안은 워커 공유 캐시에서 반환하고, 동시 미스는
+    한 번의 호출로 합친다. max_age=0 이면 캐시를 건너뛴다.
+    """
+    return quote_cache.get_cache().get_or_fetch(
+        mode, stock_code, lambda: _fetch_current_price(stock_code, mode), max_age
+    )
+
+
+def _fetch_current_price(stock_code: str, mode: str) -> dict:
     params = {
         "FID_COND_MRKT_DIV_CODE": "J",
         "FID_INPUT_ISCD": stock_code,
     }
-    resp = requests.get(url, headers=_headers(mode, "FHKST01010100"), params=params, timeout=10)
-    resp.raise_for_status()
+    resp = _request(mode, "GET", "/uapi/domestic-stock/v1/quotations/inquire-price", "price",
+                    headers=_headers(mode, "FHKST01010100"), params=params)
     output = resp.json().get("output", {})
     return {
         "price": int(output.get("stck_prpr", 0)),
@@ -87,26 +386,67 @@ def get_current_price(stock_code: str, mode: str = "paper") -> dict:
     }
 
 
-def get_daily_ohlcv(stock_code: str, mode: str = "paper", count: int = 100) -> list:
-    """일봉 데이터 조회"""
-    from datetime import date
-    url = f"{_base_url(mode)}/uapi/domestic-stock/v1/quotations/inquire-daily-itemchartprice"
-    today = date.today().strftime("%Y%m%d")
+# 관심종목(멀티종목) 시세 조회 한 번에 받을 수 있는 종목 수
+MULTI_PRICE_MAX = 30
+
+
+def get_multi_price(stock_codes: list, mode: str = "paper") -> dict:
+    """여러 종목 현재가를 한 번에 조회 (최대 MULTI_PRICE_MAX 종목) → {stock_code: 시세}
+
+    시세 dict 는 get_current_price 필드에 name·prev_close·trade_value 가 더해진다.
+    응답에 빠진 종목은 결과에 없다. 캐시를 거치지 않는다.
+    """
+    if len(stock_codes) > MULTI_PRICE_MAX:
+        raise ValueError(f"get_multi_price takes at most {MULTI_PRICE_MAX} codes")
+    params = {}
+    for i, code in enumerate(stock_codes, 1):
+        params[f"FID_COND_MRKT_DIV_CODE_{i}"] = "J"
+        params[f"FID_INPUT_ISCD_{i}"] = code
+    resp = _request(mode, "GET", "/uapi/domestic-stock/v1/quotations/intstock-multprice",
+                    "multi_price", headers=_headers(mode, "FHKST11300006"), params=params)
+    quotes = {}
+    for row in resp.json().get("output", []) or []:
+        code = row.get("inter_shrn_iscd", "")
+        if not code:
+            continue
+        quotes[code] = {
+            "name": row.get("inter_kor_isnm", ""),
+            "price": int(row.get("inter2_prpr") or 0),
+            "change_rate": float(row.get("prdy_ctrt") or 0),
+            "volume": int(row.get("acml_vol") or 0),
+            "high": int(row.get("inter2_hgpr") or 0),
+            "low": int(row.get("inter2_lwpr") or 0),
+            "open": int(row.get("inter2_oprc") or 0),
+            "prev_close": int(row.get("inter2_prdy_clpr") or 0),
+            "trade_value": int(row.get("acml_tr_pbmn") or 0),
+        }
+    return quotes
+
+
+# 기간별 시세 창 크기(달력일): 한 창에 100행을 넘지 않도록 (KIS 호출당 최대 100행)
+_CHART_WINDOW_DAYS = {"D": 138, "W": 693, "M": 2920}
+_CHART_PAGE_ROWS = 100
+
+
+def _fetch_chart_page(stock_code: str, mode: str, start: str, end: str,
+                      period: str, adjusted: bool) -> list:
+    """기간별 시세 한 페이지 [start, end] (최신순, 최대 100행)"""
     params = {
         "FID_COND_MRKT_DIV_CODE": "J",
         "FID_INPUT_ISCD": stock_code,
-        "FID_INPUT_DATE_1": "19000101",
-        "FID_INPUT_DATE_2": today,
-        "FID_PERIOD_DIV_CODE": "D",
-        "FID_ORG_ADJ_PRC": "0",
+        "FID_INPUT_DATE_1": start,
+        "FID_INPUT_DATE_2": end,
+        "FID_PERIOD_DIV_CODE": period,
+        "FID_ORG_ADJ_PRC": "0" if adjusted else "1",
     }
-    resp = requests.get(url, headers=_headers(mode, "FHKST03010100"), params=params, timeout=15)
-    resp.raise_for_status()
-    output2 = resp.json().get("output2", [])
+    resp = _request(mode, "GET", "/uapi/domestic-stock/v1/quotations/inquire-daily-itemchartprice",
+                    "daily_chart", headers=_headers(mode, "FHKST03010100"), params=params)
     result = []
-    for row in output2[:count]:
+    for row in resp.json().get("output2", []):
+        if not row.get("stck_bsop_date"):
+            continue  # 데이터가 없으면 빈 행이 섞여 온다
         result.append({
-            "date": row.get("stck_bsop_date", ""),
+            "date": row["stck_bsop_date"],
             "open": int(row.get("stck_oprc", 0)),
             "high": int(row.get("stck_hgpr", 0)),
             "low": int(row.get("stck_lwpr", 0)),
@@ -116,6 +456,62 @@ def get_daily_ohlcv(stock_code: str, mode: str = "paper", count: int = 100) -> l
     return result
 
 
+def _fetch_pages_concurrently(stock_code: str, mode: str, windows: list,
+                              period: str, adjusted: bool) -> list:
+    """여러 창을 동시에 조회 (각 스레드는 새 앱 컨텍스트 + 호출자 레인 유지)"""
+    from concurrent.futures import ThreadPoolExecutor
+    app = current_app._get_current_object()
+
+    def fetch(window):
+        with app.app_context():
+            return _fetch_chart_page(stock_code, mode, window[0], window[1], period, adjusted)
+
+    with ThreadPoolExecutor(max_workers=len(windows)) as ex:
+        futures = [ex.submit(contextvars.copy_context().run, fetch, w) for w in windows]
+        return [f.result() for f in futures]
+
+
+def get_daily_ohlcv(stock_code: str, mode: str = "paper", count: int = 100,
+                    start_date: str = "19000101", end_date: str = None,
+                    period: str = "D", adjusted: bool = True) -> list:
+    """기간별(일/주/월) 시세 조회 → 날짜 중복 없는 최신순 목록 (최대 count 행, None 이면 전부)
+
+    첫 호출로 최신 100행을 받고, 더 필요하면 남은 구간을 100행 이하 창으로 나눠
+    KIS_CHART_PAGE_CONCURRENCY 개씩 동시에 과거로 거슬러 받는다. 상장 이전에 닿아
+    빈 창이 나오면 멈춘다. adjusted=False 면 원주가(수정주가 미반영).
+    """
+    from datetime import date, datetime as dt
+    if period not in _CHART_WINDOW_DAYS:
+        raise ValueError(f"period must be D/W/M: {period}")
+    end_date = end_date or date.today().strftime("%Y%m%d")
+
+    rows = {}
+    page = _fetch_chart_page(stock_code, mode, start_date, end_date, period, adjusted)
+    for r in page:
+        rows[r["date"]] = r
+
+    if len(page) >= _CHART_PAGE_ROWS and (count is None or len(rows) < count):
+        window = timedelta(days=_CHART_WINDOW_DAYS[period])
+        first = dt.strptime(start_date, "%Y%m%d").date()
+        cursor = dt.strptime(min(rows), "%Y%m%d").date() - timedelta(days=1)
+        concurrency = int(current_app.config.get("KIS_CHART_PAGE_CONCURRENCY", 4))
+        done = False
+        while not done and cursor >= first:
+            windows = []
+            while cursor >= first and len(windows) < concurrency:
+                start = max(first, cursor - window + timedelta(days=1))
+                windows.append((start.strftime("%Y%m%d"), cursor.strftime("%Y%m%d")))
+                cursor = start - timedelta(days=1)
+            for page in _fetch_pages_concurrently(stock_code, mode, windows, period, adjusted):
+                for r in page:
+                    rows[r["date"]] = r
+                done = done or not page
+            done = done or (count is not None and len(rows) >= count)
+
+    result = [rows[d] for d in sorted(rows, reverse=True)]
+    return result if count is None else result[:count]
+
+
 def place_order(stock_code: str, order_type: str, price: int,
                 quantity: int, mode: str = "paper") -> dict:
     """주문 실행 → {"order_no": "...", "success": True}"""
@@ -126,7 +522,6 @@ def place_order(stock_code: str, order_type: str, price: int,
     else:
         tr_id = "VTTC0801U" if mode == "paper" else "TTTC0801U"
 
-    url = f"{_base_url(mode)}/uapi/domestic-stock/v1/trading/order-cash"
     body = {
         "CANO": account_no,
         "ACNT_PRDT_CD": cfg["KIS_ACCOUNT_SUFFIX"],
@@ -135,8 +530,11 @@ def place_order(stock_code: str, order_type: str, price: int,
         "ORD_QTY": str(quantity),
         "ORD_UNPR": str(price),
     }
-    resp = requests.post(url, headers=_headers(mode, tr_id), json=body, timeout=10)
-    resp.raise_for_status()
+    try:
+        resp = _request(mode, "POST", "/uapi/domestic-stock/v1/trading/order-cash", "order",
+                        lane_name="order", headers=_headers(mode, tr_id), json=body)
+    finally:
+        invalidate_balance(mode)
     data = resp.json()
     output = data.get("output", {})
     return {
@@ -148,15 +546,12 @@ def place_order(stock_code: str, order_type: str, price: int,
 
 def get_index_price(index_code: str, mode: str = "paper") -> dict:
     """업종 지수 현재가 조회 (0001=코스피, 1001=코스닥)"""
-    url = f"{_base_url(mode)}/uapi/domestic-stock/v1/quotations/inquire-index-price"
     params = {
         "FID_COND_MRKT_DIV_CODE": "U",
         "FID_INPUT_ISCD": index_code,
     }
-    resp = requests.get(
-        url, headers=_headers(mode, "FHPUP02100000"), params=params, timeout=10
-    )
-    resp.raise_for_status()
+    resp = _request(mode, "GET", "/uapi/domestic-stock/v1/quotations/inquire-index-price",
+                    "index_price", headers=_headers(mode, "FHPUP02100000"), params=params)
     output = resp.json().get("output", {})
     return {
         "index": float(output.get("bstp_nmix_prpr", 0)),
@@ -169,39 +564,97 @@ def get_index_price(index_code: str, mode: str = "paper") -> dict:
     }
 
 
-def get_balance(mode: str = "paper") -> list:
-    """잔고 조회"""
+def get_market_days(base_date: str, mode: str = "real") -> dict:
+    """국내휴장일조회 — base_date(YYYYMMDD)부터 이어지는 날짜들의 개장 여부 → {"YYYYMMDD": bool}
+
+    실전 전용 API 라 모의 모드로는 조회되지 않는다 (market_calendar 가 하루 한 번만 호출).
+    """
+    params = {"BASS_DT": base_date, "CTX_AREA_NK": "", "CTX_AREA_FK": ""}
+    resp = _request(mode, "GET", "/uapi/domestic-stock/v1/quotations/chk-holiday",
+                    "holiday", headers=_headers(mode, "CTCA0903R"), params=params)
+    return {row["bass_dt"]: row.get("opnd_yn") == "Y"
+            for row in resp.json().get("output", []) if row.get("bass_dt")}
+
+
+# 잔고 스냅샷 캐시: mode → (positions, fetched_at) — 자체 주문 제출 시 무효화
+_balance_cache: dict = {}
+_balance_locks = {"paper": threading.Lock(), "real": threading.Lock()}
+
+
+def _fetch_positions(mode: str) -> dict:
+    """연속조회 키(tr_cont, CTX_AREA_FK100/NK100)를 따라 전체 잔고 조회 → {stock_code: 보유}"""
     cfg = current_app.config
     _, _, account_no = _credentials(mode)
     tr_id = "VTTC8434R" if mode == "paper" else "TTTC8434R"
-    url = f"{_base_url(mode)}/uapi/domestic-stock/v1/trading/inquire-balance"
-    params = {
-        "CANO": account_no,
-        "ACNT_PRDT_CD": cfg["KIS_ACCOUNT_SUFFIX"],
-        "AFHR_FLPR_YN": "N",
-        "OFL_YN": "N",
-        "INQR_DVSN": "02",
-        "UNPR_DVSN": "01",
-        "FUND_STTL_ICLD_YN": "N",
-        "FNCG_AMT_AUTO_RDPT_YN": "N",
-        "PRCS_DVSN": "00",
-        "CTX_AREA_FK100": "",
-        "CTX_AREA_NK100": "",
-    }
-    resp = requests.get(url, headers=_headers(mode, tr_id), params=params, timeout=10)
-    resp.raise_for_status()
-    output1 = resp.json().get("output1", [])
-    result = []
-    for row in output1:
-        qty = int(row.get("hldg_qty", 0))
-        if qty > 0:
-            result.append({
-                "stock_code": row.get("pdno", ""),
-                "stock_name": row.get("prdt_name", ""),
-                "quantity": qty,
-                "avg_price": float(row.get("pchs_avg_pric", 0)),
-                "current_price": int(row.get("prpr", 0)),
-                "eval_profit_loss": float(row.get("evlu_pfls_amt", 0)),
-                "profit_loss_rate": float(row.get("evlu_pfls_rt", 0)),
-            })
-    return result
+    positions = {}
+    fk100 = nk100 = tr_cont = ""
+    for _ in range(int(cfg.get("BALANCE_MAX_PAGES", 20))):
+        params = {
+            "CANO": account_no,
+            "ACNT_PRDT_CD": cfg["KIS_ACCOUNT_SUFFIX"],
+            "AFHR_FLPR_YN": "N",
+            "OFL_YN": "N",
+            "INQR_DVSN": "02",
+            "UNPR_DVSN": "01",
+            "FUND_STTL_ICLD_YN": "N",
+            "FNCG_AMT_AUTO_RDPT_YN": "N",
+            "PRCS_DVSN": "00",
+            "CTX_AREA_FK100": fk100,
+            "CTX_AREA_NK100": nk100,
+        }
+        headers = {**_headers(mode, tr_id), "tr_cont": tr_cont}
+        resp = _request(mode, "GET", "/uapi/domestic-stock/v1/trading/inquire-balance", "balance",
+                        headers=headers, params=params)
+        data = resp.json()
+        for row in data.get("output1", []):
+            qty = int(row.get("hldg_qty", 0))
+            if qty > 0:
+                positions[row.get("pdno", "")] = {
+                    "stock_code": row.get("pdno", ""),
+                    "stock_name": row.get("prdt_name", ""),
+                    "quantity": qty,
+                    "avg_price": float(row.get("pchs_avg_pric", 0)),
+                    "current_price": int(row.get("prpr", 0)),
+                    "eval_profit_loss": float(row.get("evlu_pfls_amt", 0)),
+                    "profit_loss_rate": float(row.get("evlu_pfls_rt", 0)),
+                }
+        # 응답 헤더 tr_cont 가 F/M 이면 다음 페이지 있음
+        if resp.headers.get("tr_cont") not in ("F", "M"):
+            break
+        fk100 = data.get("ctx_area_fk100", "")
+        nk100 = data.get("ctx_area_nk100", "")
+        tr_cont = "N"
+    return positions
+
+
+def get_positions(mode: str = "paper", max_age: float = None) -> dict:
+    """보유 종목 맵 {stock_code: {...}} — BALANCE_CACHE_TTL 동안 공유 스냅샷 반환
+
+    러너·대시보드·손절 검사가 같은 스냅샷을 쓰고, 동시에 만료되면 한 스레드만 조회한다.
+    반환값은 공유 객체이므로 수정하지 않는다.
+    """
+    if max_age is None:
+        max_age = float(current_app.config.get("BALANCE_CACHE_TTL", 5.0))
+    cached = _balance_cache.get(mode)
+    if cached and time.monotonic() - cached[1] < max_age:
+        return cached[0]
+    with _balance_locks.setdefault(mode, threading.Lock()):
+        cached = _balance_cache.get(mode)
+        if cached and time.monotonic() - cached[1] < max_age:
+            return cached[0]
+        positions = _fetch_positions(mode)
+        _balance_cache[mode] = (positions, time.monotonic())
+        return positions
+
+
+def invalidate_balance(mode: str = None) -> None:
+    """잔고 스냅샷 폐기 (주문 제출·체결 통보 시)"""
+    if mode:
+        _balance_cache.pop(mode, None)
+    else:
+        _balance_cache.clear()
+
+
+def get_balance(mode: str = "paper") -> list:
+    """잔고 조회 (get_positions 스냅샷의 목록 형태)"""
+    return list(get_positions(mode).values())
@@ -0,0 +1,93 @@
+"""
+한국투자증권 Open API 비동기(asyncio) 래퍼
+- kis_api 동기 함수를 전용 스레드 풀에서 실행 → 토큰 캐시·자격증명·커넥션 풀·속도 제한을 그대로 공유
+- 세마포어로 동시 호출 수를 제한하는 gather 헬퍼
+- 동기 코드(Flask 라우트, APScheduler 작업)용 run() 브리지
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+import kis_api
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(app) -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(app.config.get("KIS_ASYNC_CONCURRENCY", 8)),
+                    thread_name_prefix="kis-async",
+                )
+    return _executor
+
+
+async def _call(fn, *args, **kwargs):
+    """동기 kis_api 함수를 워커 스레드에서 실행
+
+    호출자의 contextvars(레인 등)를 복사해 넘기고, 스레드마다 새 앱 컨텍스트를
+    열어 SQLAlchemy 세션이 스레드 간에 공유되지 않게 한다.
+    """
+    app = current_app._get_current_object()
+    ctx = contextvars.copy_context()
+
+    def run():
+        with app.app_context():
+            return fn(*args, **kwargs)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(app), ctx.run, run)
+
+
+async def get_current_price(stock_code: str, mode: str = "paper") -> dict:
+    return await _call(kis_api.get_current_price, stock_code, mode)
+
+
+async def get_index_price(index_code: str, mode: str = "paper") -> dict:
+    return await _call(kis_api.get_index_price, index_code, mode)
+
+
+async def get_daily_ohlcv(stock_code: str, mode: str = "paper", count: int = 100) -> list:
+    return await _call(kis_api.get_daily_ohlcv, stock_code, mode, count)
+
+
+async def get_balance(mode: str = "paper") -> list:
+    return await _call(kis_api.get_balance, mode)
+
+
+async def gather_limited(aws, limit: int = None, return_exceptions: bool = False) -> list:
+    """최대 limit 개씩만 동시에 실행하는 asyncio.gather (결과 순서 유지)"""
+    sem = asyncio.Semaphore(limit or int(current_app.config.get("KIS_ASYNC_CONCURRENCY", 8)))
+
+    async def guarded(aw):
+        async with sem:
+            return await aw
+
+    return await asyncio.gather(*(guarded(aw) for aw in aws), return_exceptions=return_exceptions)
+
+
+async def fetch_prices(stock_codes: list, mode: str = "paper", limit: int = None) -> dict:
+    """여러 종목 현재가 동시 조회 → {stock_code: dict | Exception}"""
+    results = await gather_limited(
+        [get_current_price(code, mode) for code in stock_codes], limit, return_exceptions=True
+    )
+    return dict(zip(stock_codes, results))
+
+
+def run(coro):
+    """동기 코드에서 코루틴을 실행하고 결과 반환
+
+    앱 컨텍스트 안(라우트, `with app.app_context()` 블록의 스케줄러 작업)에서 호출한다.
+    이미 이벤트 루프가 돌고 있는 스레드에서는 사용할 수 없다.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    coro.close()
+    raise RuntimeError("kis_async.run() cannot be called from a running event loop")
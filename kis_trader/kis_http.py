@@ -0,0 +1,84 @@
+"""
+KIS REST 호출용 HTTP 커넥션 풀
+- 모드(paper/real)별 requests.Session 재사용 → keep-alive 로 TCP+TLS 핸드셰이크 절감
+- 풀 크기 설정, 연결 오류 재시도(지수 백오프), 엔드포인트별 타임아웃
+"""
+import threading
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 엔드포인트별 읽기 타임아웃(초) — Config.KIS_TIMEOUTS 로 덮어쓸 수 있음
+DEFAULT_TIMEOUTS = {
+    "token": 10,
+    "price": 5,
+    "daily_chart": 15,
+    "index_price": 5,
+    "order": 10,
+    "balance": 10,
+    "holiday": 5,
+}
+
+_sessions: dict = {}
+_lock = threading.Lock()
+
+
+def build_session(pool_size: int = 10, max_retries: int = 3,
+                  backoff: float = 0.3) -> requests.Session:
+    """keep-alive 커넥션 풀을 가진 Session 생성
+
+    재시도는 연결 단계 오류에만 적용한다. 요청이 서버에 도달했을 수 있는
+    읽기 오류·HTTP 상태 오류는 재시도하지 않으므로 주문(POST)도 중복되지 않는다.
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=backoff,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(mode: str) -> requests.Session:
+    """모드별 공유 Session (최초 호출 시 앱 설정으로 생성)"""
+    session = _sessions.get(mode)
+    if session is None:
+        with _lock:
+            session = _sessions.get(mode)
+            if session is None:
+                cfg = current_app.config
+                session = build_session(
+                    pool_size=int(cfg.get("KIS_POOL_SIZE", 10)),
+                    max_retries=int(cfg.get("KIS_MAX_RETRIES", 3)),
+                    backoff=float(cfg.get("KIS_RETRY_BACKOFF", 0.3)),
+                )
+                _sessions[mode] = session
+    return session
+
+
+def timeout_for(endpoint: str) -> tuple:
+    """(연결, 읽기) 타임아웃 튜플"""
+    cfg = current_app.config
+    timeouts = {**DEFAULT_TIMEOUTS, **(cfg.get("KIS_TIMEOUTS") or {})}
+    return float(cfg.get("KIS_CONNECT_TIMEOUT", 3.05)), float(timeouts.get(endpoint, 10))
+
+
+def request(mode: str, method: str, url: str, endpoint: str, **kwargs) -> requests.Response:
+    kwargs.setdefault("timeout", timeout_for(endpoint))
+    return get_session(mode).request(method, url, **kwargs)
+
+
+def close_sessions() -> None:
+    """모든 풀 연결 종료 (설정 변경·테스트 후 정리용)"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
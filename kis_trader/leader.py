@@ -0,0 +1,154 @@
+"""
+스케줄러 리더 선출 (여러 gunicorn 워커 중 한 프로세스만 스케줄러·실시간 연결을 가짐)
+- SCHEDULER_LOCK_PATH 파일에 배타 flock 을 잡은 프로세스가 리더 → 잠금 파일에 pid·시각 기록
+- 나머지는 대기 스레드가 SCHEDULER_LEADER_RETRY_SECONDS 마다 다시 시도
+  → 리더가 죽으면 OS 가 잠금을 풀어 주므로 몇 초 안에 다른 워커가 이어받음
+- fork 된 자식은 물려받은 리더 상태를 버리고 대기자로 시작
+- fcntl 이 없는 환경(Windows 개발 실행)은 단일 프로세스로 보고 바로 리더
+
+실행 방식 (kis_trader/ 에서):
+  python run.py                                      # 단일 프로세스
+  gunicorn -w 4 -b 0.0.0.0:6000 run:app              # 워커마다 앱 로드 → 워커끼리 선출
+  gunicorn --preload -w 4 -b 0.0.0.0:6000 run:app    # 마스터에서 앱 로드 → 마스터는 선출하지 않고 fork 된 워커끼리
+--preload 면 create_app 이 gunicorn 마스터(arbiter)에서 실행된다. 마스터가 잠금을 잡으면 워커는 영영 리더가
+못 되고 스케줄러가 마스터 안에서 돌므로, 마스터로 판단되면 선출을 fork 이후로 미룬다.
+마스터 판단: gunicorn.conf.py 가 기록한 SCHEDULER_ARBITER_PID 가 자기 pid 이거나, 명령줄·GUNICORN_CMD_ARGS 에
+--preload 가 있는 gunicorn 프로세스 (--preload 면 앱을 로드하는 곳은 마스터뿐). 설정 파일로 preload_app 을
+켤 때는 gunicorn.conf.py 를 함께 써야 한다 (kis_trader/ 에서 실행하면 자동으로 읽힘).
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    def __init__(self, path: str, on_elected, retry: float = 2.0):
+        self.path = path
+        self.on_elected = on_elected
+        self.retry = retry
+        self.is_leader = False
+        self.elected_at = None
+        self._fd = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _try_acquire(self) -> bool:
+        if fcntl is None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, json.dumps({"pid": os.getpid(), "since": time.time()}).encode())
+        self._fd = fd  # 프로세스가 살아 있는 동안 열어 둠 (닫히면 잠금 해제)
+        return True
+
+    def _become_leader(self) -> None:
+        self.is_leader = True
+        self.elected_at = time.time()
+        logger.info(f"Scheduler leader elected: pid {os.getpid()}")
+        try:
+            self.on_elected()
+        except Exception as e:
+            logger.error(f"Scheduler start failed on leader {os.getpid()}: {e}")
+
+    def start(self) -> bool:
+        """잠금 시도 → 리더면 on_elected 실행, 아니면 대기 스레드 시작. 리더 여부 반환"""
+        with self._lock:
+            if self.is_leader:
+                return True
+            if self._try_acquire():
+                self._become_leader()
+                return True
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._standby, daemon=True, name="scheduler-standby")
+                self._thread.start()
+            return False
+
+    def _standby(self) -> None:
+        while True:
+            time.sleep(self.retry)
+            with self._lock:
+                if self.is_leader:
+                    return
+                if self._try_acquire():
+                    self._become_leader()
+                    return
+
+    def _after_fork(self) -> None:
+        # 부모의 스케줄러 스레드는 자식에 없음 — 물려받은 잠금 fd 를 닫고 대기자로
+        self._lock = threading.Lock()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self.is_leader = False
+        self.elected_at = None
+        self._thread = None
+        self.start()
+
+    def holder(self) -> dict:
+        """잠금 파일에 기록된 현재 리더 {"pid", "since"} (없으면 빈 dict)"""
+        try:
+            with open(self.path) as f:
+                return json.loads(f.read() or "{}")
+        except (OSError, ValueError):
+            return {}
+
+    def status(self) -> dict:
+        return {"pid": os.getpid(), "is_leader": self.is_leader, "elected_at": self.elected_at,
+                "leader": self.holder() if fcntl is not None else {"pid": os.getpid()}}
+
+
+_election = None
+
+
+def _in_preload_arbiter() -> bool:
+    """gunicorn --preload 마스터에서 앱을 로드하는 중인지 (모듈 docstring 참조)"""
+    if os.environ.get("SCHEDULER_ARBITER_PID") == str(os.getpid()):
+        return True
+    if "gunicorn" not in sys.modules:
+        return False
+    args = sys.argv[1:] + os.environ.get("GUNICORN_CMD_ARGS", "").split()
+    return "--preload" in args
+
+
+def elect(app, on_elected) -> LeaderElection:
+    """프로세스당 한 번 — 리더가 되면(지금 또는 나중에) on_elected() 호출
+
+    gunicorn --preload 마스터에서는 잠금을 잡지 않고, fork 된 워커가 각자 선출에 참가한다.
+    """
+    global _election
+    if _election is None:
+        cfg = app.config
+        _election = LeaderElection(cfg["SCHEDULER_LOCK_PATH"], on_elected,
+                                   retry=float(cfg.get("SCHEDULER_LEADER_RETRY_SECONDS", 2)))
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=lambda: _election and _election._after_fork())
+            if _in_preload_arbiter():
+                logger.info(f"Scheduler election deferred to forked workers (gunicorn arbiter {os.getpid()})")
+                return _election
+        _election.start()
+    return _election
+
+
+def is_leader() -> bool:
+    return _election is not None and _election.is_leader
+
+
+def status() -> dict:
+    if _election is None:
+        return {"pid": os.getpid(), "is_leader": False, "elected_at": None, "leader": {}}
+    return _election.status()
@@ -0,0 +1,51 @@
+"""
+KRX 거래일 판정 (장 시간 판정·장중 당일 봉 합성용)
+- 주말은 항상 휴장, MARKET_HOLIDAYS 설정(YYYYMMDD 목록)도 휴장
+- 그 밖의 평일은 KIS 국내휴장일조회(chk-holiday)의 개장일 여부 — 실전 앱키로만 조회되므로 실전 키가 있을 때만
+  → 결과는 워커 공유 캐시(quote_cache)에 기준일별로 남겨 모든 프로세스가 하루 한 번만 호출
+- 실전 키가 없거나 조회에 실패하면 평일은 개장일로 봄 (실패 후 10분 동안은 다시 묻지 않음)
+"""
+import logging
+import threading
+import time
+from datetime import date
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+_RETRY_AFTER = 600
+
+_days: dict = {}          # "YYYYMMDD" → 개장 여부 (프로세스 캐시)
+_lock = threading.Lock()
+_failed_at = 0.0
+
+
+def is_trading_day(day: date) -> bool:
+    """day 가 KRX 개장일인지 (앱 컨텍스트 필요)"""
+    global _failed_at
+    if day.weekday() >= 5:
+        return False
+    key = day.strftime("%Y%m%d")
+    opened = _days.get(key)
+    if opened is not None:
+        return opened
+    cfg = current_app.config
+    if key in cfg.get("MARKET_HOLIDAYS", ()):
+        return False
+    if not cfg.get("KIS_REAL_APP_KEY") or time.time() - _failed_at < _RETRY_AFTER:
+        return True
+
+    import kis_api
+    import quote_cache
+    with _lock:
+        if key not in _days:
+            try:
+                with kis_api.lane("batch"):
+                    days = quote_cache.get_cache().shared_value(
+                        f"calendar:{key}", lambda: kis_api.get_market_days(key, "real"), lambda d: True)
+                _days.update(days)
+            except Exception as e:
+                logger.warning(f"Market calendar lookup failed for {key}: {e}")
+                _failed_at = time.time()
+                return True
+    return _days.get(key, True)
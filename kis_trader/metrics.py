@@ -0,0 +1,202 @@
+"""
+프로세스 내 성능 지표 (Prometheus 텍스트 형식으로 /metrics 에 노출)
+- 카운터·히스토그램은 스레드마다 자기 샤드(dict)에만 더함 → 기록 경로에 락이 없음
+  (GIL 아래 한 스레드만 쓰는 dict·list 갱신이라 다른 스레드와 경합하지 않음)
+- 수집(render) 때만 모든 샤드를 합산하고, 끝난 스레드의 샤드는 보관용 샤드로 접어 둠
+- 게이지는 수집 시점에 콜백으로 현재 값을 읽음 (SSE 클라이언트 수, 대기 중인 호출 수 등)
+- 값은 워커 프로세스별 — 여러 워커면 워커마다 따로 수집됨
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# 초 단위 기본 버킷 (KIS 호출 수십 ms ~ 전략 사이클 수십 초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_metrics: dict = {}          # 이름 → 지표 (등록 순서대로 출력)
+_registry_lock = threading.Lock()
+_shards: list = []           # (스레드, 샤드 dict)
+_retired: dict = {}          # 끝난 스레드들의 합산 값
+_local = threading.local()
+
+
+def _shard() -> dict:
+    shard = getattr(_local, "values", None)
+    if shard is None:
+        shard = _local.values = {}
+        with _registry_lock:
+            _shards.append((threading.current_thread(), shard))
+    return shard
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labelvalues: tuple) -> tuple:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return self.name, tuple(str(v) for v in labelvalues)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues, value: float = 1) -> None:
+        shard = _shard()
+        key = self._key(labelvalues)
+        shard[key] = shard.get(key, 0) + value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple, buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues) -> None:
+        """값 하나 기록 — 샤드 항목은 [버킷별 개수..., +Inf 개수, 합계, 개수]"""
+        shard = _shard()
+        key = self._key(labelvalues)
+        row = shard.get(key)
+        if row is None:
+            row = shard[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-2] += value
+        row[-1] += 1
+
+    @contextmanager
+    def time(self, *labelvalues):
+        """with hist.time("price", "paper"): 블록 실행 시간(초) 기록 (예외가 나도 기록)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+
+class Gauge(_Metric):
+    """수집 시점에 fn() 으로 값을 읽는 게이지 — fn 은 숫자 또는 {라벨 값 튜플: 숫자}"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple, fn):
+        super().__init__(name, help_text, labelnames)
+        self.fn = fn
+
+    def values(self) -> dict:
+        value = self.fn()
+        if not isinstance(value, dict):
+            return {(): value}
+        return {tuple(str(v) for v in (k if isinstance(k, tuple) else (k,))): v for k, v in value.items()}
+
+
+def _register(metric: _Metric) -> _Metric:
+    with _registry_lock:
+        existing = _metrics.get(metric.name)
+        if existing is not None and not isinstance(metric, Gauge):
+            if existing.kind != metric.kind or existing.labelnames != metric.labelnames:
+                raise ValueError(f"metric {metric.name} already registered differently")
+            return existing
+        _metrics[metric.name] = metric  # 게이지는 다시 등록하면 새 콜백으로 교체
+        return metric
+
+
+def counter(name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+    return _register(Counter(name, help_text, labelnames))
+
+
+def histogram(name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help_text, labelnames, buckets))
+
+
+def gauge(name: str, help_text: str, fn, labelnames: tuple = ()) -> Gauge:
+    return _register(Gauge(name, help_text, labelnames, fn))
+
+
+def _merge(total: dict, shard: dict) -> None:
+    for key, value in list(shard.items()):
+        if isinstance(value, list):
+            value = list(value)
+            row = total.get(key)
+            total[key] = value if row is None else [a + b for a, b in zip(row, value)]
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+def snapshot() -> dict:
+    """모든 샤드 합산 {(이름, 라벨 값): 값} — 끝난 스레드 샤드는 이때 보관용으로 접음"""
+    with _registry_lock:
+        alive = []
+        for thread, shard in _shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                _merge(_retired, shard)
+        _shards[:] = alive
+        total = {}
+        _merge(total, _retired)
+        for _, shard in alive:
+            _merge(total, shard)
+    return total
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        if value != value:
+            return "NaN"
+        if value in (float("inf"), float("-inf")):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def render() -> str:
+    """Prometheus 텍스트 노출 형식 (version 0.0.4)"""
+    values = snapshot()
+    by_metric: dict = {}
+    for (name, labelvalues), value in values.items():
+        by_metric.setdefault(name, []).append((labelvalues, value))
+    with _registry_lock:
+        metrics = list(_metrics.values())
+
+    lines = []
+    for m in metrics:
+        lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        if isinstance(m, Gauge):
+            try:
+                rows = sorted(m.values().items())
+            except Exception:
+                rows = []  # 게이지 하나 실패로 전체 노출을 막지 않음
+            for labelvalues, value in rows:
+                lines.append(f"{m.name}{_labels(m.labelnames, labelvalues)} {_number(value)}")
+            continue
+        for labelvalues, value in sorted(by_metric.get(m.name, [])):
+            if isinstance(m, Histogram):
+                cumulative = 0
+                for bound, count in zip(m.buckets + (float("inf"),), value[:-2]):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(float(bound))}"'
+                    lines.append(f"{m.name}_bucket{_labels(m.labelnames, labelvalues, le)} {cumulative}")
+                lines.append(f"{m.name}_sum{_labels(m.labelnames, labelvalues)} {_number(float(value[-2]))}")
+                lines.append(f"{m.name}_count{_labels(m.labelnames, labelvalues)} {value[-1]}")
+            else:
+                lines.append(f"{m.name}{_labels(m.labelnames, labelvalues)} {_number(value)}")
+    return "\n".join(lines) + "\n"
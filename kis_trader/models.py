@@ -7,7 +7,7 @@ class Strategy(db.Model):
     name = db.Column(db.String(100), nullable=False)
     stock_code = db.Column(db.String(10), nullable=False)
     stock_name = db.Column(db.String(50), default="")
-    strategy_type = db.Column(db.String(20), nullable=False)  # ma|rsi_macd|condition|ml
+    strategy_type = db.Column(db.String(20), nullable=False)  # ma|rsi_macd|condition|ml|portfolio
     params = db.Column(db.JSON, default={})
     is_active = db.Column(db.Boolean, default=True)
     mode = db.Column(db.String(10), default="paper")  # paper|real
@@ -58,3 +58,63 @@ class KisToken(db.Model):
     access_token = db.Column(db.Text, default="")
     expires_at = db.Column(db.DateTime, nullable=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class DailyBar(db.Model):
+    __tablename__ = "daily_bars"
+    stock_code = db.Column(db.String(10), primary_key=True)
+    date = db.Column(db.String(8), primary_key=True)   # YYYYMMDD
+    open = db.Column(db.Integer, default=0)
+    high = db.Column(db.Integer, default=0)
+    low = db.Column(db.Integer, default=0)
+    close = db.Column(db.Integer, default=0)
+    volume = db.Column(db.Integer, default=0)
+
+class BarSyncState(db.Model):
+    __tablename__ = "bar_sync_state"
+    stock_code = db.Column(db.String(10), primary_key=True)
+    synced_through = db.Column(db.String(8), default="")  # 이 날짜까지 완결 봉 확인 완료
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class PortfolioRebalance(db.Model):
+    __tablename__ = "portfolio_rebalances"
+    strategy_id = db.Column(db.Integer, db.ForeignKey("strategies.id"), primary_key=True)
+    rebalanced_at = db.Column(db.DateTime, default=datetime.now)  # KST — 주문이 없었어도 평가를 마친 시각
+    orders = db.Column(db.Integer, default=0)                      # 그때 낸 주문 수
+
+class RunnerWorker(db.Model):
+    __tablename__ = "runner_workers"
+    worker_id = db.Column(db.String(64), primary_key=True)   # 호스트:pid
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow)
+    groups = db.Column(db.Integer, default=0)                # 마지막 사이클에 맡은 종목 그룹·포트폴리오 수
+    last_cycle_ms = db.Column(db.Float, default=0.0)
+
+class RunnerClaim(db.Model):
+    __tablename__ = "runner_claims"
+    cycle = db.Column(db.Integer, primary_key=True)          # 실행 주기 번호 (epoch 초 // 주기)
+    key = db.Column(db.String(32), primary_key=True)         # 종목 코드 또는 portfolio#id
+    worker_id = db.Column(db.String(64), nullable=False)
+
+class SweepResult(db.Model):
+    __tablename__ = "sweep_results"
+    sweep_key = db.Column(db.String(40), primary_key=True)   # 전략 종류·종목·기간·비용·일봉 데이터 해시
+    params_hash = db.Column(db.String(40), primary_key=True)  # 정렬된 params JSON 의 sha1
+    params = db.Column(db.JSON, default={})
+    metrics = db.Column(db.JSON, default={})
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class SweepJob(db.Model):
+    """HTTP 로 시작한 파라미터 탐색 작업 — 어느 워커로 조회해도 같은 상태"""
+    __tablename__ = "sweep_jobs"
+    id = db.Column(db.String(12), primary_key=True)
+    status = db.Column(db.String(10), default="running")        # running|done|error
+    running = db.Column(db.Boolean, unique=True)                # 실행 중이면 True, 끝나면 NULL → 동시에 하나만
+    owner = db.Column(db.String(80))                            # 실행 프로세스 (호스트:pid)
+    done = db.Column(db.Integer, default=0)
+    total = db.Column(db.Integer)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)  # 시각은 모두 UTC
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
@@ -0,0 +1,340 @@
+"""
+전략 파라미터 탐색 (그리드 / 무작위)
+- 전략 종류 하나 × 여러 종목에 params 조합 수천 개를 backtest.simulate 로 평가해 지표 순으로 정렬
+- 일봉 배열(종가·mask, 종목별로 모은 OHLCV, 정렬 순서)은 공유 메모리에 한 번만 올리고
+  spawn 작업 프로세스는 이름으로 붙기만 함 → 작업마다 배열을 피클링하지 않음
+- 작업 하나 = 조합 OPTIMIZER_BATCH 개를 열로 붙여 한 번에 시뮬레이션 (봉 반복 횟수가 조합 수만큼 줄어듦)
+- 작업 프로세스는 지표 메모를 이어 써서 같은 기간의 SMA/RSI 는 한 번만 계산 (OPTIMIZER_MEMO_ITEMS 넘으면 비움)
+  → 조합은 그리드 앞쪽 키 순서로 묶여 나가므로 지표 기간 키를 앞에 두는 편이 유리
+- 결과는 sweep_results 에 (탐색 키, params) 로 저장 → 그리드를 넓혀 다시 돌리면 새 조합만 평가
+  탐색 키 = 전략 종류·종목·기간·비용·일봉 데이터 해시 (새 봉이 쌓이면 새 키)
+- HTTP 로 시작한 작업의 상태는 sweep_jobs 에 두어 워커 어디서든 조회, 실행은 모든 워커를 통틀어 하나씩
+
+실행: cd kis_trader && python optimizer.py --type ma --stocks 005930,000660 \\
+          --grid '{"short_period": [3, 5, 10], "long_period": {"min": 20, "max": 60, "step": 10}}'
+"""
+import argparse
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from multiprocessing import shared_memory
+import numpy as np
+from flask import current_app
+from db import db
+from models import SweepJob, SweepResult
+from backtest import BarMatrix, check_specs, costs, load_matrix, simulate
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("sharpe", "total_return_pct", "cagr_pct", "mdd_pct", "win_rate_pct")  # 모두 클수록 좋음
+
+
+def _values(spec) -> list:
+    """그리드 한 축: 값 목록 또는 {"min", "max", "step"}"""
+    if isinstance(spec, dict):
+        lo, hi, step = spec["min"], spec["max"], spec.get("step", 1)
+        if step <= 0:
+            raise ValueError("step must be positive")
+        n = int(math.floor((hi - lo) / step + 1e-9)) + 1
+        values = [lo + i * step for i in range(max(n, 0))]
+        if all(isinstance(v, int) for v in (lo, hi, step)):
+            return values
+        return [round(v, 10) for v in values]
+    if isinstance(spec, list):
+        return spec
+    return [spec]
+
+
+def grid_points(grid: dict, samples: int = 0, seed: int = 0) -> list:
+    """그리드 전체 조합, samples > 0 이면 그중 무작위 samples 개 (조합 순서는 유지)"""
+    keys = list(grid)
+    axes = [_values(grid[k]) for k in keys]
+    total = math.prod(len(a) for a in axes)
+    if samples and samples < total:
+        indexes = sorted(random.Random(seed).sample(range(total), samples))
+    else:
+        indexes = range(total)
+    points = []
+    for index in indexes:  # 혼합 진법으로 풀어 마지막 키가 가장 빨리 바뀌게 (itertools.product 순서)
+        point = {}
+        for key, axis in zip(reversed(keys), reversed(axes)):
+            index, i = divmod(index, len(axis))
+            point[key] = axis[i]
+        points.append({k: point[k] for k in keys})
+    return points
+
+
+def _hash(obj) -> str:
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _data_hash(dates, fields: dict, mask) -> str:
+    h = hashlib.sha1(np.ascontiguousarray(dates).tobytes())
+    for f in sorted(fields):
+        h.update(np.ascontiguousarray(fields[f]).tobytes())
+    h.update(np.ascontiguousarray(mask).tobytes())
+    return h.hexdigest()
+
+
+# ── 공유 메모리 ──
+
+def _share(arrays: dict) -> tuple:
+    """배열들을 SharedMemory 블록으로 복사 → (블록 목록, {이름: (블록 이름, 모양, dtype)})"""
+    blocks, layout = [], {}
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)[...] = arr
+        blocks.append(block)
+        layout[name] = (block.name, arr.shape, arr.dtype.str)
+    return blocks, layout
+
+
+def _attach(layout: dict) -> tuple:
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in layout.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+def _release(blocks: list) -> None:
+    for block in blocks:
+        block.close()
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _bar_arrays(bars: BarMatrix) -> dict:
+    return {"close": bars.close, "mask": bars.mask, "order": bars.order,
+            **{f"packed_{f}": v for f, v in bars.packed.items()}}
+
+
+def _bars_from(arrays: dict, dates, codes: list) -> BarMatrix:
+    packed = {name[len("packed_"):]: v for name, v in arrays.items() if name.startswith("packed_")}
+    return BarMatrix(dates, codes, arrays["close"], arrays["mask"], arrays["order"], packed)
+
+
+# ── 작업 프로세스 ──
+
+_worker: dict = {}
+
+
+def _init_worker(layout: dict, dates: list, codes: list, memo_items: int) -> None:
+    blocks, arrays = _attach(layout)
+    _worker.update(blocks=blocks, memo_items=memo_items,
+                   bars=_bars_from(arrays, np.array(dates), codes))
+
+
+def _evaluate_batch(strategy_type: str, points: list, cost_args: dict) -> list:
+    """작업 프로세스: params 조합 묶음 → 조합별 요약"""
+    return _evaluate(_worker["bars"], strategy_type, points, cost_args, _worker["memo_items"])
+
+
+def _evaluate(bars: BarMatrix, strategy_type: str, points: list, cost_args: dict, memo_items: int) -> list:
+    bars.trim_memo(memo_items)
+    specs = [{"type": strategy_type, "params": p, "stocks": bars.codes} for p in points]
+    result = simulate(bars, specs, **cost_args, detail=False)
+    keep = ("total_return_pct", "cagr_pct", "mdd_pct", "sharpe", "trades", "win_rate_pct", "final_equity")
+    return [{k: s[k] for k in keep} for s in result["strategies"]]
+
+
+# ── 탐색 ──
+
+def run_sweep(strategy_type: str, stocks: list, grid: dict, base_params: dict = None,
+              samples: int = 0, seed: int = 0, metric: str = "sharpe", top: int = 20,
+              min_trades: int = 0, start: str = None, end: str = None, workers: int = None,
+              progress=None, **cost_overrides) -> dict:
+    """params 탐색 → 지표 순위 (앱 컨텍스트 필요)
+
+    base_params 에 grid 조합을 덮어써 평가한다. min_trades 미만 조합은 순위 맨 뒤로 보낸다.
+    progress(done, total) 는 새로 평가한 조합 수가 늘 때마다 불린다.
+    """
+    cfg = current_app.config
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+    check_specs([{"type": strategy_type, "stocks": stocks}])
+    points = [{**(base_params or {}), **p} for p in grid_points(grid, samples, seed)]
+    max_points = int(cfg.get("OPTIMIZER_MAX_POINTS", 5000))
+    if len(points) > max_points:
+        raise ValueError(f"{len(points)} points exceeds OPTIMIZER_MAX_POINTS={max_points}")
+    cost_args = costs(**cost_overrides)
+
+    started = time.perf_counter()
+    codes = sorted(set(stocks))
+    dates, fields, mask = load_matrix(codes, start, end)
+    sweep_key = _hash({"type": strategy_type, "stocks": codes, "start": start, "end": end,
+                       **cost_args, "data": _data_hash(dates, fields, mask)})
+
+    by_hash = {_hash(p): p for p in points}
+    results = {}
+    hashes = list(by_hash)
+    for i in range(0, len(hashes), 500):
+        for row in SweepResult.query.filter(SweepResult.sweep_key == sweep_key,
+                                            SweepResult.params_hash.in_(hashes[i:i + 500])):
+            results[row.params_hash] = row.metrics
+    todo = [h for h in hashes if h not in results]
+    cached = len(results)
+
+    if todo:
+        bars = BarMatrix.from_fields(dates, codes, fields, mask)
+        batch = max(1, int(cfg.get("OPTIMIZER_BATCH", 8)))
+        memo_items = int(cfg.get("OPTIMIZER_MEMO_ITEMS", 64))
+        chunks = [todo[i:i + batch] for i in range(0, len(todo), batch)]
+        workers = int(workers or cfg.get("OPTIMIZER_WORKERS") or os.cpu_count() or 1)
+
+        def store(chunk: list, metrics: list) -> None:
+            for h, m in zip(chunk, metrics):
+                results[h] = m
+                db.session.merge(SweepResult(sweep_key=sweep_key, params_hash=h,
+                                             params=by_hash[h], metrics=m))
+            db.session.commit()  # 중간에 멈춰도 끝난 조합은 남김
+            if progress:
+                progress(len(results) - cached, len(todo))
+
+        if len(chunks) == 1 or workers == 1:
+            for chunk in chunks:
+                store(chunk, _evaluate(bars, strategy_type, [by_hash[h] for h in chunk],
+                                       cost_args, memo_items))
+        else:
+            blocks, layout = _share(_bar_arrays(bars))
+            # 스케줄러·웹서버 스레드가 도는 프로세스라 fork 대신 spawn
+            pool = ProcessPoolExecutor(
+                max_workers=min(workers, len(chunks)), mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker, initargs=(layout, dates.tolist(), codes, memo_items))
+            try:
+                futures = {pool.submit(_evaluate_batch, strategy_type, [by_hash[h] for h in chunk],
+                                       cost_args): chunk for chunk in chunks}
+                for fut in as_completed(futures):
+                    store(futures[fut], fut.result())
+            finally:
+                pool.shutdown(cancel_futures=True)
+                _release(blocks)
+
+    def rank(h: str) -> tuple:
+        m = results[h]
+        return (m["trades"] >= min_trades, m[metric])
+
+    ranked = sorted(hashes, key=rank, reverse=True)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"Sweep {strategy_type} × {len(codes)} stocks: {len(points)} points "
+                f"({len(todo)} evaluated, {cached} cached) in {elapsed_ms:.0f}ms")
+    return {
+        "sweep_key": sweep_key, "type": strategy_type, "stocks": codes,
+        "start": str(dates[0]) if len(dates) else None, "end": str(dates[-1]) if len(dates) else None,
+        "bars": len(dates), **cost_args, "metric": metric,
+        "points": len(points), "evaluated": len(todo), "cached": cached, "elapsed_ms": elapsed_ms,
+        "results": [{"params": by_hash[h], **results[h]} for h in ranked[:top]],
+    }
+
+
+# ── HTTP 용 백그라운드 실행 ──
+# 작업 상태는 sweep_jobs 테이블에 두어 어느 gunicorn 워커로 조회해도 보이고,
+# running 열의 UNIQUE 제약으로 모든 워커를 통틀어 한 번에 하나만 실행 (탐색마다 CPU 코어 수만큼 프로세스)
+
+_MAX_JOBS = 20
+
+
+def _claim_slot(job_id: str, owner: str, ttl: float) -> None:
+    """실행 슬롯 선점 — 다른 작업이 실행 중이면 RuntimeError (진행 기록이 ttl 넘게 없으면 정리 후 선점)"""
+    from sqlalchemy.exc import IntegrityError
+    stale = datetime.utcnow() - timedelta(seconds=ttl)
+    SweepJob.query.filter(SweepJob.running.is_(True), SweepJob.heartbeat_at < stale).update(
+        {"running": None, "status": "error", "error": "abandoned (worker exited)", "finished_at": datetime.utcnow()})
+    db.session.add(SweepJob(id=job_id, status="running", running=True, owner=owner))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        raise RuntimeError("another sweep is running")
+    for old in SweepJob.query.filter(SweepJob.running.is_(None)) \
+            .order_by(SweepJob.started_at.desc()).offset(_MAX_JOBS).all():
+        db.session.delete(old)
+    db.session.commit()
+
+
+def start_sweep(app, **kwargs) -> str:
+    """백그라운드 스레드에서 run_sweep → 작업 ID (어느 워커에서든 이미 실행 중이면 RuntimeError)"""
+    job_id = uuid.uuid4().hex[:12]
+    with app.app_context():
+        _claim_slot(job_id, f"{socket.gethostname()}:{os.getpid()}",
+                    float(app.config.get("OPTIMIZER_JOB_TTL", 300)))
+
+    def update(**values) -> None:
+        SweepJob.query.filter_by(id=job_id).update({**values, "heartbeat_at": datetime.utcnow()})
+        db.session.commit()
+
+    def run():
+        with app.app_context():
+            try:
+                result = run_sweep(progress=lambda done, total: update(done=done, total=total), **kwargs)
+                update(status="done", result=result, running=None, finished_at=datetime.utcnow())
+            except Exception as e:
+                logger.error(f"Sweep {job_id} error: {e}")
+                db.session.rollback()
+                update(status="error", error=str(e), running=None, finished_at=datetime.utcnow())
+
+    threading.Thread(target=run, name=f"sweep-{job_id}", daemon=True).start()
+    return job_id
+
+
+def get_job(job_id: str) -> dict:
+    """작업 상태 (앱 컨텍스트 필요, 없으면 None)"""
+    job = db.session.get(SweepJob, job_id)
+    if job is None:
+        return None
+    out = {"id": job.id, "status": job.status, "done": job.done, "total": job.total,
+           "started_at": job.started_at.isoformat()}
+    if job.finished_at:
+        out["finished_at"] = job.finished_at.isoformat()
+    if job.result is not None:
+        out["result"] = job.result
+    if job.error:
+        out["error"] = job.error
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="저장된 일봉으로 전략 파라미터 탐색")
+    parser.add_argument("--type", required=True)
+    parser.add_argument("--stocks", required=True, help="종목코드, 쉼표 구분")
+    parser.add_argument("--grid", required=True, help='JSON, 예: {"short_period": [3, 5, 10]}')
+    parser.add_argument("--params", default="{}", help="고정 params JSON")
+    parser.add_argument("--samples", type=int, default=0, help="0 이면 그리드 전체")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--metric", default="sharpe", choices=METRICS)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--min-trades", type=int, default=0)
+    parser.add_argument("--start", help="YYYYMMDD")
+    parser.add_argument("--end", help="YYYYMMDD")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from app import create_app
+    app = create_app({"TESTING": True})  # 스케줄러 미기동
+    with app.app_context():
+        result = run_sweep(
+            args.type, [c.strip() for c in args.stocks.split(",") if c.strip()],
+            json.loads(args.grid), base_params=json.loads(args.params), samples=args.samples,
+            seed=args.seed, metric=args.metric, top=args.top, min_trades=args.min_trades,
+            start=args.start, end=args.end, workers=args.workers,
+        )
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+느린 사이클 기록기 (PROFILING_ENABLED 일 때만 동작)
+- 스케줄러 작업·Flask 요청마다 추적(trace) 하나, 그 안의 전략 그룹·전략·주문·KIS 호출은 구간(span)
+  → 최근 PROFILING_TRACES 개를 링 버퍼에 보관 (요청 추적은 느린 것만)
+- 추적이 기준 시간을 넘기는 순간부터 끝날 때까지 그 추적에 참여한 스레드의 스택을
+  PROFILING_SAMPLE_INTERVAL 간격으로 샘플링 (sys._current_frames) → folded stack
+  (flamegraph.pl, speedscope 에 그대로 넣을 수 있는 "프레임;프레임;... 개수" 형식)
+- 느린 추적이 없으면 샘플러 스레드는 가장 이른 기준 시각까지 잠들어 있음 → 평상시 비용은 구간 기록뿐
+- 워커 스레드로 넘기는 작업은 contextvars 를 복사해 실행하므로(runner, kis_async) 같은 추적에 붙음
+"""
+import contextvars
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import nullcontext
+from datetime import datetime
+
+_MAX_SPANS = 5000      # 추적 하나에 남길 구간 수 (넘으면 개수만 셈)
+_MAX_FRAMES = 128      # 샘플 하나의 스택 깊이
+
+_settings = {"enabled": False, "slow": 10.0, "slow_request": 2.0, "interval": 0.01}
+_traces: deque = deque(maxlen=50)
+_traces_lock = threading.Lock()
+_ids = itertools.count(1)
+_current_trace = contextvars.ContextVar("profiling_trace", default=None)
+_current_span = contextvars.ContextVar("profiling_span", default=0)
+_NULL = nullcontext()
+
+
+class Trace:
+    """스케줄러 작업 한 번 또는 요청 하나의 기록"""
+
+    def __init__(self, name: str, kind: str, slow_after: float):
+        self.id = next(_ids)
+        self.name = name
+        self.kind = kind
+        self.slow_after = slow_after
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.deadline = self.start + slow_after
+        self.end = None
+        self.error = None
+        self.spans = []            # (id, 부모 id, 이름, 스레드 이름, 시작, 끝, 속성)
+        self.dropped = 0
+        self.threads = {threading.get_ident(): 1}   # 스레드 → 열린 구간 수 (샘플링 대상)
+        self.samples = Counter()   # folded stack → 개수
+        self.sample_count = 0
+        self._span_ids = itertools.count(1)
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def slow(self) -> bool:
+        return self.duration >= self.slow_after
+
+    def _enter(self, ident: int) -> None:
+        self.threads[ident] = self.threads.get(ident, 0) + 1  # 스레드마다 자기 키만 바꿈
+
+    def _leave(self, ident: int) -> None:
+        depth = self.threads.get(ident, 1) - 1
+        if depth > 0:
+            self.threads[ident] = depth
+        else:
+            self.threads.pop(ident, None)
+
+    def sample(self, frames: dict, names: dict) -> None:
+        for ident in list(self.threads):
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < _MAX_FRAMES:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.samples[";".join(reversed(stack))] += 1
+        self.sample_count += 1
+
+    def summary(self) -> dict:
+        spans = sorted(self.spans, key=lambda s: s[4] - s[5])[:5]
+        return {
+            "id": self.id, "name": self.name, "kind": self.kind,
+            "started_at": self.started_at.isoformat(timespec="milliseconds"),
+            "duration_ms": round(self.duration * 1000, 1), "slow": self.slow,
+            "running": self.end is None, "error": self.error,
+            "spans": len(self.spans), "dropped_spans": self.dropped, "samples": self.sample_count,
+            "slowest_spans": [{"name": s[2], "ms": round((s[5] - s[4]) * 1000, 1)} for s in spans],
+        }
+
+    def detail(self) -> dict:
+        return {**self.summary(), "span_list": [
+            {"id": sid, "parent": parent, "name": name, "thread": thread,
+             "start_ms": round((start - self.start) * 1000, 2), "ms": round((end - start) * 1000, 2), **attrs}
+            for sid, parent, name, thread, start, end, attrs in sorted(self.spans, key=lambda s: s[4])
+        ]}
+
+    def folded(self, source: str = "samples") -> str:
+        """flamegraph 입력 — samples: 샘플링한 스택, spans: 구간 트리의 자기 시간(ms)"""
+        if source == "samples":
+            return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+        by_id = {s[0]: s for s in self.spans}
+        child_time = Counter()
+        for s in self.spans:
+            child_time[s[1]] += s[5] - s[4]
+        lines = Counter()
+        for s in self.spans:
+            path, parent = [s[2]], s[1]
+            while parent in by_id:
+                path.append(by_id[parent][2])
+                parent = by_id[parent][1]
+            path.append(self.name)
+            own = max((s[5] - s[4]) - child_time[s[0]], 0.0)  # 병렬 자식이 더 길면 0
+            lines[";".join(p.replace(";", ":") for p in reversed(path))] += own * 1000
+        root_own = max(self.duration - child_time[0], 0.0)
+        lines[self.name] += root_own * 1000
+        return "".join(f"{path} {round(ms)}\n" for path, ms in sorted(lines.items()) if round(ms) > 0)
+
+
+class _Span:
+    __slots__ = ("trace", "name", "attrs", "id", "parent", "token", "start")
+
+    def __init__(self, trace: Trace, name: str, attrs: dict):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self.id = next(self.trace._span_ids)
+        self.token = _current_span.set(self.id)
+        self.trace._enter(threading.get_ident())
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        trace = self.trace
+        _current_span.reset(self.token)
+        trace._leave(threading.get_ident())
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        if len(trace.spans) < _MAX_SPANS:
+            trace.spans.append((self.id, self.parent, self.name, threading.current_thread().name,
+                                self.start, end, self.attrs))
+        else:
+            trace.dropped += 1
+        return False
+
+
+def span(name: str, **attrs):
+    """with span("kis price"): 현재 추적 안이면 구간 기록, 아니면 아무것도 하지 않음"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NULL
+    return _Span(trace, name, attrs)
+
+
+class _Sampler(threading.Thread):
+    """기준 시간을 넘긴 추적이 있을 때만 깨어나 스택을 샘플링"""
+
+    def __init__(self):
+        super().__init__(daemon=True, name="profiling-sampler")
+        self._cond = threading.Condition()
+        self._active: set = set()
+
+    def add(self, trace: Trace) -> None:
+        with self._cond:
+            self._active.add(trace)
+            self._cond.notify()
+
+    def remove(self, trace: Trace) -> None:
+        with self._cond:
+            self._active.discard(trace)
+
+    def run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._active:
+                    self._cond.wait()
+                    continue
+                now = time.perf_counter()
+                due = [t for t in self._active if t.deadline <= now]
+                if not due:
+                    self._cond.wait(min(t.deadline for t in self._active) - now)
+                    continue
+            frames = sys._current_frames()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for trace in due:
+                trace.sample(frames, names)
+            del frames
+            time.sleep(_settings["interval"])
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def _get_sampler() -> _Sampler:
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = _Sampler()
+                _sampler.start()
+    return _sampler
+
+
+def begin(name: str, kind: str = "job"):
+    """추적 시작 → finish() 에 넘길 상태 (꺼져 있거나 이미 추적 안이면 None)"""
+    if not _settings["enabled"] or _current_trace.get() is not None:
+        return None
+    trace = Trace(name, kind, _settings["slow_request"] if kind == "request" else _settings["slow"])
+    tokens = (_current_trace.set(trace), _current_span.set(0))
+    _get_sampler().add(trace)
+    return trace, tokens
+
+
+def finish(state, error: BaseException = None, keep: bool = True) -> None:
+    """추적 종료 — 작업 추적은 항상, 요청 추적은 느린 것만 링 버퍼에 남김"""
+    if state is None:
+        return
+    trace, (trace_token, span_token) = state
+    trace.end = time.perf_counter()
+    _get_sampler().remove(trace)
+    try:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+    except ValueError:
+        _current_trace.set(None)  # 다른 컨텍스트에서 끝난 경우
+    if error is not None:
+        trace.error = f"{type(error).__name__}: {error}"
+    if keep and (trace.kind != "request" or trace.slow):
+        with _traces_lock:
+            _traces.append(trace)
+
+
+class trace:
+    """with trace("run_strategies"): 블록 전체를 추적 하나로 기록"""
+
+    def __init__(self, name: str, kind: str = "job"):
+        self.name = name
+        self.kind = kind
+        self.state = None
+
+    def __enter__(self):
+        self.state = begin(self.name, self.kind)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        finish(self.state, exc)
+        return False
+
+
+def enabled() -> bool:
+    return _settings["enabled"]
+
+
+def traces(slow_only: bool = False) -> list:
+    """보관 중인 추적 요약 (최신 먼저)"""
+    with _traces_lock:
+        items = list(_traces)
+    return [t.summary() for t in reversed(items) if t.slow or not slow_only]
+
+
+def get_trace(trace_id: int):
+    with _traces_lock:
+        return next((t for t in _traces if t.id == trace_id), None)
+
+
+def configure(cfg) -> None:
+    global _traces
+    _settings.update(
+        enabled=bool(cfg.get("PROFILING_ENABLED")),
+        slow=float(cfg.get("PROFILING_SLOW_SECONDS", 10)),
+        slow_request=float(cfg.get("PROFILING_SLOW_REQUEST_SECONDS", 2)),
+        interval=float(cfg.get("PROFILING_SAMPLE_INTERVAL", 0.01)),
+    )
+    with _traces_lock:
+        _traces = deque(_traces, maxlen=int(cfg.get("PROFILING_TRACES", 50)))
+
+
+def init_app(app) -> None:
+    """설정 반영 + 켜져 있으면 요청마다 추적 (스트리밍 응답은 남기지 않음)"""
+    from flask import g, request
+    configure(app.config)
+    if not _settings["enabled"]:
+        return
+
+    @app.before_request
+    def _profiling_begin():
+        g._profiling = begin(f"{request.method} {request.path}", "request")
+
+    @app.after_request
+    def _profiling_finish(response):
+        finish(g.pop("_profiling", None), keep=not response.is_streamed)
+        return response
+
+    @app.teardown_request
+    def _profiling_teardown(exc):
+        finish(g.pop("_profiling", None), exc)
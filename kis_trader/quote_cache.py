@@ -0,0 +1,193 @@
+"""
+현재가 공유 캐시
+- (mode, stock_code) 키, 짧은 TTL (기본 1초)
+- 같은 키의 동시 미스는 KIS 호출 한 번으로 합침
+  · 프로세스 내: 키별 Event 로 대기
+  · 워커 간: SQLite inflight 행 선점 (리스 만료 시 다른 워커가 인수)
+- gunicorn 워커 간 공유 저장소는 별도 SQLite 파일(WAL) — 앱 DB 와 락 경합 없음
+- 같은 선점 방식으로 시세 외 값(액세스 토큰)도 워커 간 한 번만 발급해 공유 (shared_value)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from flask import current_app
+
+
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class QuoteCache:
+    def __init__(self, path: str, ttl: float = 1.0, lease: float = 5.0):
+        self.path = path
+        self.ttl = ttl
+        self.lease = lease
+        self._local = threading.local()
+        self._flights: dict = {}
+        self._lock = threading.Lock()
+        self._stats = {"hit": 0, "miss": 0, "coalesced": 0}
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS quotes "
+                         "(key TEXT PRIMARY KEY, data TEXT, fetched_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS inflight "
+                         "(key TEXT PRIMARY KEY, owner TEXT, started_at REAL)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _read(self, key: str, max_age: float, valid=None):
+        row = self._conn().execute(
+            "SELECT data, fetched_at FROM quotes WHERE key=?", (key,)
+        ).fetchone()
+        if row and time.time() - row[1] < max_age:
+            data = json.loads(row[0])
+            if valid is None or valid(data):
+                return data
+        return None
+
+    def _write(self, key: str, data: dict) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO quotes (key, data, fetched_at) VALUES (?, ?, ?)",
+            (key, json.dumps(data), time.time()),
+        )
+
+    def get_or_fetch(self, mode: str, stock_code: str, fetch, max_age: float = None) -> dict:
+        """캐시가 max_age(기본 TTL) 이내면 반환, 아니면 fetch() 한 번으로 채운다"""
+        max_age = self.ttl if max_age is None else max_age
+        if max_age <= 0:
+            return fetch()
+        key = f"{mode}:{stock_code}"
+        data = self._read(key, max_age)
+        if data is not None:
+            self._count("hit")
+            return data
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            if flight.event.wait(self.lease):
+                self._count("coalesced")
+                if flight.error is not None:
+                    raise flight.error
+                return dict(flight.result)
+            self._count("miss")
+            return fetch()
+
+        try:
+            flight.result, outcome = self._fetch_shared(key, fetch, max_age)
+        except Exception as e:
+            flight.error = e
+            self._count("miss")
+            raise
+        else:
+            self._count(outcome)
+            return dict(flight.result)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def _fetch_shared(self, key: str, fetch, max_age: float, valid=None, lease: float = None) -> tuple:
+        """워커 간 선점: inflight 행을 잡은 프로세스만 KIS 를 호출하고 나머지는 결과를 기다린다
+
+        → (시세, "coalesced" | "miss") — 호출한 쪽이 조회 하나에 결과 하나만 센다
+        """
+        lease = self.lease if lease is None else lease
+        conn = self._conn()
+        owner = f"{os.getpid()}-{threading.get_ident()}"
+        now = time.time()
+        claimed = conn.execute(
+            "INSERT OR IGNORE INTO inflight (key, owner, started_at) VALUES (?, ?, ?)",
+            (key, owner, now),
+        ).rowcount == 1
+        if not claimed:
+            claimed = conn.execute(
+                "UPDATE inflight SET owner=?, started_at=? WHERE key=? AND started_at<?",
+                (owner, now, key, now - lease),
+            ).rowcount == 1
+
+        if not claimed:
+            deadline = now + lease
+            while time.time() < deadline:
+                time.sleep(0.01)
+                data = self._read(key, max_age, valid)
+                if data is not None:
+                    return data, "coalesced"
+                if conn.execute("SELECT 1 FROM inflight WHERE key=?", (key,)).fetchone() is None:
+                    break  # 선점한 워커가 실패 → 직접 조회
+
+        try:
+            data = fetch()
+            self._write(key, data)
+            return data, "miss"
+        finally:
+            if claimed:
+                conn.execute("DELETE FROM inflight WHERE key=? AND owner=?", (key, owner))
+
+    def shared_value(self, key: str, fetch, valid, lease: float = None) -> dict:
+        """시세가 아닌 값을 워커 간 한 번만 채워 공유 — valid(data) 가 참인 동안 재사용 (통계 제외)
+
+        키가 비었거나 무효면 inflight 행을 잡은 프로세스만 fetch() 하고 나머지는 그 결과를 기다린다.
+        """
+        data = self._read(key, float("inf"), valid)
+        if data is not None:
+            return data
+        return self._fetch_shared(key, fetch, float("inf"), valid, lease)[0]
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM quotes WHERE key=?", (key,))
+
+    def put(self, mode: str, stock_code: str, data: dict) -> None:
+        """외부(웹소켓 푸시)에서 받은 시세로 캐시 갱신"""
+        self._write(f"{mode}:{stock_code}", data)
+
+    def invalidate(self, mode: str = None, stock_code: str = None) -> None:
+        if mode and stock_code:
+            self._conn().execute("DELETE FROM quotes WHERE key=?", (f"{mode}:{stock_code}",))
+        else:
+            self._conn().execute("DELETE FROM quotes WHERE key NOT LIKE 'token:%'")  # 공유 토큰은 남김
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hit"] + stats["miss"] + stats["coalesced"]
+        stats["hit_rate"] = round((lookups - stats["miss"]) / lookups, 4) if lookups else 0.0
+        stats["ttl"] = self.ttl
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> QuoteCache:
+    """앱 설정으로 만든 프로세스 공용 QuoteCache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                cfg = current_app.config
+                _cache = QuoteCache(
+                    cfg["QUOTE_CACHE_PATH"],
+                    ttl=float(cfg.get("QUOTE_CACHE_TTL", 1.0)),
+                    lease=float(cfg.get("QUOTE_CACHE_LEASE", 5.0)),
+                )
+    return _cache
@@ -0,0 +1,333 @@
+"""
+KIS 웹소켓 실시간 시세/체결통보 구독
+- 승인키 발급(kis_api.get_approval_key) 후 모드별 장기 연결 1개
+- 활성 전략 종목 기준 구독/해지 동기화 (sync_subscriptions, 스케줄러에서 주기 호출)
+- 끊기면 지수 백오프로 재접속하고 전체 재구독
+- 프로세스 내 팬아웃(bus): 시세 캐시 갱신, 해당 종목 전략 즉시 평가(샤드 작업 프로세스가 없을 때), 체결 반영, 대시보드 SSE
+"""
+import base64
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+
+logger = logging.getLogger(__name__)
+
+TR_PRICE = "H0STCNT0"                                  # 국내주식 실시간체결가
+TR_EXEC = {"paper": "H0STCNI9", "real": "H0STCNI0"}    # 실시간 체결통보
+MAX_SUBSCRIPTIONS = 41                                 # 세션당 등록 한도
+
+_PUBLISHED = metrics.counter("sse_events_published_total", "Events fanned out to SSE clients", ("stream",))
+_DROPPED = metrics.counter("sse_events_dropped_total", "Events dropped because a client queue was full", ("stream",))
+_LISTENER_SECONDS = metrics.histogram(
+    "realtime_listener_seconds", "Time spent in in-process realtime listeners per event")
+
+
+def parse_price_record(fields: list) -> dict:
+    """H0STCNT0 레코드 → get_current_price 와 같은 키 + stock_code/time"""
+    return {
+        "stock_code": fields[0],
+        "time": fields[1],
+        "price": int(fields[2]),
+        "change_rate": float(fields[5]),
+        "open": int(fields[7]),
+        "high": int(fields[8]),
+        "low": int(fields[9]),
+        "volume": int(fields[13]),
+    }
+
+
+def parse_exec_record(fields: list) -> dict:
+    """체결통보 레코드 → 주문번호·체결 여부"""
+    return {
+        "order_no": fields[2],
+        "side": "sell" if fields[4] == "01" else "buy",
+        "stock_code": fields[8],
+        "qty": int(fields[9] or 0),
+        "price": int(fields[10] or 0),
+        "time": fields[11],
+        "rejected": fields[12] == "1",
+        "filled": fields[13] == "2",
+    }
+
+
+def decrypt(data: str, key: str, iv: str) -> str:
+    """체결통보 AES-256-CBC 복호화 (구독 응답의 key/iv 사용)"""
+    from cryptography.hazmat.primitives import padding
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    decryptor = Cipher(algorithms.AES(key.encode()), modes.CBC(iv.encode())).decryptor()
+    padded = decryptor.update(base64.b64decode(data)) + decryptor.finalize()
+    unpadder = padding.PKCS7(128).unpadder()
+    return (unpadder.update(padded) + unpadder.finalize()).decode("utf-8")
+
+
+class QuoteBus:
+    """프로세스 내 실시간 이벤트 팬아웃 (리스너 콜백 + SSE 클라이언트 큐)"""
+
+    def __init__(self):
+        self._listeners = []
+        self._queues = []
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def add_listener(self, fn) -> None:
+        with self._lock:
+            self._listeners.append(fn)
+
+    def open_queue(self, maxsize: int = 200) -> queue.Queue:
+        q = queue.Queue(maxsize=maxsize)
+        with self._lock:
+            self._queues.append(q)
+        return q
+
+    def close_queue(self, q: queue.Queue) -> None:
+        with self._lock:
+            if q in self._queues:
+                self._queues.remove(q)
+
+    def client_count(self) -> int:
+        return len(self._queues)
+
+    def publish(self, event: dict) -> None:
+        with _LISTENER_SECONDS.time():
+            for fn in list(self._listeners):
+                try:
+                    fn(event)
+                except Exception as e:
+                    logger.error(f"Realtime listener error: {e}")
+        with self._lock:
+            for q in self._queues:
+                try:
+                    q.put_nowait(event)
+                    _PUBLISHED.inc("quotes")
+                except queue.Full:
+                    self.dropped += 1  # 느린 클라이언트는 틱을 건너뛴다
+                    _DROPPED.inc("quotes")
+
+
+bus = QuoteBus()
+
+
+class RealtimeFeed(threading.Thread):
+    """모드 하나의 KIS 웹소켓 연결 (구독 목록 유지 + 자동 재접속)"""
+
+    def __init__(self, mode: str, url: str, approval_key_fn, hts_id: str = "",
+                 max_backoff: float = 30.0):
+        super().__init__(daemon=True, name=f"kis-ws-{mode}")
+        self.mode = mode
+        self.url = url
+        self.hts_id = hts_id
+        self.max_backoff = max_backoff
+        self._approval_key_fn = approval_key_fn
+        self._desired: set = set()
+        self._active: set = set()
+        self._keys: dict = {}       # tr_id → (key, iv)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.connected = False
+        self.reconnects = 0
+
+    def set_codes(self, codes) -> None:
+        codes = sorted(codes)
+        limit = MAX_SUBSCRIPTIONS - (1 if self.hts_id else 0)
+        if len(codes) > limit:
+            logger.warning(f"Realtime {self.mode}: {len(codes)} codes, subscribing first {limit}")
+        desired = {(TR_PRICE, code) for code in codes[:limit]}
+        if self.hts_id:
+            desired.add((TR_EXEC[self.mode], self.hts_id))
+        with self._lock:
+            self._desired = desired
+
+    def subscribed(self) -> list:
+        return sorted(key for tr_id, key in self._active if tr_id == TR_PRICE)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            try:
+                self._session()
+                backoff = 1.0
+            except Exception as e:
+                logger.warning(f"Realtime {self.mode} disconnected: {e}")
+            finally:
+                self.connected = False
+                self._active = set()
+            if self._stop_event.wait(backoff):
+                break
+            backoff = min(backoff * 2, self.max_backoff)
+            self.reconnects += 1
+
+    def _session(self) -> None:
+        from websockets.sync.client import connect
+        approval_key = self._approval_key_fn()
+        with connect(self.url, open_timeout=10, close_timeout=2) as ws:
+            self.connected = True
+            logger.info(f"Realtime {self.mode} connected: {self.url}")
+            while not self._stop_event.is_set():
+                self._apply_subscriptions(ws, approval_key)
+                try:
+                    msg = ws.recv(timeout=1.0)
+                except TimeoutError:
+                    continue
+                self._handle(ws, msg)
+
+    def _apply_subscriptions(self, ws, approval_key: str) -> None:
+        with self._lock:
+            desired = set(self._desired)
+        for tr_type, items in (("2", self._active - desired), ("1", desired - self._active)):
+            for tr_id, tr_key in sorted(items):
+                ws.send(json.dumps({
+                    "header": {"approval_key": approval_key, "custtype": "P",
+                               "tr_type": tr_type, "content-type": "utf-8"},
+                    "body": {"input": {"tr_id": tr_id, "tr_key": tr_key}},
+                }))
+                if tr_type == "1":
+                    self._active.add((tr_id, tr_key))
+                else:
+                    self._active.discard((tr_id, tr_key))
+
+    def _handle(self, ws, msg) -> None:
+        if isinstance(msg, bytes):
+            msg = msg.decode("utf-8")
+        if msg[:1] in ("0", "1"):
+            encrypted, tr_id, count, data = msg.split("|", 3)
+            if encrypted == "1":
+                if tr_id not in self._keys:
+                    logger.warning(f"Realtime {self.mode}: no key for encrypted {tr_id}")
+                    return
+                data = decrypt(data, *self._keys[tr_id])
+            fields = data.split("^")
+            if tr_id == TR_PRICE:
+                n = max(int(count), 1)
+                size = len(fields) // n
+                for i in range(n):
+                    tick = parse_price_record(fields[i * size:(i + 1) * size])
+                    bus.publish({"type": "quote", "mode": self.mode, **tick})
+            elif tr_id == TR_EXEC[self.mode]:
+                bus.publish({"type": "execution", "mode": self.mode, **parse_exec_record(fields)})
+            return
+
+        data = json.loads(msg)
+        header = data.get("header", {})
+        if header.get("tr_id") == "PINGPONG":
+            ws.pong(msg.encode("utf-8"))
+            return
+        body = data.get("body", {})
+        if body.get("rt_cd") not in (None, "0"):
+            logger.warning(f"Realtime {self.mode} {header.get('tr_key')}: {body.get('msg1')}")
+        output = body.get("output") or {}
+        if output.get("key") and output.get("iv"):
+            self._keys[header.get("tr_id")] = (output["key"], output["iv"])
+
+
+# ── 앱 연동 ──────────────────────────────────────────────────────
+_feeds: dict = {}
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="kis-rt")
+_pending: set = set()
+_last_eval: dict = {}
+_state_lock = threading.Lock()
+
+
+def _approval_key_fn(app, mode: str):
+    def fn():
+        from kis_api import get_approval_key
+        with app.app_context():
+            return get_approval_key(mode)
+    return fn
+
+
+def _ws_url(app, mode: str) -> str:
+    return app.config["PAPER_WS_URL"] if mode == "paper" else app.config["REAL_WS_URL"]
+
+
+def _evaluate(app, mode: str, quote: dict) -> None:
+    from strategies.runner import run_strategies_for
+    key = (mode, quote["stock_code"])
+    try:
+        run_strategies_for(app, quote["stock_code"], mode, quote)
+    finally:
+        with _state_lock:
+            _pending.discard(key)
+
+
+def _mark_filled(app, event: dict) -> None:
+    from db import db
+    from kis_api import invalidate_balance
+    from models import Order
+    invalidate_balance(event["mode"])
+    with app.app_context():
+        order = Order.query.filter_by(kis_order_no=event["order_no"], mode=event["mode"]).first()
+        if order is None:
+            return
+        if event["rejected"]:
+            order.status = "cancelled"
+        elif event["filled"]:
+            order.status = "filled"
+        db.session.commit()
+
+
+def start(app) -> None:
+    """리스너 등록 (스케줄러 초기화 시 한 번). 연결은 sync_subscriptions 가 연다."""
+    import quote_cache
+    with app.app_context():
+        cache = quote_cache.get_cache()
+    min_interval = float(app.config.get("REALTIME_EVAL_MIN_INTERVAL", 1.0))
+    # 샤드 작업 프로세스가 종목을 맡고 있으면 여기서 평가하지 않음 (프로세스 간 중복 주문 방지) — 시세 캐시만 갱신
+    evaluate = int(app.config.get("RUNNER_WORKERS", 0)) == 0
+    quote_keys = ("price", "change_rate", "volume", "high", "low", "open")
+
+    def on_event(event: dict) -> None:
+        if event["type"] == "execution":
+            _executor.submit(_mark_filled, app, event)
+            return
+        cache.put(event["mode"], event["stock_code"], {k: event[k] for k in quote_keys})
+        if not evaluate:
+            return
+        key = (event["mode"], event["stock_code"])
+        now = time.monotonic()
+        with _state_lock:
+            if key in _pending or now - _last_eval.get(key, 0) < min_interval:
+                return
+            _pending.add(key)
+            _last_eval[key] = now
+        _executor.submit(_evaluate, app, event["mode"], {k: event[k] for k in ("stock_code",) + quote_keys})
+
+    bus.add_listener(on_event)
+
+
+def sync_subscriptions(app) -> None:
+    """활성 전략 종목으로 모드별 구독 목록 갱신 (필요 시 연결 시작)"""
+    from models import Strategy
+    from strategies.runner import PORTFOLIO_TYPES
+    with app.app_context():
+        by_mode = {}
+        for s in Strategy.query.filter_by(is_active=True).all():
+            if s.strategy_type not in PORTFOLIO_TYPES:
+                by_mode.setdefault(s.mode, set()).add(s.stock_code)
+    for mode in ("paper", "real"):
+        codes = by_mode.get(mode, set())
+        feed = _feeds.get(mode)
+        if feed is None:
+            if not codes:
+                continue
+            feed = RealtimeFeed(mode, _ws_url(app, mode), _approval_key_fn(app, mode),
+                                hts_id=app.config.get("KIS_HTS_ID", ""))
+            _feeds[mode] = feed
+            feed.set_codes(codes)
+            feed.start()
+        else:
+            feed.set_codes(codes)
+
+
+def status() -> dict:
+    return {
+        mode: {"connected": feed.connected, "reconnects": feed.reconnects,
+               "subscribed": feed.subscribed()}
+        for mode, feed in _feeds.items()
+    }
@@ -3,3 +3,6 @@ from .strategies import bp as strategies_bp
 from .orders import bp as orders_bp
 from .auction import bp as auction_bp
 from .settings import bp as settings_bp
+from .backtest import bp as backtest_bp
+from .screener import bp as screener_bp
+from .monitoring import bp as monitoring_bp
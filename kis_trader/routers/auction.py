@@ -3,6 +3,7 @@ import queue
 import threading
 from datetime import datetime
 from flask import Blueprint, jsonify, request, Response, stream_with_context
+import metrics
 from db import db
 from models import AuctionAlert, Order
 
@@ -11,6 +12,13 @@ bp = Blueprint("auction", __name__, url_prefix="/api/auction")
 _sse_clients: list = []
 _lock = threading.Lock()
 
+_PUBLISHED = metrics.counter("sse_events_published_total", "Events fanned out to SSE clients", ("stream",))
+_DROPPED = metrics.counter("sse_events_dropped_total", "Events dropped because a client queue was full", ("stream",))
+
+
+def client_count() -> int:
+    return len(_sse_clients)
+
 
 def broadcast_auction(alert_id: int):
     alert = AuctionAlert.query.get(alert_id)
@@ -30,8 +38,10 @@ def broadcast_auction(alert_id: int):
         for q in _sse_clients:
             try:
                 q.put_nowait(msg)
+                _PUBLISHED.inc("auction")
             except queue.Full:
-                dead.append(q)
+                dead.append(q)  # 가득 찬 클라이언트는 끊긴 것으로 보고 제거
+                _DROPPED.inc("auction")
         for q in dead:
             _sse_clients.remove(q)
 
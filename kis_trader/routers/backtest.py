@@ -0,0 +1,113 @@
+import math
+from flask import Blueprint, request, jsonify, current_app
+from models import Strategy
+
+bp = Blueprint("backtest", __name__)
+
+@bp.route("/api/backtest", methods=["POST"])
+def run():
+    """전략 백테스트
+
+    본문: {"type", "params", "stocks": [...]} 하나, {"strategies": [그런 항목들]},
+    또는 {"strategy_ids": [...]} (같은 type·params 전략은 종목을 묶어 한 번에 계산)
+    선택: start/end(YYYYMMDD), initial_cash, commission, slippage, sell_tax, max_trades
+    """
+    from backtest import run_backtest
+    d = request.get_json(silent=True) or {}
+    try:
+        if not isinstance(d, dict):
+            raise ValueError("request body must be a JSON object")
+        specs = _specs(d)
+        if not specs:
+            raise ValueError("no strategies")
+        max_trades = _number(d, "max_trades", int, minimum=0)
+        result = run_backtest(
+            specs, start=_date(d, "start"), end=_date(d, "end"),
+            initial_cash=_number(d, "initial_cash", minimum=0), commission=_number(d, "commission", minimum=0),
+            slippage=_number(d, "slippage", minimum=0), sell_tax=_number(d, "sell_tax", minimum=0),
+            max_trades=max_trades if max_trades is not None else int(
+                current_app.config.get("BACKTEST_MAX_TRADES", 1000)),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+def _specs(d: dict) -> list:
+    """본문 → [{"type", "params", "stocks"}] (형식이 틀리면 ValueError)"""
+    if "strategy_ids" in d:
+        ids = d["strategy_ids"]
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise ValueError("strategy_ids must be a list of integers")
+        specs = {}
+        for s in Strategy.query.filter(Strategy.id.in_(ids)).all():
+            key = (s.strategy_type, repr(sorted((s.params or {}).items())))
+            spec = specs.setdefault(key, {"type": s.strategy_type, "params": s.params or {}, "stocks": []})
+            if s.stock_code not in spec["stocks"]:
+                spec["stocks"].append(s.stock_code)
+        return list(specs.values())
+    if "strategies" in d:
+        specs = d["strategies"]
+        if not isinstance(specs, list):
+            raise ValueError("strategies must be a list")
+    else:
+        specs = [{"type": d.get("type"), "params": d.get("params", {}), "stocks": d.get("stocks", [])}]
+    for spec in specs:
+        if not isinstance(spec, dict):
+            raise ValueError("each strategy must be an object")
+        if spec.get("params") is not None and not isinstance(spec["params"], dict):
+            raise ValueError("params must be an object")
+        stocks = spec.get("stocks")
+        if stocks is not None and (not isinstance(stocks, list) or not all(isinstance(c, str) for c in stocks)):
+            raise ValueError("stocks must be a list of stock codes")
+    return specs
+
+def _number(d: dict, key: str, cast=float, minimum: float = None):
+    """본문 숫자 필드 → cast 값 (없으면 None, 숫자가 아니거나 minimum 미만이면 ValueError)"""
+    value = d.get(key)
+    if value is None:
+        return None
+    try:
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError
+        value = cast(value)
+        if not math.isfinite(value):
+            raise ValueError
+    except ValueError:
+        raise ValueError(f"{key} must be a number") from None
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{key} must be at least {minimum}")
+    return value
+
+def _date(d: dict, key: str):
+    value = d.get(key)
+    if value is not None and not (isinstance(value, str) and len(value) == 8 and value.isdigit()):
+        raise ValueError(f"{key} must be YYYYMMDD")
+    return value
+
+@bp.route("/api/backtest/optimize", methods=["POST"])
+def optimize():
+    """파라미터 탐색 시작 → 202 {"job_id"} (진행·결과는 GET /api/backtest/optimize/<job_id>)
+
+    본문: type, stocks, grid(필수), params, samples, seed, metric, top, min_trades, start, end,
+    initial_cash, commission, slippage, sell_tax
+    """
+    from optimizer import start_sweep
+    d = request.get_json() or {}
+    if not d.get("type") or not d.get("stocks") or not d.get("grid"):
+        return jsonify({"error": "type, stocks, grid are required"}), 400
+    kwargs = {k: d[k] for k in ("samples", "seed", "metric", "top", "min_trades", "start", "end",
+                                "initial_cash", "commission", "slippage", "sell_tax") if k in d}
+    try:
+        job_id = start_sweep(current_app._get_current_object(), strategy_type=d["type"],
+                             stocks=d["stocks"], grid=d["grid"], base_params=d.get("params"), **kwargs)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify({"job_id": job_id}), 202
+
+@bp.route("/api/backtest/optimize/<job_id>", methods=["GET"])
+def optimize_status(job_id):
+    from optimizer import get_job
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": "not found"}), 404
+    return jsonify(job)
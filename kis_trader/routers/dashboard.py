@@ -1,20 +1,25 @@
-from flask import Blueprint, render_template, jsonify, current_app, request
-from kis_api import get_balance, get_current_price, get_index_price
+import json
+import queue
+from flask import Blueprint, render_template, jsonify, current_app, request, Response, stream_with_context
+import kis_async
+from kis_api import get_balance, get_current_price, lane
 from models import Strategy
+from strategies import PORTFOLIO_TYPES
 
 bp = Blueprint("dashboard", __name__)
 
 
 @bp.route("/")
 def index():
-    return render_template("dashboard.html")
+    return render_template("dashboard.html", realtime=bool(current_app.config.get("REALTIME_ENABLED")))
 
 
 @bp.route("/api/balance")
 def balance():
     mode = current_app.config.get("CURRENT_MODE", "paper")
     try:
-        data = get_balance(mode)
+        with lane("ui"):
+            data = get_balance(mode)
     except Exception:
         data = []
     return jsonify({"balance": data, "mode": mode})
@@ -23,27 +28,20 @@ def balance():
 @bp.route("/api/market-prices")
 def market_prices():
     """코스피/코스닥 지수 + 전략 등록 종목 + 추가 종목 시세 조회"""
-    mode = current_app.config.get("CURRENT_MODE", "paper")
-    result = {"mode": mode, "indices": {}, "stocks": []}
+    with lane("ui"):
+        return _market_prices()
 
-    # 코스피 지수
-    try:
-        result["indices"]["kospi"] = get_index_price("0001", mode)
-    except Exception:
-        result["indices"]["kospi"] = None
 
-    # 코스닥 지수
-    try:
-        result["indices"]["kosdaq"] = get_index_price("1001", mode)
-    except Exception:
-        result["indices"]["kosdaq"] = None
+def _market_prices():
+    mode = current_app.config.get("CURRENT_MODE", "paper")
+    result = {"mode": mode, "indices": {}, "stocks": []}
 
     # 전략에 등록된 모든 종목 수집
     seen = set()
     stock_list = []
     strategies = Strategy.query.all()
     for s in strategies:
-        if s.stock_code not in seen:
+        if s.strategy_type not in PORTFOLIO_TYPES and s.stock_code not in seen:
             seen.add(s.stock_code)
             stock_list.append((s.stock_code, s.stock_name))
 
@@ -56,20 +54,30 @@ def market_prices():
                 seen.add(code)
                 stock_list.append((code, ""))
 
-    # 각 종목 시세 조회
-    for stock_code, stock_name in stock_list:
-        try:
-            price_data = get_current_price(stock_code, mode)
-            price_data["stock_code"] = stock_code
-            price_data["stock_name"] = stock_name
-            result["stocks"].append(price_data)
-        except Exception:
+    # 코스피/코스닥 지수 + 각 종목 시세 동시 조회
+    async def fetch_all():
+        return await kis_async.gather_limited(
+            [kis_async.get_index_price("0001", mode), kis_async.get_index_price("1001", mode)]
+            + [kis_async.get_current_price(code, mode) for code, _ in stock_list],
+            return_exceptions=True,
+        )
+
+    kospi, kosdaq, *prices = kis_async.run(fetch_all())
+    result["indices"]["kospi"] = None if isinstance(kospi, Exception) else kospi
+    result["indices"]["kosdaq"] = None if isinstance(kosdaq, Exception) else kosdaq
+
+    for (stock_code, stock_name), price_data in zip(stock_list, prices):
+        if isinstance(price_data, Exception):
             result["stocks"].append({
                 "stock_code": stock_code,
                 "stock_name": stock_name,
                 "price": 0, "open": 0, "high": 0, "low": 0,
                 "change_rate": 0, "volume": 0, "error": True,
             })
+            continue
+        price_data["stock_code"] = stock_code
+        price_data["stock_name"] = stock_name
+        result["stocks"].append(price_data)
 
     return jsonify(result)
 
@@ -79,8 +87,43 @@ def stock_price(stock_code):
     """개별 종목 시세 조회"""
     mode = current_app.config.get("CURRENT_MODE", "paper")
     try:
-        data = get_current_price(stock_code, mode)
+        with lane("ui"):
+            data = get_current_price(stock_code, mode)
         data["stock_code"] = stock_code
         return jsonify(data)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
+
+
+@bp.route("/api/quotes/stream")
+def quote_stream():
+    """웹소켓 실시간 시세 SSE (REALTIME_ENABLED 이고 이 워커가 스케줄러 리더일 때만 이벤트가 흐름)
+
+    이벤트가 올 수 없는 워커에서는 연결을 붙잡지 않고 204 로 끝냄 — 연결마다 동기 워커 하나를 계속 차지하므로.
+    EventSource 는 204 를 받으면 다시 연결하지 않는다 (대시보드는 주기 조회로 갱신).
+    """
+    import leader
+    if not current_app.config.get("REALTIME_ENABLED") or not leader.is_leader():
+        return Response(status=204)
+    from realtime import bus
+    mode = current_app.config.get("CURRENT_MODE", "paper")
+    q = bus.open_queue()
+
+    def generate():
+        try:
+            while True:
+                try:
+                    event = q.get(timeout=30)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                if event["type"] == "quote" and event["mode"] == mode:
+                    yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            bus.close_queue(q)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,51 @@
+from flask import Blueprint, Response, jsonify, request
+import leader
+import metrics
+import profiling
+
+bp = Blueprint("monitoring", __name__)
+
+
+def _sse_clients() -> dict:
+    from realtime import bus
+    from routers.auction import client_count
+    return {"quotes": bus.client_count(), "auction": client_count()}
+
+
+metrics.gauge("sse_clients", "Connected SSE clients", _sse_clients, ("stream",))
+metrics.gauge("scheduler_leader", "1 if this worker owns the scheduler", lambda: int(leader.is_leader()))
+
+
+@bp.route("/metrics")
+def prometheus_metrics():
+    """Prometheus 수집용 지표 (이 워커 프로세스 값)"""
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@bp.route("/api/debug/slow-cycles")
+def slow_cycles():
+    """최근 추적 목록 (PROFILING_ENABLED) — ?slow=1 이면 기준 시간을 넘긴 것만"""
+    return jsonify({"enabled": profiling.enabled(),
+                    "traces": profiling.traces(slow_only=request.args.get("slow") in ("1", "true"))})
+
+
+@bp.route("/api/debug/slow-cycles/<int:trace_id>")
+def slow_cycle(trace_id):
+    """추적 하나의 구간 목록"""
+    trace = profiling.get_trace(trace_id)
+    if trace is None:
+        return jsonify({"error": "trace not found"}), 404
+    return jsonify(trace.detail())
+
+
+@bp.route("/api/debug/slow-cycles/<int:trace_id>/folded")
+def slow_cycle_folded(trace_id):
+    """flamegraph 입력 (folded stack) 다운로드 — ?source=spans 면 샘플 대신 구간 트리의 자기 시간(ms)"""
+    trace = profiling.get_trace(trace_id)
+    if trace is None:
+        return jsonify({"error": "trace not found"}), 404
+    source = request.args.get("source", "samples")
+    if source not in ("samples", "spans"):
+        return jsonify({"error": "source must be samples or spans"}), 400
+    return Response(trace.folded(source), content_type="text/plain; charset=utf-8", headers={
+        "Content-Disposition": f"attachment; filename=trace-{trace_id}-{source}.folded"})
@@ -0,0 +1,54 @@
+import math
+from flask import Blueprint, request, jsonify, current_app
+
+bp = Blueprint("screener", __name__)
+
+@bp.route("/api/screener", methods=["POST"])
+def screen():
+    """전 종목 조건 검색 (조건식 형식은 ConditionStrategy 와 같음)
+
+    본문: conditions(필수), sort(참조, 기본 change_rate), order(desc|asc), limit, market(KOSPI|KOSDAQ),
+    refresh(true 면 SCREENER_REQUEST_BUDGET 초 안에서 오래된 시세부터 갱신 후 평가), max_age(초)
+    """
+    from screener import get_screener
+    d = request.get_json(silent=True) or {}
+    if not isinstance(d, dict) or "conditions" not in d:
+        return jsonify({"error": "conditions is required"}), 400
+    cfg = current_app.config
+    try:
+        limit = max(1, min(_number(d.get("limit", 50), "limit", int), int(cfg.get("SCREENER_MAX_RESULTS", 500))))
+        max_age = d.get("max_age")
+        if max_age is not None:
+            max_age = _number(max_age, "max_age", float)
+            if max_age < 0:
+                raise ValueError("max_age must not be negative")
+        screener = get_screener()
+        screener.ensure_universe()
+        refreshed = None
+        if d.get("refresh"):
+            refreshed = screener.refresh(current_app._get_current_object(),
+                                         budget=float(cfg.get("SCREENER_REQUEST_BUDGET", 5)), max_age=max_age)
+        result = screener.screen(d["conditions"], sort=d.get("sort", "change_rate"),
+                                 descending=d.get("order", "desc") != "asc", limit=limit,
+                                 market=d.get("market"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    result["refresh"] = refreshed
+    return jsonify(result)
+
+def _number(value, name: str, cast):
+    """본문 숫자 필드 → cast 값 (숫자가 아니면 ValueError)"""
+    try:
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError
+        value = cast(value)
+        if not math.isfinite(value):
+            raise ValueError
+    except ValueError:
+        raise ValueError(f"{name} must be a number") from None
+    return value
+
+@bp.route("/api/screener/status", methods=["GET"])
+def status():
+    from screener import get_screener
+    return jsonify(get_screener().status())
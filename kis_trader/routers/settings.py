@@ -22,8 +22,46 @@ def get_mode():
 
 @bp.route("/api/settings/token-refresh", methods=["POST"])
 def refresh_token():
-    from models import KisToken
-    from db import db
-    KisToken.query.delete()
-    db.session.commit()
+    from kis_api import invalidate_token_cache
+    invalidate_token_cache()
     return jsonify({"message": "토큰 캐시 삭제 완료 — 다음 요청 시 자동 갱신"})
+
+@bp.route("/api/settings/rate-limit", methods=["GET"])
+def rate_limit_stats():
+    from kis_api import limiter_stats
+    return jsonify(limiter_stats())
+
+@bp.route("/api/settings/quote-cache", methods=["GET"])
+def quote_cache_stats():
+    from quote_cache import get_cache
+    return jsonify(get_cache().stats())
+
+@bp.route("/api/settings/realtime", methods=["GET"])
+def realtime_status():
+    from realtime import status
+    return jsonify(status())
+
+@bp.route("/api/settings/scheduler", methods=["GET"])
+def scheduler_status():
+    from leader import status
+    return jsonify(status())
+
+@bp.route("/api/settings/runner-workers", methods=["GET"])
+def runner_workers():
+    from shards import status
+    return jsonify(status(current_app))
+
+@bp.route("/api/settings/ml-models", methods=["GET"])
+def ml_model_stats():
+    from strategies.model_registry import get_registry
+    return jsonify(get_registry().stats())
+
+@bp.route("/api/settings/ml-features", methods=["GET"])
+def ml_feature_stats():
+    from strategies.feature_store import get_store
+    return jsonify(get_store().stats())
+
+@bp.route("/api/settings/ml-retrain", methods=["GET"])
+def ml_retrain_report():
+    from strategies.retrain import last_report
+    return jsonify(last_report())
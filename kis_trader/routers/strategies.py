@@ -1,9 +1,22 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, current_app
 from db import db
 from models import Strategy
 
 bp = Blueprint("strategies", __name__, url_prefix="/strategies")
 
+def _check_params(strategy_type: str, params: dict):
+    """조건식·포트폴리오 전략은 저장 전에 검사해 보고 오류 메시지 반환 (문제 없으면 None)"""
+    try:
+        if strategy_type == "condition":
+            from strategies.condition import compile_conditions
+            compile_conditions((params or {}).get("conditions", []))
+        elif strategy_type == "portfolio":
+            from strategies.portfolio import PortfolioStrategy
+            PortfolioStrategy("", params or {}).check(current_app.config.get("PORTFOLIO_MAX_UNIVERSE"))
+    except ValueError as e:
+        return str(e)
+    return None
+
 @bp.route("/")
 def index():
     return render_template("strategies.html")
@@ -20,8 +33,11 @@ def list_strategies():
 @bp.route("/api/strategies", methods=["POST"])
 def create_strategy():
     d = request.get_json()
+    error = _check_params(d["strategy_type"], d.get("params", {}))
+    if error:
+        return jsonify({"error": error}), 400
     s = Strategy(
-        name=d["name"], stock_code=d["stock_code"],
+        name=d["name"], stock_code=d.get("stock_code", ""),
         stock_name=d.get("stock_name", ""),
         strategy_type=d["strategy_type"],
         params=d.get("params", {}),
@@ -36,6 +52,9 @@ def create_strategy():
 def update_strategy(sid):
     s = Strategy.query.get_or_404(sid)
     d = request.get_json()
+    error = _check_params(d.get("strategy_type", s.strategy_type), d.get("params", s.params))
+    if error:
+        return jsonify({"error": error}), 400
     for field in ("name", "stock_code", "stock_name", "strategy_type", "params", "is_active", "mode"):
         if field in d:
             setattr(s, field, d[field])
@@ -1,18 +1,59 @@
 import logging
+import multiprocessing
+import time
+from datetime import datetime
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
+import metrics
+import profiling
 
 logger = logging.getLogger(__name__)
 _scheduler = None
 
+_JOB_SECONDS = metrics.histogram("scheduler_job_seconds", "Scheduler job run duration", ("job",))
+_JOB_LAG = metrics.histogram(
+    "scheduler_job_start_lag_seconds", "Delay between a job's scheduled time and its submission", ("job",))
+_JOB_RUNS = metrics.counter("scheduler_job_runs_total", "Scheduler job runs by outcome", ("job", "result"))
+_JOB_SKIPPED = metrics.counter(
+    "scheduler_job_skipped_total",
+    "Runs skipped because the previous run was still going (overrun) or the start was missed", ("job", "reason"))
+
+
+def _timed(job_id: str, fn):
+    """작업 함수를 실행 시간·결과 기록(+ 켜져 있으면 느린 사이클 추적)으로 감쌈 (예외는 그대로 APScheduler 로)"""
+    def run():
+        start = time.perf_counter()
+        try:
+            with profiling.trace(job_id):
+                fn()
+            _JOB_RUNS.inc(job_id, "ok")
+        except Exception:
+            _JOB_RUNS.inc(job_id, "error")
+            raise
+        finally:
+            _JOB_SECONDS.observe(time.perf_counter() - start, job_id)
+    return run
+
+
+def _on_job_event(event) -> None:
+    if event.code == EVENT_JOB_SUBMITTED:
+        for scheduled in event.scheduled_run_times:
+            _JOB_LAG.observe(max((datetime.now(scheduled.tzinfo) - scheduled).total_seconds(), 0), event.job_id)
+    elif event.code == EVENT_JOB_MAX_INSTANCES:
+        _JOB_SKIPPED.inc(event.job_id, "overrun")
+        logger.warning(f"Job {event.job_id} skipped: previous run still in progress")
+    else:
+        _JOB_SKIPPED.inc(event.job_id, "missed")
+
 
 def check_auction_and_alert(app):
-    from strategies import is_auction_time
+    from strategies import PORTFOLIO_TYPES, is_auction_time
     from datetime import datetime
     from db import db
     from models import Strategy, AuctionAlert
-    from kis_api import get_current_price
+    import kis_async
     from routers.auction import broadcast_auction
 
     with app.app_context():
@@ -22,14 +63,34 @@ def check_auction_and_alert(app):
         expires = now.replace(hour=9, minute=0, second=0) if now.hour < 9 else \
                   now.replace(hour=15, minute=30, second=0)
 
-        for strat in Strategy.query.filter_by(is_active=True).all():
+        pending_codes = {a.stock_code for a in AuctionAlert.query.filter_by(user_decision=None)
+                         .filter(AuctionAlert.expires_at >= now).all()}
+        targets = [s for s in Strategy.query.filter_by(is_active=True).all()
+                   if s.stock_code not in pending_codes and s.strategy_type not in PORTFOLIO_TYPES]
+        if not targets:
+            return
+
+        # 대상 종목 현재가를 (종목, 모드) 단위로 한 번에 동시 조회
+        keys = list({(s.stock_code, s.mode) for s in targets})
+
+        async def fetch_all():
+            return await kis_async.gather_limited(
+                [kis_async.get_current_price(code, mode) for code, mode in keys],
+                return_exceptions=True,
+            )
+
+        prices = dict(zip(keys, kis_async.run(fetch_all())))
+
+        for strat in targets:
             existing = AuctionAlert.query.filter_by(
                 stock_code=strat.stock_code, user_decision=None
             ).filter(AuctionAlert.expires_at >= now).first()
             if existing:
                 continue
             try:
-                current = get_current_price(strat.stock_code, strat.mode)
+                current = prices[(strat.stock_code, strat.mode)]
+                if isinstance(current, Exception):
+                    raise current
                 action = "buy" if current["change_rate"] >= 0 else "sell"
                 qty = int((strat.params or {}).get("buy_qty", 1))
                 alert = AuctionAlert(
@@ -64,47 +125,71 @@ def expire_undecided_alerts(app):
 
 
 def retrain_ml_models(app):
-    from db import db
-    from models import Strategy
-    from kis_api import get_daily_ohlcv
-    from strategies import train_model
-    with app.app_context():
-        for strat in Strategy.query.filter_by(strategy_type="ml", is_active=True).all():
-            try:
-                ohlcv = get_daily_ohlcv(strat.stock_code, strat.mode, count=120)
-                train_model(strat.stock_code, ohlcv)
-                logger.info(f"ML retrained: {strat.stock_code}")
-            except Exception as e:
-                logger.error(f"ML retrain error {strat.stock_code}: {e}")
+    from strategies.retrain import retrain_all
+    retrain_all(app)
 
 
 def init_scheduler(app):
-    global _scheduler
+    """스케줄러 리더 선출 참가 — 리더가 된 프로세스(지금 또는 리더가 죽은 뒤)만 작업·실시간 연결을 시작"""
     if app.config.get("TESTING"):
         return None
+    if multiprocessing.parent_process() is not None:
+        return None  # spawn 학습 워커가 run.py 를 다시 import 할 때 스케줄러를 띄우지 않음
+    import leader
+    return leader.elect(app, lambda: _start_scheduler(app))
+
+
+def _start_scheduler(app):
+    global _scheduler
     _scheduler = BackgroundScheduler(timezone="Asia/Seoul")
     cfg = app.config
 
-    from strategies import run_strategies
+    if int(cfg.get("RUNNER_WORKERS", 0)) > 0:
+        import shards
+        shards.start_workers(app)  # 전략 평가는 작업 프로세스들이 종목 해시로 나눠 맡음
+    else:
+        from strategies import run_strategies
+        _scheduler.add_job(
+            _timed("run_strategies", lambda: run_strategies(app)),
+            IntervalTrigger(seconds=int(cfg.get("STRATEGY_INTERVAL_SECONDS", 60))),
+            id="run_strategies", replace_existing=True,
+        )
+    from strategies.runner import sync_portfolio_bars
     _scheduler.add_job(
-        lambda: run_strategies(app),
-        IntervalTrigger(seconds=int(cfg.get("STRATEGY_INTERVAL_SECONDS", 60))),
-        id="run_strategies", replace_existing=True,
+        _timed("portfolio_bars", lambda: sync_portfolio_bars(app)),
+        IntervalTrigger(minutes=int(cfg.get("PORTFOLIO_BAR_SYNC_MINUTES", 30))),
+        id="portfolio_bars", replace_existing=True, next_run_time=datetime.now(),
     )
     _scheduler.add_job(
-        lambda: check_auction_and_alert(app),
+        _timed("auction_check", lambda: check_auction_and_alert(app)),
         IntervalTrigger(seconds=int(cfg.get("AUCTION_CHECK_INTERVAL_SECONDS", 30))),
         id="auction_check", replace_existing=True,
     )
     _scheduler.add_job(
-        lambda: expire_undecided_alerts(app),
+        _timed("expire_alerts", lambda: expire_undecided_alerts(app)),
         IntervalTrigger(seconds=60),
         id="expire_alerts", replace_existing=True,
     )
     _scheduler.add_job(
-        lambda: retrain_ml_models(app),
+        _timed("ml_retrain", lambda: retrain_ml_models(app)),
         CronTrigger(hour=3, minute=0),
         id="ml_retrain", replace_existing=True,
     )
+    if cfg.get("SCREENER_ENABLED"):
+        import screener
+        _scheduler.add_job(
+            _timed("screener_refresh", lambda: screener.refresh_job(app)),
+            IntervalTrigger(seconds=int(cfg.get("SCREENER_REFRESH_SECONDS", 60))),
+            id="screener_refresh", replace_existing=True, next_run_time=datetime.now(),
+        )
+    if cfg.get("REALTIME_ENABLED"):
+        import realtime
+        realtime.start(app)
+        _scheduler.add_job(
+            _timed("realtime_sync", lambda: realtime.sync_subscriptions(app)),
+            IntervalTrigger(seconds=int(cfg.get("REALTIME_SYNC_SECONDS", 30))),
+            id="realtime_sync", replace_existing=True, next_run_time=datetime.now(),
+        )
+    _scheduler.add_listener(_on_job_event, EVENT_JOB_SUBMITTED | EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
     _scheduler.start()
     return _scheduler
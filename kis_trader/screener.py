@@ -0,0 +1,435 @@
+"""
+전 종목 스크리너
+- 유니버스: KIS 종목 마스터(유가증권·코스닥 .mst.zip)의 보통주, 하루 한 번 받아 디스크에 캐시
+  (받지 못하면 캐시 파일, 그것도 없으면 등록된 전략 종목)
+- 시세: 멀티종목 현재가(호출당 30종목)로 전 종목 스냅샷을 워커 공유 SQLite 에 두고 프로세스마다 열 단위 배열로 읽음
+  · 스케줄러 리더가 주기 갱신, 어느 워커의 refresh=true 요청도 같은 스냅샷을 이어서 갱신
+  · 배치 레인(가장 낮은 우선순위)으로 호출해 주문·전략 호출을 밀어내지 않음
+  · 한 번의 갱신은 시간 예산 안에서 가장 오래된 행부터 — 속도 제한이 낮아도 여러 번에 걸쳐 전체가 돎
+- 평가: 저장된 일봉(load_matrix)에 스냅샷을 당일 봉으로 붙인 (봉 × 종목) 배열에
+  ConditionStrategy 와 같은 조건식을 한 번에 적용, 종목별 마지막 봉의 충족 여부로 걸러 정렬
+  · 당일 봉을 붙이는 규칙과 현재가로 덮어쓰는 필드는 load_bars / ConditionStrategy 와 같음
+  · 일봉이 저장되지 않은 종목은 스냅샷 봉 하나로만 평가 (이력이 필요한 지표 조건은 거짓)
+"""
+import contextvars
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import numpy as np
+import requests
+from flask import current_app
+from backtest import BarMatrix
+from bar_store import load_matrix
+from kis_api import MULTI_PRICE_MAX, get_multi_price, lane
+from strategies.condition import compile_conditions, compile_reference
+
+logger = logging.getLogger(__name__)
+
+MARKETS = ("KOSPI", "KOSDAQ")
+# 시장 → (마스터 파일 이름, 줄 끝 고정 길이 영역 폭)
+_MASTER_FILES = {"KOSPI": ("kospi_code", 227), "KOSDAQ": ("kosdaq_code", 221)}
+_STOCK_GROUP = "ST"  # 증권그룹구분: 주권 (ETF·ETN·리츠 등 제외)
+
+QUOTE_FIELDS = ("price", "change_rate", "volume", "open", "high", "low", "prev_close", "trade_value")
+
+
+def _parse_master(text: str, tail: int) -> list:
+    """마스터 파일 한 시장 → [(code, name)] — 단축코드 9자, 표준코드 12자, 한글명, 고정 길이 영역"""
+    rows = []
+    for line in text.splitlines():
+        if len(line) <= 21 + tail or line[-tail:][:2] != _STOCK_GROUP:
+            continue
+        code = line[:9].strip()
+        if len(code) == 6:
+            rows.append((code, line[21:len(line) - tail].strip()))
+    return rows
+
+
+def _download_universe(base_url: str) -> list:
+    stocks = []
+    for market, (name, tail) in _MASTER_FILES.items():
+        resp = requests.get(f"{base_url.rstrip('/')}/{name}.mst.zip", timeout=30)
+        resp.raise_for_status()
+        with zipfile.ZipFile(io.BytesIO(resp.content)) as zf:
+            text = zf.read(f"{name}.mst").decode("cp949", errors="replace")
+        stocks += [(code, stock_name, market) for code, stock_name in _parse_master(text, tail)]
+    return stocks
+
+
+def load_universe(force: bool = False) -> list:
+    """상장 보통주 목록 [(code, name, market)] — 오늘 받은 캐시 파일이 있으면 그대로 사용"""
+    cfg = current_app.config
+    path = cfg["SCREENER_UNIVERSE_PATH"]
+    cached = None
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if not force and cached.get("date") == datetime.now().strftime("%Y%m%d"):
+            return [tuple(s) for s in cached["stocks"]]
+    try:
+        stocks = _download_universe(cfg["SCREENER_MASTER_BASE_URL"])
+        if not stocks:
+            raise ValueError("empty master files")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"date": datetime.now().strftime("%Y%m%d"), "stocks": stocks}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return stocks
+    except Exception as e:
+        logger.warning(f"Screener universe download failed: {e}")
+    if cached:
+        return [tuple(s) for s in cached["stocks"]]
+    from models import Strategy
+    seen = {}
+    for s in Strategy.query.all():
+        seen.setdefault(s.stock_code, (s.stock_code, s.stock_name or "", ""))
+    return list(seen.values())
+
+
+def _fetch_batch(app, codes: list, mode: str) -> dict:
+    with app.app_context():
+        return get_multi_price(codes, mode)
+
+
+class SnapshotStore:
+    """스냅샷 공유 저장소 — 워커 공유 SQLite 파일(QUOTE_CACHE_PATH, WAL)의 screener_quotes·screener_meta
+
+    meta 의 version 은 유니버스나 시세가 바뀔 때마다 오르고, 각 프로세스는 version 이 바뀌었을 때만 전체를 다시 읽는다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS screener_quotes (code TEXT PRIMARY KEY, name TEXT, "
+                         "market TEXT, universe_date TEXT, "
+                         + ", ".join(f"{f} REAL DEFAULT 0" for f in QUOTE_FIELDS)
+                         + ", updated REAL DEFAULT 0, attempted REAL DEFAULT 0)")
+            conn.execute("CREATE TABLE IF NOT EXISTS screener_meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _bump(conn) -> None:
+        conn.execute("INSERT INTO screener_meta (key, value) VALUES ('version', '1') "
+                     "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+    def meta(self) -> dict:
+        return dict(self._conn().execute("SELECT key, value FROM screener_meta").fetchall())
+
+    def version(self) -> int:
+        row = self._conn().execute("SELECT value FROM screener_meta WHERE key='version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def rows(self) -> list:
+        """(code, name, market, 시세 필드..., updated, attempted) 종목 코드 순"""
+        return self._conn().execute(
+            f"SELECT code, name, market, {', '.join(QUOTE_FIELDS)}, updated, attempted "
+            "FROM screener_quotes ORDER BY code").fetchall()
+
+    def set_universe(self, stocks: list, date: str) -> None:
+        """종목 목록 교체 — 남아 있는 종목의 시세는 유지"""
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO screener_quotes (code, name, market, universe_date) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(code) DO UPDATE SET name=excluded.name, market=excluded.market, "
+                "universe_date=excluded.universe_date",
+                [(s[0], s[1], s[2], date) for s in stocks])
+            conn.execute("DELETE FROM screener_quotes WHERE universe_date != ?", (date,))
+            conn.execute("INSERT OR REPLACE INTO screener_meta (key, value) VALUES ('universe_date', ?)", (date,))
+            self._bump(conn)
+
+    def claim(self, codes: list, before: float, now: float) -> list:
+        """codes 중 아직 before 이전에 요청된 종목만 지금 요청한 것으로 표시 → 맡게 된 종목
+
+        여러 프로세스가 동시에 갱신해도 같은 종목을 두 번 조회하지 않는다.
+        """
+        with self._transaction() as conn:
+            marks = ",".join("?" * len(codes))
+            claimed = [r[0] for r in conn.execute(
+                f"SELECT code FROM screener_quotes WHERE code IN ({marks}) AND attempted <= ?",
+                (*codes, before))]
+            conn.executemany("UPDATE screener_quotes SET attempted=? WHERE code=?", [(now, c) for c in claimed])
+        return claimed
+
+    def store(self, quotes: dict, now: float) -> int:
+        """멀티종목 시세 결과 저장 → 저장한 종목 수"""
+        sets = ", ".join(f"{f}=?" for f in QUOTE_FIELDS)
+        with self._transaction() as conn:
+            stored = sum(conn.execute(f"UPDATE screener_quotes SET {sets}, updated=? WHERE code=?",
+                                      (*[q[f] for f in QUOTE_FIELDS], now, code)).rowcount
+                         for code, q in quotes.items())
+            self._bump(conn)
+        return stored
+
+    def set_meta(self, key: str, value: str) -> None:
+        self._conn().execute("INSERT OR REPLACE INTO screener_meta (key, value) VALUES (?, ?)", (key, value))
+
+
+class Screener:
+    """전 종목 시세 스냅샷(열 단위) + 일봉 이력 배열 + 조건식 일괄 평가
+
+    스냅샷의 원본은 워커 공유 SQLite(SnapshotStore)라 어느 워커에서 갱신해도 모든 워커가 같은 스냅샷을 본다.
+    열은 종목 코드 순 1차원 배열이고, 공유 version 이 바뀌었을 때만 다시 읽는다.
+    같은 version 동안의 평가는 지표 메모를 공유한다.
+    """
+
+    def __init__(self, path: str):
+        self.store = SnapshotStore(path)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.codes = np.zeros(0, dtype="<U6")
+        self.names = np.zeros(0, dtype=object)
+        self.markets = np.zeros(0, dtype="<U6")
+        self.quotes = {f: np.zeros(0) for f in QUOTE_FIELDS}
+        self.updated = np.zeros(0)    # 마지막으로 시세를 받은 시각 (epoch, 0=없음)
+        self.attempted = np.zeros(0)  # 마지막으로 요청한 시각 — 응답에 없는 종목도 뒤로 보냄
+        self.version = -1
+        self.universe_date = None
+        self.last_refresh: dict = {}
+        self._history = None          # (loaded_at, codes 튜플, BarMatrix)
+        self._evaluated = None        # (version, 유효 열 번호, IndicatorSet, current, last)
+
+    def _sync(self) -> None:
+        """공유 저장소의 version 이 바뀌었으면 배열을 다시 읽음"""
+        version = self.store.version()
+        if version == self.version:
+            return
+        meta = self.store.meta()
+        rows = self.store.rows()
+        n = len(QUOTE_FIELDS)
+        values = np.array([r[3:] for r in rows], dtype=np.float64).reshape(len(rows), n + 2)
+        with self._lock:
+            codes = np.array([r[0] for r in rows], dtype="<U6")
+            if not np.array_equal(codes, self.codes):
+                self.codes = codes
+                self._history = None
+            self.names = np.array([r[1] for r in rows], dtype=object)
+            self.markets = np.array([r[2] or "" for r in rows], dtype="<U6")
+            self.quotes = {f: values[:, i].copy() for i, f in enumerate(QUOTE_FIELDS)}
+            self.updated = values[:, n].copy()
+            self.attempted = values[:, n + 1].copy()
+            self.universe_date = meta.get("universe_date")
+            self.last_refresh = json.loads(meta.get("last_refresh") or "{}")
+            self._evaluated = None
+            self.version = int(meta.get("version", version))
+
+    # ── 유니버스 ─────────────────────────────────────────
+    def set_universe(self, stocks: list) -> None:
+        """종목 목록 교체 — 남아 있는 종목의 스냅샷은 유지"""
+        self.store.set_universe(stocks, datetime.now().strftime("%Y%m%d"))
+        self._sync()
+
+    def ensure_universe(self, force: bool = False) -> None:
+        self._sync()
+        if force or not len(self.codes) or self.universe_date != datetime.now().strftime("%Y%m%d"):
+            self.set_universe(load_universe(force))
+
+    # ── 시세 스냅샷 ──────────────────────────────────────
+    def refresh(self, app, budget: float = None, max_age: float = None) -> dict:
+        """가장 오래된 행부터 멀티종목 시세로 갱신 (시간 예산 안에서) → 통계
+
+        다른 갱신이 진행 중이면 기다리지 않고 {"skipped": True} 를 반환한다.
+        다른 프로세스가 갱신 중이어도 요청 시각으로 종목을 선점하므로 서로 다른 종목을 받는다.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return {"skipped": True}
+        try:
+            return self._refresh(app, budget, max_age)
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh(self, app, budget, max_age) -> dict:
+        cfg = app.config
+        budget = float(cfg.get("SCREENER_REFRESH_BUDGET", 20) if budget is None else budget)
+        max_age = float(cfg.get("SCREENER_MAX_AGE", 60) if max_age is None else max_age)
+        mode = cfg.get("SCREENER_MODE") or cfg.get("CURRENT_MODE", "paper")
+        batch_size = min(int(cfg.get("SCREENER_BATCH", MULTI_PRICE_MAX)), MULTI_PRICE_MAX)
+        started = time.time()
+        deadline = time.monotonic() + budget
+
+        self._sync()
+        with self._lock:
+            codes = self.codes
+            stale = np.flatnonzero(started - self.attempted >= max_age)
+            stale = stale[np.argsort(self.attempted[stale], kind="stable")]
+        batches = [[str(c) for c in codes[stale[i:i + batch_size]]] for i in range(0, len(stale), batch_size)]
+        stats = {"stale": int(len(stale)), "batches": 0, "updated": 0, "errors": 0}
+
+        workers = int(cfg.get("SCREENER_CONCURRENCY", 4))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screener")
+        pending = {}
+        try:
+            with lane("batch"):
+                context = contextvars.copy_context()
+            while batches or pending:
+                while batches and len(pending) < workers and time.monotonic() < deadline:
+                    batch = self.store.claim(batches.pop(0), started - max_age, time.time())
+                    if batch:
+                        pending[executor.submit(context.copy().run, _fetch_batch, app, batch, mode)] = batch
+                if not pending:
+                    break
+                done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()) + 10,
+                               return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for fut in done:
+                    pending.pop(fut)
+                    stats["batches"] += 1
+                    try:
+                        stats["updated"] += self.store.store(fut.result(), time.time())
+                    except Exception as e:
+                        stats["errors"] += 1
+                        logger.warning(f"Screener batch failed: {e}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        stats["remaining"] = int(sum(len(b) for b in batches))
+        stats["elapsed_ms"] = round((time.time() - started) * 1000, 1)
+        self.store.set_meta("last_refresh", json.dumps({**stats, "at": started}))
+        self._sync()
+        return stats
+
+    # ── 평가 ─────────────────────────────────────────────
+    def _history_matrix(self, codes: np.ndarray) -> BarMatrix:
+        cfg = current_app.config
+        key = tuple(codes)
+        ttl = float(cfg.get("SCREENER_HISTORY_TTL", 3600))
+        history = self._history
+        if history is None or history[1] != key or time.time() - history[0] > ttl:
+            start = (datetime.now() - timedelta(days=int(cfg.get("SCREENER_HISTORY_DAYS", 400))))
+            dates, fields, mask = load_matrix(list(codes), start=start.strftime("%Y%m%d"))
+            history = self._history = (time.time(), key, BarMatrix.from_fields(dates, list(codes), fields, mask))
+        return history[2]
+
+    def _indicators(self) -> tuple:
+        """시세를 받은 종목만 → (열 번호, IndicatorSet, current, last) — version 별로 재사용"""
+        with self._lock:
+            evaluated = self._evaluated
+            if evaluated is not None and evaluated[0] == self.version:
+                return evaluated[1:]
+            version = self.version
+            codes = self.codes
+            valid = np.flatnonzero(self.updated > 0)
+            snap = {f: v[valid].copy() for f, v in self.quotes.items()}
+
+        ind, current, last = self._history_matrix(codes).with_quotes(valid, snap)
+        with self._lock:
+            if self.version == version:
+                self._evaluated = (version, valid, ind, current, last)
+        return valid, ind, current, last
+
+    def screen(self, conditions, sort: str = "change_rate", descending: bool = True,
+               limit: int = 50, market: str = None) -> dict:
+        """조건식을 전 종목에 적용 → 정렬된 충족 종목 (잘못된 조건식·정렬 기준이면 ValueError)"""
+        condition = compile_conditions(conditions)
+        sort_ref = compile_reference(sort)
+        if market and market not in MARKETS:
+            raise ValueError(f"unknown market: {market}")
+
+        started = time.perf_counter()
+        self._sync()
+        valid, ind, current, last = self._indicators()
+        prepared = time.perf_counter()
+        if len(valid):
+            with np.errstate(invalid="ignore"):
+                matched = condition.latest_many(ind, last, current)
+                keys = sort_ref.latest_many(ind, last, current)
+        else:
+            matched, keys = np.zeros(0, dtype=bool), np.zeros(0)
+        if market:
+            matched &= self.markets[valid] == market
+        hits = np.flatnonzero(matched)
+        order = np.where(np.isfinite(keys[hits]), keys[hits], -np.inf if descending else np.inf)
+        hits = hits[np.argsort(-order if descending else order, kind="stable")][:limit]
+        evaluated = time.perf_counter()
+
+        now = time.time()
+        with self._lock:
+            results = []
+            for j in hits:
+                i = valid[j]
+                results.append({
+                    "stock_code": str(self.codes[i]), "stock_name": self.names[i],
+                    "market": str(self.markets[i]),
+                    **{f: float(self.quotes[f][i]) if f == "change_rate" else int(self.quotes[f][i])
+                       for f in QUOTE_FIELDS},
+                    "sort_value": float(keys[j]) if np.isfinite(keys[j]) else None,
+                    "age_s": round(now - self.updated[i], 1),
+                })
+            ages = now - self.updated[self.updated > 0]
+        return {
+            "hits": results,
+            "matched": int(matched.sum()),
+            "universe": int(len(self.codes)),
+            "quoted": int(len(valid)),
+            "oldest_age_s": round(float(ages.max()), 1) if len(ages) else None,
+            "elapsed_ms": {
+                "prepare_ms": round((prepared - started) * 1000, 1),
+                "evaluate_ms": round((evaluated - prepared) * 1000, 1),
+            },
+        }
+
+    def status(self) -> dict:
+        self._sync()
+        now = time.time()
+        with self._lock:
+            quoted = self.updated > 0
+            ages = now - self.updated[quoted]
+            return {
+                "universe": int(len(self.codes)),
+                "by_market": {m: int((self.markets == m).sum()) for m in MARKETS},
+                "quoted": int(quoted.sum()),
+                "oldest_age_s": round(float(ages.max()), 1) if len(ages) else None,
+                "median_age_s": round(float(np.median(ages)), 1) if len(ages) else None,
+                "universe_date": self.universe_date,
+                "history_loaded": self._history is not None,
+                "last_refresh": self.last_refresh,
+            }
+
+
+_screener = None
+_screener_lock = threading.Lock()
+
+
+def get_screener() -> Screener:
+    """프로세스 공용 Screener (스냅샷은 QUOTE_CACHE_PATH 파일로 워커 간 공유)"""
+    global _screener
+    if _screener is None:
+        with _screener_lock:
+            if _screener is None:
+                _screener = Screener(current_app.config["QUOTE_CACHE_PATH"])
+    return _screener
+
+
+def refresh_job(app) -> dict:
+    """스케줄러용: 유니버스를 확인하고 시간 예산만큼 스냅샷 갱신"""
+    with app.app_context():
+        screener = get_screener()
+        screener.ensure_universe()
+    return screener.refresh(app)
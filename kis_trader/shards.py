@@ -0,0 +1,191 @@
+"""
+전략 실행 샤딩 (RUNNER_WORKERS > 0)
+- 스케줄러 리더가 작업 프로세스 N 개를 spawn 하고 죽으면 다시 띄움 (분 주기 run_strategies 작업 대신)
+- 작업 프로세스는 runner_workers 테이블에 생존 신호를 남기고, 살아 있는 작업 프로세스 목록으로
+  일관 해시 링을 만들어 종목 코드(포트폴리오는 portfolio#id)가 자기 몫인 전략만 평가
+  → 프로세스가 들어오거나 빠지면 그 프로세스 몫의 종목만 옮겨 감 (RUNNER_WORKER_TTL 안에 재배정)
+- 멤버십이 바뀌는 순간 두 프로세스가 같은 종목을 자기 몫으로 볼 수 있으므로
+  주기마다 runner_claims 에 (주기, 종목) 행을 먼저 선점한 프로세스만 실행 → 중복 주문 없음
+- 종목이 프로세스에 고정되므로 프로세스 메모리의 지표 캐시(for_bars)·모델·잔고 캐시가 자기 종목만 담음
+  (현재가는 실시간 시세가 채우는 워커 공유 캐시 quote_cache 를 그대로 씀)
+- KIS 속도 제한은 모든 프로세스(웹 워커·리더·작업 프로세스)가 나눠 쓰는 공유 버킷이므로 설정값 그대로 넘김
+  (작업 프로세스는 전략 레인, 리더의 배치 작업은 배치 레인으로 같은 한도 안에서 경쟁)
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from bisect import bisect
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+_PICKLABLE = (str, int, float, bool, type(None), list, tuple, dict)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.sha1(value.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """일관 해시 링 — 작업 프로세스마다 vnodes 개 점을 찍고 키는 시계 방향 첫 점의 주인에게"""
+
+    def __init__(self, workers: list, vnodes: int = 64):
+        points = sorted((_hash(f"{w}#{i}"), w) for w in workers for i in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._owners = [w for _, w in points]
+
+    def owner(self, key: str):
+        if not self._owners:
+            return None
+        return self._owners[bisect(self._hashes, _hash(key)) % len(self._owners)]
+
+
+def live_workers(ttl: float) -> list:
+    """최근 ttl 초 안에 생존 신호를 남긴 작업 프로세스 id (앱 컨텍스트 필요)"""
+    from models import RunnerWorker
+    since = datetime.utcnow() - timedelta(seconds=ttl)
+    return sorted(w.worker_id for w in RunnerWorker.query.filter(RunnerWorker.heartbeat_at >= since).all())
+
+
+class ShardWorker:
+    """작업 프로세스 하나 — 생존 신호 스레드 + 주기 경계마다 자기 몫의 전략 평가"""
+
+    def __init__(self, app):
+        self.app = app
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        cfg = app.config
+        self.interval = int(cfg.get("STRATEGY_INTERVAL_SECONDS", 60))
+        self.heartbeat = float(cfg.get("RUNNER_HEARTBEAT_SECONDS", 5))
+        self.ttl = float(cfg.get("RUNNER_WORKER_TTL", 15))
+        self.vnodes = int(cfg.get("RUNNER_HASH_VNODES", 64))
+        self._parent = os.getppid()
+        self._stats = {"groups": 0, "last_cycle_ms": 0.0}
+
+    def _beat(self) -> None:
+        from db import db
+        from models import RunnerWorker
+        with self.app.app_context():
+            row = db.session.get(RunnerWorker, self.worker_id)
+            if row is None:
+                row = RunnerWorker(worker_id=self.worker_id)
+                db.session.add(row)
+            row.heartbeat_at = datetime.utcnow()
+            row.groups = self._stats["groups"]
+            row.last_cycle_ms = self._stats["last_cycle_ms"]
+            # 오래전에 빠진 작업 프로세스 행 정리
+            RunnerWorker.query.filter(
+                RunnerWorker.heartbeat_at < datetime.utcnow() - timedelta(seconds=self.ttl * 10)).delete()
+            db.session.commit()
+
+    def _heartbeat_loop(self) -> None:
+        while True:
+            if os.getppid() != self._parent:
+                logger.warning(f"Runner worker {self.worker_id}: supervisor gone, exiting")
+                os._exit(0)  # 리더가 죽으면 새 리더가 띄운 작업 프로세스에 넘김
+            try:
+                self._beat()
+            except Exception as e:
+                logger.error(f"Runner worker {self.worker_id} heartbeat error: {e}")
+            time.sleep(self.heartbeat)
+
+    def _claim(self, cycle: int, keys: list) -> set:
+        """이번 주기의 키를 선점 → 실제로 맡게 된 키"""
+        from sqlalchemy.dialects.sqlite import insert
+        from db import db
+        from models import RunnerClaim
+        rows = [{"cycle": cycle, "key": k, "worker_id": self.worker_id} for k in keys]
+        for i in range(0, len(rows), 300):  # SQLite 바인딩 변수 한도 내로 나눠 삽입
+            db.session.execute(insert(RunnerClaim).values(rows[i:i + 300]).on_conflict_do_nothing())
+        RunnerClaim.query.filter(RunnerClaim.cycle < cycle - 10).delete()
+        db.session.commit()
+        return {c.key for c in RunnerClaim.query.filter_by(cycle=cycle, worker_id=self.worker_id).all()}
+
+    def run_once(self, cycle: int) -> dict:
+        """주기 하나: 살아 있는 작업 프로세스로 링을 만들고 자기 몫을 선점해 평가"""
+        from strategies.runner import active_groups, is_auction_time, is_market_hours, run_cycle
+        with self.app.app_context():
+            if not is_market_hours() or is_auction_time():
+                return {}
+            ring = HashRing(live_workers(self.ttl) or [self.worker_id], self.vnodes)
+            groups, portfolios = active_groups()
+            mine = {code for code, _ in groups if ring.owner(code) == self.worker_id}
+            mine |= {f"portfolio#{sid}" for sid in portfolios if ring.owner(f"portfolio#{sid}") == self.worker_id}
+            claimed = self._claim(cycle, sorted(mine))
+        groups = {k: ids for k, ids in groups.items() if k[0] in claimed}
+        portfolios = [sid for sid in portfolios if f"portfolio#{sid}" in claimed]
+        start = time.perf_counter()
+        run_cycle(self.app, groups, portfolios)
+        self._stats = {"groups": len(groups) + len(portfolios),
+                       "last_cycle_ms": round((time.perf_counter() - start) * 1000, 1)}
+        return {"cycle": cycle, "groups": len(groups), "portfolios": len(portfolios), **self._stats}
+
+    def run_forever(self) -> None:
+        threading.Thread(target=self._heartbeat_loop, daemon=True, name="runner-heartbeat").start()
+        logger.info(f"Runner worker {self.worker_id} started")
+        while True:
+            now = time.time()
+            cycle = int(now // self.interval) + 1
+            time.sleep(cycle * self.interval - now)  # 모든 작업 프로세스가 같은 주기 경계에서 시작
+            try:
+                self.run_once(cycle)
+            except Exception as e:
+                logger.error(f"Runner worker {self.worker_id} cycle {cycle} error: {e}")
+
+
+def worker_main(config: dict) -> None:
+    """spawn 된 작업 프로세스 진입점 — 부모 설정으로 자체 앱(스케줄러 없음)을 만들어 실행"""
+    logging.basicConfig(level=logging.INFO)
+    from app import create_app
+    ShardWorker(create_app(config)).run_forever()
+
+
+def _worker_config(app) -> dict:
+    cfg = {k: v for k, v in app.config.items() if k.isupper() and isinstance(v, _PICKLABLE)}
+    if not cfg.get("KIS_RATE_LIMIT_SHARED", True):
+        logger.error("KIS_RATE_LIMIT_SHARED is off: each runner worker gets the full rate limit")
+    return cfg
+
+
+_processes: list = []
+
+
+def start_workers(app) -> None:
+    """작업 프로세스 RUNNER_WORKERS 개를 띄우고 감시 스레드가 죽은 프로세스를 다시 띄움 (리더에서 한 번)"""
+    ctx = multiprocessing.get_context("spawn")  # 스케줄러·웹서버 스레드가 도는 프로세스라 fork 대신 spawn
+    config = _worker_config(app)
+    heartbeat = float(app.config.get("RUNNER_HEARTBEAT_SECONDS", 5))
+
+    def spawn(index: int):
+        proc = ctx.Process(target=worker_main, args=(config,), daemon=True, name=f"runner-worker-{index}")
+        proc.start()
+        return proc
+
+    _processes[:] = [spawn(i) for i in range(int(app.config["RUNNER_WORKERS"]))]
+
+    def supervise():
+        while True:
+            time.sleep(heartbeat)
+            for i, proc in enumerate(_processes):
+                if not proc.is_alive():
+                    logger.warning(f"Runner worker {proc.pid} exited ({proc.exitcode}), restarting")
+                    _processes[i] = spawn(i)
+
+    threading.Thread(target=supervise, daemon=True, name="runner-supervisor").start()
+
+
+def status(app) -> dict:
+    """작업 프로세스 목록과 생존 여부 (앱 컨텍스트 필요)"""
+    from models import RunnerWorker
+    ttl = float(app.config.get("RUNNER_WORKER_TTL", 15))
+    since = datetime.utcnow() - timedelta(seconds=ttl)
+    return {
+        "workers": int(app.config.get("RUNNER_WORKERS", 0)),
+        "members": [{"worker_id": w.worker_id, "alive": w.heartbeat_at >= since,
+                     "started_at": w.started_at.isoformat(), "heartbeat_at": w.heartbeat_at.isoformat(),
+                     "groups": w.groups, "last_cycle_ms": w.last_cycle_ms}
+                    for w in RunnerWorker.query.order_by(RunnerWorker.worker_id).all()],
+    }
@@ -0,0 +1 @@
+"""로컬 KIS API 스탠드인 서버 (개발·테스트용)"""
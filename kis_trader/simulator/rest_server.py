@@ -0,0 +1,454 @@
+"""
+KIS REST API 스탠드인 서버
+- kis_api 가 쓰는 엔드포인트 구현: tokenP, Approval, inquire-price, intstock-multprice,
+  inquire-daily-itemchartprice, inquire-index-price, chk-holiday, order-cash, inquire-balance
+  (연속조회 tr_cont / CTX_AREA_NK100 포함)
+- GET /common/master/{kospi,kosdaq}_code.mst.zip: universe 개 종목의 종목 마스터 (스크리너용)
+- 종목별 시드 고정 랜덤워크로 일봉 이력·현재가 생성, 주문은 즉시 체결되어 잔고에 반영
+- latency/jitter(초), error_rate(500 응답 비율), rate_limit(앱키별 초당 건수, 초과 시 EGW00201)
+- record: 응답을 JSONL 로 기록, replay: 기록한 응답을 같은 요청 키 순서대로 재생 (없으면 생성)
+- GET /sim/stats 로 엔드포인트별 호출·거절 수 조회
+
+실행: cd kis_trader && python -m simulator.rest_server --port 29443 --rate-limit 2
+      KIS_PAPER_BASE_URL=http://127.0.0.1:29443 python run.py
+"""
+import argparse
+import io
+import json
+import random
+import secrets
+import threading
+import time
+import zipfile
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+HISTORY_DAYS = 3650          # 생성하는 일봉 이력 길이(달력일)
+CHART_MAX_ROWS = 100         # 기간별 시세 한 번에 주는 최대 행 수
+INDEX_BASE = {"0001": 2600.0, "1001": 850.0}
+MASTER_TAILS = {"kospi_code": 227, "kosdaq_code": 221}  # 종목 마스터 줄 끝 고정 길이 영역 폭
+
+THROTTLED = {"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "초당 거래건수를 초과하였습니다."}
+EXPIRED = {"rt_cd": "1", "msg_cd": "EGW00123", "msg1": "기간이 만료된 token 입니다."}
+FAILED = {"rt_cd": "1", "msg_cd": "SIM00500", "msg1": "simulated server error"}
+
+
+class _Bucket:
+    """앱키별 토큰 버킷 (초당 rate 건)"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class Market:
+    """종목별 일봉 이력·현재가·계좌 잔고 (시드 고정)"""
+
+    def __init__(self, seed: int = 0, holdings: int = 0, universe: int = 100):
+        self.seed = seed
+        self.universe = universe
+        self._bars: dict = {}
+        self._prices: dict = {}
+        self._positions: dict = {}      # stock_code → [qty, avg_price]
+        self._order_no = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        rng = random.Random(seed)
+        for _ in range(holdings):
+            code = f"{rng.randint(0, 999999):06d}"
+            self._positions[code] = [rng.randint(1, 100), float(self.price(code)["price"])]
+
+    @staticmethod
+    def _tick(price: float) -> int:
+        return max(10, int(round(price / 10.0)) * 10)
+
+    def bars(self, stock_code: str) -> list:
+        """과거 → 최신 순 일봉 (평일만, 어제까지)"""
+        with self._lock:
+            bars = self._bars.get(stock_code)
+            if bars is not None:
+                return bars
+            rng = random.Random(f"{self.seed}:{stock_code}")
+            close = rng.randint(50, 2000) * 100.0
+            today = date.today()
+            bars = []
+            day = today - timedelta(days=HISTORY_DAYS)
+            while day < today:
+                if day.weekday() < 5:
+                    open_ = close * (1 + rng.gauss(0, 0.005))
+                    close = max(1000.0, close * (1 + rng.gauss(0, 0.02)))
+                    high = max(open_, close) * (1 + abs(rng.gauss(0, 0.008)))
+                    low = min(open_, close) * (1 - abs(rng.gauss(0, 0.008)))
+                    bars.append({
+                        "date": day.strftime("%Y%m%d"),
+                        "open": self._tick(open_), "high": self._tick(high),
+                        "low": self._tick(low), "close": self._tick(close),
+                        "volume": rng.randint(10_000, 5_000_000),
+                    })
+                day += timedelta(days=1)
+            self._bars[stock_code] = bars
+            return bars
+
+    def price(self, stock_code: str) -> dict:
+        """전일 종가에서 시작하는 장중 랜덤워크 현재가"""
+        bars = self.bars(stock_code)
+        with self._lock:
+            prev = bars[-1]["close"]
+            quote = self._prices.get(stock_code)
+            if quote is None:
+                quote = self._prices[stock_code] = {
+                    "price": prev, "open": prev, "high": prev, "low": prev, "volume": 0,
+                }
+            step = self._rng.choice((-1, 0, 0, 1)) * self._tick(prev * 0.001)
+            p = max(10, quote["price"] + step)
+            quote.update(price=p, high=max(quote["high"], p), low=min(quote["low"], p),
+                         volume=quote["volume"] + self._rng.randint(0, 5000))
+            return {**quote, "change_rate": round((p - prev) / prev * 100, 2)}
+
+    def master(self, name: str) -> bytes:
+        """종목 마스터 zip — 단축코드(9) + 표준코드(12) + 한글명 + 고정 길이 영역(그룹코드로 시작), cp949
+
+        유가증권·코스닥에 절반씩, 열 개 중 하나는 ETF(EF)라 스크리너가 걸러야 한다.
+        """
+        rng = random.Random(f"{self.seed}:universe")
+        codes = sorted({f"{rng.randint(0, 999999):06d}" for _ in range(self.universe)})
+        half = (len(codes) + 1) // 2
+        codes = codes[:half] if name == "kospi_code" else codes[half:]
+        tail = MASTER_TAILS[name]
+        lines = []
+        for i, code in enumerate(codes):
+            group = "EF" if i % 10 == 9 else "ST"
+            lines.append(f"{code:<9}KR7{code}000모의{code}{group}{'0' * (tail - 2)}")
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(f"{name}.mst", ("\n".join(lines) + "\n").encode("cp949"))
+        return buf.getvalue()
+
+    def fill(self, stock_code: str, side: str, qty: int, price: int) -> str:
+        """주문 즉시 체결 → 주문번호"""
+        if price <= 0:
+            price = self.price(stock_code)["price"]
+        with self._lock:
+            self._order_no += 1
+            qty_held, avg = self._positions.get(stock_code, [0, 0.0])
+            if side == "buy":
+                total = qty_held + qty
+                self._positions[stock_code] = [total, (qty_held * avg + qty * price) / total]
+            elif qty_held - qty > 0:
+                self._positions[stock_code] = [qty_held - qty, avg]
+            else:
+                self._positions.pop(stock_code, None)
+            return f"{self._order_no:010d}"
+
+    def positions(self) -> list:
+        with self._lock:
+            items = sorted(self._positions.items())
+        return [(code, qty, avg, self.price(code)["price"]) for code, (qty, avg) in items]
+
+
+class RestStandInServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, rate_limit: float = 0.0,
+                 page_size: int = 20, holdings: int = 0, record: str = None,
+                 replay: str = None, seed: int = 0, universe: int = 100):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.page_size = page_size
+        self.market = Market(seed, holdings, universe)
+        self._rng = random.Random(seed)
+        self._tokens: set = set()
+        self._buckets: dict = {}
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"count": 0, "throttled": 0, "errors": 0, "replayed": 0})
+        self._record = open(record, "a", encoding="utf-8") if record else None
+        self._replay = self._load_replay(replay) if replay else {}
+        self._replay_pos: dict = {}
+        self._server = None
+
+    # ── 서버 수명 ────────────────────────────────────────────────
+    def start(self) -> "RestStandInServer":
+        server = self
+
+        class Handler(_Handler):
+            sim = server
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._record:
+            self._record.close()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def expire_tokens(self) -> None:
+        """발급한 토큰 전부 만료 → 이후 호출은 EGW00123"""
+        with self._lock:
+            self._tokens.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: dict(st) for name, st in self._stats.items()}
+
+    # ── 기록/재생 ────────────────────────────────────────────────
+    @staticmethod
+    def _key(method: str, path: str, tr_id: str, params: dict) -> str:
+        return json.dumps([method, path, tr_id, params], sort_keys=True, ensure_ascii=False)
+
+    def _load_replay(self, path: str) -> dict:
+        entries = defaultdict(list)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    e = json.loads(line)
+                    key = self._key(e["method"], e["path"], e["tr_id"], e["params"])
+                    entries[key].append((e["status"], e["headers"], e["body"]))
+        return dict(entries)
+
+    def _replayed(self, key: str):
+        responses = self._replay.get(key)
+        if not responses:
+            return None
+        with self._lock:
+            i = self._replay_pos.get(key, 0)
+            self._replay_pos[key] = i + 1
+        return responses[min(i, len(responses) - 1)]
+
+    def _write_record(self, method, path, tr_id, params, status, headers, body) -> None:
+        line = json.dumps({"method": method, "path": path, "tr_id": tr_id, "params": params,
+                           "status": status, "headers": headers, "body": body}, ensure_ascii=False)
+        with self._lock:
+            self._record.write(line + "\n")
+            self._record.flush()
+
+    # ── 요청 처리 ────────────────────────────────────────────────
+    def handle(self, method: str, path: str, headers, params: dict) -> tuple:
+        """→ (status, 응답 헤더 dict, 응답 body dict)"""
+        name = path.rsplit("/", 1)[-1]
+        tr_id = headers.get("tr_id", "")
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self._rng.uniform(0, self.jitter))
+
+        with self._lock:
+            st = self._stats[name]
+            st["count"] += 1
+            throttled = False
+            if self.rate_limit > 0 and name not in ("tokenP", "Approval"):
+                bucket = self._buckets.setdefault(headers.get("appkey", ""), _Bucket(self.rate_limit))
+                throttled = not bucket.take()
+            if throttled:
+                st["throttled"] += 1
+                return 500, {}, THROTTLED
+            if self.error_rate and self._rng.random() < self.error_rate:
+                st["errors"] += 1
+                return 500, {}, FAILED
+            authorized = headers.get("authorization", "").removeprefix("Bearer ") in self._tokens
+
+        if name not in ("tokenP", "Approval") and not authorized:
+            return 500, {}, EXPIRED
+
+        key = self._key(method, path, tr_id, params)
+        replayed = self._replayed(key) if self._replay else None
+        if replayed is not None:
+            with self._lock:
+                st["replayed"] += 1
+            status, resp_headers, body = replayed
+            if name == "tokenP" and "access_token" in body:
+                with self._lock:
+                    self._tokens.add(body["access_token"])
+        else:
+            handler = getattr(self, "_" + name.replace("-", "_"), None)
+            if handler is None:
+                return 404, {}, {"rt_cd": "1", "msg_cd": "SIM00404", "msg1": f"unknown path {path}"}
+            status, resp_headers, body = handler(headers, params)
+        if self._record:
+            self._write_record(method, path, tr_id, params, status, resp_headers, body)
+        return status, resp_headers, body
+
+    def _tokenP(self, headers, params) -> tuple:
+        token = secrets.token_hex(32)
+        with self._lock:
+            self._tokens.add(token)
+        expires = datetime.now() + timedelta(days=1)
+        return 200, {}, {"access_token": token, "token_type": "Bearer", "expires_in": 86400,
+                         "access_token_token_expired": expires.strftime("%Y-%m-%d %H:%M:%S")}
+
+    def _Approval(self, headers, params) -> tuple:
+        return 200, {}, {"approval_key": secrets.token_hex(18)}
+
+    def _inquire_price(self, headers, params) -> tuple:
+        q = self.market.price(params.get("FID_INPUT_ISCD", ""))
+        return 200, {}, {"rt_cd": "0", "msg_cd": "MCA00000", "msg1": "정상처리 되었습니다.", "output": {
+            "stck_prpr": str(q["price"]), "prdy_ctrt": f"{q['change_rate']:.2f}",
+            "acml_vol": str(q["volume"]), "stck_hgpr": str(q["high"]),
+            "stck_lwpr": str(q["low"]), "stck_oprc": str(q["open"]),
+        }}
+
+    def _intstock_multprice(self, headers, params) -> tuple:
+        rows = []
+        for i in range(1, 31):
+            code = params.get(f"FID_INPUT_ISCD_{i}")
+            if not code:
+                break
+            q = self.market.price(code)
+            prev = self.market.bars(code)[-1]["close"]
+            rows.append({
+                "inter_shrn_iscd": code, "inter_kor_isnm": f"모의{code}",
+                "inter2_prpr": str(q["price"]), "prdy_ctrt": f"{q['change_rate']:.2f}",
+                "acml_vol": str(q["volume"]), "inter2_oprc": str(q["open"]),
+                "inter2_hgpr": str(q["high"]), "inter2_lwpr": str(q["low"]),
+                "inter2_prdy_clpr": str(prev), "acml_tr_pbmn": str(q["volume"] * q["price"]),
+            })
+        return 200, {}, {"rt_cd": "0", "msg_cd": "MCA00000", "msg1": "정상처리 되었습니다.", "output": rows}
+
+    def _inquire_daily_itemchartprice(self, headers, params) -> tuple:
+        code = params.get("FID_INPUT_ISCD", "")
+        start = params.get("FID_INPUT_DATE_1", "19000101")
+        end = params.get("FID_INPUT_DATE_2", "99991231")
+        rows = [b for b in reversed(self.market.bars(code)) if start <= b["date"] <= end]
+        q = self.market.price(code)
+        return 200, {}, {"rt_cd": "0", "msg_cd": "MCA00000", "msg1": "정상처리 되었습니다.",
+                         "output1": {"stck_prpr": str(q["price"]), "stck_shrn_iscd": code},
+                         "output2": [{
+                             "stck_bsop_date": b["date"], "stck_oprc": str(b["open"]),
+                             "stck_hgpr": str(b["high"]), "stck_lwpr": str(b["low"]),
+                             "stck_clpr": str(b["close"]), "acml_vol": str(b["volume"]),
+                         } for b in rows[:CHART_MAX_ROWS]]}
+
+    def _inquire_index_price(self, headers, params) -> tuple:
+        base = INDEX_BASE.get(params.get("FID_INPUT_ISCD", ""), 1000.0)
+        value = round(base * (1 + self._rng.gauss(0, 0.005)), 2)
+        return 200, {}, {"rt_cd": "0", "msg_cd": "MCA00000", "msg1": "정상처리 되었습니다.", "output": {
+            "bstp_nmix_prpr": f"{value:.2f}", "bstp_nmix_prdy_vrss": f"{value - base:.2f}",
+            "bstp_nmix_prdy_ctrt": f"{(value - base) / base * 100:.2f}",
+            "bstp_nmix_oprc": f"{base:.2f}", "bstp_nmix_hgpr": f"{max(base, value):.2f}",
+            "bstp_nmix_lwpr": f"{min(base, value):.2f}", "acml_vol": "350000",
+        }}
+
+    def _chk_holiday(self, headers, params) -> tuple:
+        # 주말만 휴장 (기준일부터 14일)
+        start = datetime.strptime(params.get("BASS_DT") or date.today().strftime("%Y%m%d"), "%Y%m%d").date()
+        days = [start + timedelta(days=i) for i in range(14)]
+        return 200, {}, {"rt_cd": "0", "msg_cd": "MCA00000", "msg1": "정상처리 되었습니다.", "output": [
+            {"bass_dt": d.strftime("%Y%m%d"), "opnd_yn": "Y" if d.weekday() < 5 else "N"} for d in days]}
+
+    def _order_cash(self, headers, params) -> tuple:
+        side = "sell" if headers.get("tr_id", "") in ("VTTC0801U", "TTTC0801U") else "buy"
+        order_no = self.market.fill(params.get("PDNO", ""), side, int(params.get("ORD_QTY", 0)),
+                                    int(params.get("ORD_UNPR", 0)))
+        label = "매도" if side == "sell" else "매수"
+        return 200, {}, {"rt_cd": "0", "msg_cd": "40600000", "msg1": f"모의투자 {label}주문이 완료 되었습니다.",
+                         "output": {"KRX_FWDG_ORD_ORGNO": "00950", "ODNO": order_no,
+                                    "ORD_TMD": datetime.now().strftime("%H%M%S")}}
+
+    def _inquire_balance(self, headers, params) -> tuple:
+        positions = self.market.positions()
+        offset = int(params.get("CTX_AREA_NK100") or 0) if headers.get("tr_cont") == "N" else 0
+        page = positions[offset:offset + self.page_size]
+        more = offset + self.page_size < len(positions)
+        rows = [{
+            "pdno": code, "prdt_name": f"SIM{code}", "hldg_qty": str(qty),
+            "pchs_avg_pric": f"{avg:.4f}", "prpr": str(price),
+            "evlu_pfls_amt": str(int((price - avg) * qty)),
+            "evlu_pfls_rt": f"{(price - avg) / avg * 100:.2f}",
+        } for code, qty, avg, price in page]
+        nk100 = str(offset + self.page_size) if more else ""
+        return 200, {"tr_cont": "M" if more else "D"}, {
+            "rt_cd": "0", "msg_cd": "20310000", "msg1": "모의투자 조회가 완료되었습니다.",
+            "ctx_area_fk100": params.get("CTX_AREA_FK100", ""), "ctx_area_nk100": nk100,
+            "output1": rows, "output2": [{"dnca_tot_amt": "100000000"}],
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    sim: RestStandInServer = None
+    protocol_version = "HTTP/1.1"       # keep-alive (kis_http 풀 재사용 확인용)
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, status: int, headers: dict, body: dict) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/sim/stats":
+            self._respond(200, {}, self.sim.stats())
+            return
+        name = url.path.rsplit("/", 1)[-1].removesuffix(".mst.zip")
+        if url.path.startswith("/common/master/") and name in MASTER_TAILS:
+            data = self.sim.market.master(name)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/zip")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        self._respond(*self.sim.handle("GET", url.path, self.headers, dict(parse_qsl(url.query))))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        params = json.loads(self.rfile.read(length) or b"{}")
+        self._respond(*self.sim.handle("POST", urlsplit(self.path).path, self.headers, params))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KIS REST API 스탠드인 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=29443)
+    parser.add_argument("--latency", type=float, default=0.0, help="응답 지연(초)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="추가 랜덤 지연 상한(초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 응답 비율 (0~1)")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="앱키별 초당 허용 건수 (0=무제한)")
+    parser.add_argument("--page-size", type=int, default=20, help="잔고 조회 한 페이지 행 수")
+    parser.add_argument("--holdings", type=int, default=0, help="시작 시 보유 종목 수")
+    parser.add_argument("--record", help="응답을 기록할 JSONL 경로")
+    parser.add_argument("--replay", help="재생할 JSONL 경로")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--universe", type=int, default=100, help="종목 마스터에 넣을 종목 수")
+    args = parser.parse_args()
+    server = RestStandInServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                               args.rate_limit, args.page_size, args.holdings, args.record,
+                               args.replay, args.seed, args.universe).start()
+    print(f"KIS REST stand-in listening on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
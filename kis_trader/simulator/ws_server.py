@@ -0,0 +1,186 @@
+"""
+KIS 웹소켓 스탠드인 서버
+- 구독/해지 요청에 KIS 형식 JSON 으로 응답 (체결통보 구독 시 key/iv 발급)
+- 구독 종목마다 interval 초 간격으로 H0STCNT0 체결가 프레임 전송 (랜덤워크 가격)
+- 주기적 PINGPONG, inject_execution() 으로 AES 암호화된 체결통보 주입
+- drop_connections() 로 강제 끊김 → 클라이언트 재접속 확인
+
+실행: cd kis_trader && python -m simulator.ws_server --port 31000
+      REALTIME_ENABLED=1 KIS_PAPER_WS_URL=ws://127.0.0.1:31000 python run.py
+"""
+import argparse
+import base64
+import json
+import random
+import secrets
+import threading
+import time
+from datetime import datetime
+
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.server import serve
+
+PRICE_FIELDS = 46
+EXEC_FIELDS = 23
+
+
+def encrypt(text: str, key: str, iv: str) -> str:
+    from cryptography.hazmat.primitives import padding
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    padder = padding.PKCS7(128).padder()
+    padded = padder.update(text.encode("utf-8")) + padder.finalize()
+    encryptor = Cipher(algorithms.AES(key.encode()), modes.CBC(iv.encode())).encryptor()
+    return base64.b64encode(encryptor.update(padded) + encryptor.finalize()).decode()
+
+
+class StandInServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, interval: float = 0.5,
+                 ping_interval: float = 10.0, seed: int = None):
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.ping_interval = ping_interval
+        self._rng = random.Random(seed)
+        self._prices: dict = {}
+        self._conns: dict = {}          # connection → {"codes": set, "exec": {tr_id: (tr_key, key, iv)}}
+        self._lock = threading.Lock()
+        self._server = None
+
+    # ── 서버 수명 ────────────────────────────────────────────────
+    def start(self) -> "StandInServer":
+        self._server = serve(self._handler, self.host, self.port, compression=None)
+        self.port = self._server.socket.getsockname()[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def drop_connections(self) -> None:
+        with self._lock:
+            conns = list(self._conns)
+        for ws in conns:
+            ws.close()
+
+    def subscriptions(self) -> set:
+        with self._lock:
+            return set().union(*(c["codes"] for c in self._conns.values())) if self._conns else set()
+
+    # ── 푸시 ────────────────────────────────────────────────────
+    def _price_frame(self, code: str) -> str:
+        base = self._prices.setdefault(code, self._rng.randint(10, 900) * 100)
+        price = max(100, base + self._rng.choice((-100, 0, 100)))
+        self._prices[code] = price
+        fields = ["0"] * PRICE_FIELDS
+        fields[0] = code
+        fields[1] = datetime.now().strftime("%H%M%S")
+        fields[2] = str(price)
+        fields[5] = f"{self._rng.uniform(-3, 3):.2f}"
+        fields[7], fields[8], fields[9] = str(price - 100), str(price + 200), str(price - 200)
+        fields[13] = str(self._rng.randint(1000, 10 ** 7))
+        return f"0|H0STCNT0|001|{'^'.join(fields)}"
+
+    def inject_execution(self, order_no: str, stock_code: str, side: str = "buy",
+                         qty: int = 1, price: int = 0, filled: bool = True) -> int:
+        """체결통보 구독 중인 모든 연결에 체결통보 전송 → 전송한 연결 수"""
+        fields = [""] * EXEC_FIELDS
+        fields[2] = order_no
+        fields[4] = "01" if side == "sell" else "02"
+        fields[8] = stock_code
+        fields[9] = str(qty)
+        fields[10] = str(price)
+        fields[11] = datetime.now().strftime("%H%M%S")
+        fields[12] = "0"
+        fields[13] = "2" if filled else "1"
+        sent = 0
+        with self._lock:
+            targets = [(ws, tr_id, key, iv) for ws, c in self._conns.items()
+                       for tr_id, (_, key, iv) in c["exec"].items()]
+        for ws, tr_id, key, iv in targets:
+            try:
+                ws.send(f"1|{tr_id}|001|{encrypt('^'.join(fields), key, iv)}")
+                sent += 1
+            except ConnectionClosed:
+                pass
+        return sent
+
+    # ── 연결 처리 ────────────────────────────────────────────────
+    def _reply(self, ws, tr_id: str, tr_key: str, msg: str, output: dict = None) -> None:
+        body = {"rt_cd": "0", "msg_cd": "OPSP0000", "msg1": msg}
+        if output:
+            body["output"] = output
+        ws.send(json.dumps({"header": {"tr_id": tr_id, "tr_key": tr_key, "encrypt": "N"},
+                            "body": body}))
+
+    def _on_message(self, ws, state: dict, raw: str) -> None:
+        req = json.loads(raw)
+        tr_type = req["header"]["tr_type"]
+        tr_id = req["body"]["input"]["tr_id"]
+        tr_key = req["body"]["input"]["tr_key"]
+        with self._lock:
+            if tr_id == "H0STCNT0":
+                (state["codes"].add if tr_type == "1" else state["codes"].discard)(tr_key)
+                output = {"iv": secrets.token_hex(8), "key": secrets.token_hex(16)}
+            elif tr_type == "1":
+                output = {"iv": secrets.token_hex(8), "key": secrets.token_hex(16)}
+                state["exec"][tr_id] = (tr_key, output["key"], output["iv"])
+            else:
+                state["exec"].pop(tr_id, None)
+                output = None
+        self._reply(ws, tr_id, tr_key, "SUBSCRIBE SUCCESS" if tr_type == "1" else "UNSUBSCRIBE SUCCESS",
+                    output)
+
+    def _handler(self, ws) -> None:
+        state = {"codes": set(), "exec": {}}
+        with self._lock:
+            self._conns[ws] = state
+        next_tick = time.monotonic()
+        next_ping = time.monotonic() + self.ping_interval
+        try:
+            while True:
+                timeout = max(0.0, min(next_tick, next_ping) - time.monotonic())
+                try:
+                    self._on_message(ws, state, ws.recv(timeout=timeout))
+                    continue
+                except TimeoutError:
+                    pass
+                now = time.monotonic()
+                if now >= next_tick:
+                    with self._lock:
+                        codes = sorted(state["codes"])
+                    for code in codes:
+                        ws.send(self._price_frame(code))
+                    next_tick = now + self.interval
+                if now >= next_ping:
+                    ws.send(json.dumps({"header": {"tr_id": "PINGPONG",
+                                                   "datetime": datetime.now().strftime("%Y%m%d%H%M%S")}}))
+                    next_ping = now + self.ping_interval
+        except ConnectionClosed:
+            pass
+        finally:
+            with self._lock:
+                self._conns.pop(ws, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KIS 웹소켓 스탠드인 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=31000)
+    parser.add_argument("--interval", type=float, default=0.5, help="종목별 체결가 전송 간격(초)")
+    args = parser.parse_args()
+    server = StandInServer(args.host, args.port, args.interval).start()
+    print(f"KIS websocket stand-in listening on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
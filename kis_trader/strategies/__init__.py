@@ -1,2 +1,2 @@
-from .runner import run_strategies, is_auction_time, is_market_hours
+from .runner import PORTFOLIO_TYPES, run_strategies, is_auction_time, is_market_hours
 from .ml_strategy import train_model
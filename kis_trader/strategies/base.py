@@ -1,10 +1,35 @@
+import json
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from .indicators import IndicatorSet, IndicatorStream
+
+# 전략 인스턴스는 사이클마다 새로 만들어지므로 지표 스트림은 여기서 유지
+# 키: (전략 클래스, 스트림 이름, 종목, 파라미터)
+_streams: OrderedDict = OrderedDict()
+_streams_lock = threading.Lock()
+_MAX_STREAMS = 2048
+
 
 class BaseStrategy(ABC):
     def __init__(self, stock_code: str, params: dict):
         self.stock_code = stock_code
         self.params = params
 
+    def _stream(self, name: str, factory) -> IndicatorStream:
+        """이 전략(종목+파라미터)의 지표 스트림 — factory() 는 {이름: 노드} 반환"""
+        key = (type(self).__name__, name, self.stock_code,
+               json.dumps(self.params, sort_keys=True, default=str))
+        with _streams_lock:
+            stream = _streams.get(key)
+            if stream is None:
+                stream = _streams[key] = IndicatorStream(factory)
+                while len(_streams) > _MAX_STREAMS:
+                    _streams.popitem(last=False)
+            else:
+                _streams.move_to_end(key)
+        return stream
+
     @abstractmethod
     def should_buy(self, ohlcv: list, current: dict) -> bool:
         pass
@@ -13,19 +38,32 @@ class BaseStrategy(ABC):
     def should_sell(self, ohlcv: list, current: dict) -> bool:
         pass
 
+    def signals(self, ind: IndicatorSet) -> tuple:
+        """백테스트용 (buy, sell) bool 배열 — 봉 t 값은 t 까지의 봉, t 종가를 현재가로 본 판단
+
+        ind 가 (봉 × 종목) 2차원이면 결과도 같은 모양이다.
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no vectorized signals")
+
     def get_quantity(self) -> int:
         return int(self.params.get("buy_qty", 1))
 
+    @property
+    def stop_loss_pct(self) -> float:
+        return float(self.params.get("stop_loss_pct", -5.0))
+
+    @property
+    def take_profit_pct(self) -> float:
+        return float(self.params.get("take_profit_pct", 10.0))
+
     def check_stop_loss(self, avg_price: float, current_price: float) -> bool:
-        stop_pct = float(self.params.get("stop_loss_pct", -5.0))
         if avg_price <= 0:
             return False
         change = (current_price - avg_price) / avg_price * 100
-        return change <= stop_pct
+        return change <= self.stop_loss_pct
 
     def check_take_profit(self, avg_price: float, current_price: float) -> bool:
-        tp_pct = float(self.params.get("take_profit_pct", 10.0))
         if avg_price <= 0:
             return False
         change = (current_price - avg_price) / avg_price * 100
-        return change >= tp_pct
+        return change >= self.take_profit_pct
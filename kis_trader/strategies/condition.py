@@ -1,40 +1,298 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
 from .base import BaseStrategy
+from .indicators import IndicatorSet, for_bars
 
 OPERATORS = {
-    ">": lambda a, b: a > b,
-    "<": lambda a, b: a < b,
-    ">=": lambda a, b: a >= b,
-    "<=": lambda a, b: a <= b,
-    "==": lambda a, b: a == b,
+    ">": np.greater,
+    "<": np.less,
+    ">=": np.greater_equal,
+    "<=": np.less_equal,
+    "==": np.equal,
 }
+CROSS_OPERATORS = ("cross_above", "cross_below")
+
+_REF = re.compile(r"^\s*([a-z_][a-z0-9_]*)\s*(?:\((.*)\))?\s*$")
+
+
+def _args(text: str, name: str, defaults: tuple) -> tuple:
+    parts = [p.strip() for p in (text or "").split(",") if p.strip()]
+    if len(parts) > len(defaults):
+        raise ValueError(f"{name}() takes at most {len(defaults)} arguments")
+    try:
+        given = [int(p) for p in parts]
+    except ValueError:
+        raise ValueError(f"{name}() arguments must be integers: {text}")
+    if any(v <= 0 for v in given):
+        raise ValueError(f"{name}() arguments must be positive: {text}")
+    return tuple(given) + defaults[len(given):]
+
+
+def _change_rate(ind: IndicatorSet) -> np.ndarray:
+    # KIS 전일 대비율과 같은 소수 2자리
+    return np.round(ind.pct_change(1) * 100, 2)
+
+
+# 이름 → (기본 인자, 인자 → (ind → 배열))
+_FUNCTIONS = {
+    "ma":         ((20,), lambda n: lambda ind: ind.sma(n)),
+    "sma":        ((20,), lambda n: lambda ind: ind.sma(n)),
+    "ema":        ((20,), lambda n: lambda ind: ind.ema(n)),
+    "rsi":        ((14,), lambda n: lambda ind: ind.rsi(n)),
+    "macd":       ((12, 26, 9), lambda f, s, g: lambda ind: ind.macd(f, s, g)[0]),
+    "macd_signal": ((12, 26, 9), lambda f, s, g: lambda ind: ind.macd(f, s, g)[1]),
+    "macd_hist":  ((12, 26, 9), lambda f, s, g: lambda ind: ind.macd(f, s, g)[2]),
+    "vol_ratio":  ((20,), lambda n: lambda ind: ind.volume_ratio(n)),
+    "change":     ((1,), lambda n: lambda ind: ind.pct_change(n) * 100),  # n 봉 전 대비 %
+}
+_FIELDS = {
+    "price":       lambda ind: ind.close.astype(np.float64),
+    "close":       lambda ind: ind.close.astype(np.float64),
+    "open":        lambda ind: ind.open.astype(np.float64),
+    "high":        lambda ind: ind.high.astype(np.float64),
+    "low":         lambda ind: ind.low.astype(np.float64),
+    "volume":      lambda ind: ind.volume.astype(np.float64),
+    "change_rate": _change_rate,
+}
+
+
+class _Env:
+    """한 번의 평가에서 참조 값을 한 번만 계산 (current 가 있으면 마지막 봉의 시세 필드를 덮어씀)
+
+    봉 × 종목 배열이면 last(종목별 마지막 봉 행 번호)와 종목별 값 배열 current 를 함께 준다.
+    """
+
+    def __init__(self, ind: IndicatorSet, current: dict = None, last: np.ndarray = None):
+        self.ind = ind
+        self.current = current
+        self.last = last
+        self.values: dict = {}
+
+    def get(self, key: str, compute) -> np.ndarray:
+        value = self.values.get(key)
+        if value is None:
+            value = compute(self.ind)
+            if self.current is not None and key in self.current and len(value):
+                value = value.astype(np.float64)  # 공유 지표 배열을 건드리지 않도록 사본
+                if self.last is None:
+                    value[-1] = float(self.current[key] or 0)
+                else:
+                    value[self.last, np.arange(value.shape[1])] = self.current[key]
+            self.values[key] = value
+        return value
+
+
+def _latest(values: np.ndarray, last: np.ndarray) -> np.ndarray:
+    return values[last, np.arange(values.shape[1])]
+
+
+def _compile_operand(operand):
+    """숫자·필드 이름·지표 참조("ma(20)") → (env → 배열 또는 스칼라)"""
+    if isinstance(operand, bool):
+        raise ValueError(f"invalid operand: {operand!r}")
+    if isinstance(operand, (int, float)):
+        value = float(operand)
+        return lambda env: value
+    if not isinstance(operand, str):
+        raise ValueError(f"invalid operand: {operand!r}")
+    try:
+        value = float(operand)  # "3.5" 처럼 문자열로 저장된 숫자
+        return lambda env: value
+    except ValueError:
+        pass
+    m = _REF.match(operand.lower())
+    if not m:
+        raise ValueError(f"invalid reference: {operand!r}")
+    name, arg_text = m.groups()
+    if arg_text is None and name in _FIELDS:
+        compute = _FIELDS[name]
+        return lambda env: env.get(name, compute)
+    if name in _FUNCTIONS:
+        defaults, make = _FUNCTIONS[name]
+        args = _args(arg_text, name, defaults)
+        key = f"{name}({','.join(map(str, args))})"
+        compute = make(*args)
+        return lambda env: env.get(key, compute)
+    if arg_text is not None:
+        raise ValueError(f"unknown indicator: {name}()")
+    # 모르는 이름은 예전처럼 현재가 dict 에서 찾고 없으면 0
+    return lambda env: env.get(name, lambda ind: np.zeros(ind.close.shape))
+
+
+def _shift(values, fill=np.nan):
+    """한 봉 뒤로 민 배열 (스칼라는 그대로)"""
+    if np.ndim(values) == 0:
+        return values
+    out = np.empty(values.shape)
+    out[:1] = fill
+    out[1:] = values[:-1]
+    return out
+
+
+def _compile_node(node):
+    if isinstance(node, list):
+        return _compile_group(node, np.logical_and)
+    if not isinstance(node, dict):
+        raise ValueError(f"invalid condition: {node!r}")
+    if "all" in node:
+        return _compile_group(node["all"], np.logical_and)
+    if "any" in node:
+        return _compile_group(node["any"], np.logical_or)
+    if "not" in node:
+        inner = _compile_node(node["not"])
+        return lambda env: ~inner(env)
+
+    left = _compile_operand(node.get("indicator", ""))
+    right = _compile_operand(node.get("value", 0))
+    op = node.get("operator", ">")
+    if op in CROSS_OPERATORS:
+        above = op == "cross_above"
+
+        def cross(env):
+            a, b = left(env), right(env)
+            pa, pb = _shift(a), _shift(b)
+            with np.errstate(invalid="ignore"):
+                if above:
+                    return (pa <= pb) & (np.asarray(a) > b)
+                return (pa >= pb) & (np.asarray(a) < b)
+        return cross
+    fn = OPERATORS.get(op)
+    if fn is None:
+        raise ValueError(f"unknown operator: {op}")
+
+    def compare(env):
+        with np.errstate(invalid="ignore"):
+            return fn(left(env), right(env))
+    return compare
+
+
+def _compile_group(nodes, combine):
+    if not isinstance(nodes, list):
+        raise ValueError("condition group must be a list")
+    parts = [_compile_node(n) for n in nodes]
+    identity = combine is np.logical_and  # 빈 AND 는 참, 빈 OR 는 거짓
+
+    def group(env):
+        result = np.full(env.ind.close.shape, identity)
+        for part in parts:
+            result = combine(result, part(env))
+        return result
+    return group
+
+
+class CompiledCondition:
+    """params.conditions 를 한 번 컴파일한 형태 — IndicatorSet(1차원 또는 봉 × 종목)에 대해 bool 배열"""
+
+    def __init__(self, conditions):
+        self.source = conditions
+        self._fn = _compile_node(conditions)
+
+    def evaluate(self, ind: IndicatorSet, current: dict = None) -> np.ndarray:
+        """봉마다 조건 충족 여부 — current 를 주면 마지막 봉의 시세 필드를 그 값으로 봄
+
+        상수끼리 비교하는 조건은 스칼라로 컴파일되므로 봉 배열 모양으로 펼쳐 돌려준다.
+        """
+        result = np.asarray(self._fn(_Env(ind, current)), dtype=bool)
+        if result.shape != ind.close.shape:
+            result = np.broadcast_to(result, ind.close.shape).copy()
+        return result
+
+    def latest(self, ind: IndicatorSet, current: dict = None) -> bool:
+        result = self.evaluate(ind, current)
+        return bool(result[-1]) if len(result) else False
+
+    def latest_many(self, ind: IndicatorSet, last: np.ndarray, current: dict = None) -> np.ndarray:
+        """봉 × 종목 배열에서 종목별 마지막 봉(last 행)의 충족 여부 → bool[종목]"""
+        result = np.broadcast_to(self._fn(_Env(ind, current, last)), ind.close.shape)
+        return _latest(result, last).astype(bool)
+
+
+class CompiledReference:
+    """참조 하나("vol_ratio(20)", "change_rate" …)를 컴파일한 형태 — 스크리너 정렬 기준 등"""
+
+    def __init__(self, ref):
+        self.source = ref
+        self._fn = _compile_operand(ref)
+
+    def latest_many(self, ind: IndicatorSet, last: np.ndarray, current: dict = None) -> np.ndarray:
+        values = np.broadcast_to(np.asarray(self._fn(_Env(ind, current, last)), dtype=np.float64),
+                                 ind.close.shape)
+        return _latest(values, last)
+
+
+_compiled: OrderedDict = OrderedDict()
+_compiled_lock = threading.Lock()
+_MAX_COMPILED = 1024
+
+
+def compile_conditions(conditions) -> CompiledCondition:
+    """조건식 컴파일 (같은 내용이면 캐시 재사용, 잘못된 조건식이면 ValueError)
+
+    조건 하나: {"indicator": 참조, "operator": 비교, "value": 숫자 또는 참조}
+      참조: price·close·open·high·low·volume·change_rate, ma(n)·sma(n)·ema(n)·rsi(n)·
+            macd(f,s,g)·macd_signal(f,s,g)·macd_hist(f,s,g)·vol_ratio(n)·change(n)
+      비교: > < >= <= == cross_above cross_below (직전 봉 대비 교차)
+    묶음: 목록 또는 {"all": [...]} = AND, {"any": [...]} = OR, {"not": 조건} (중첩 가능)
+    """
+    key = json.dumps(conditions, sort_keys=True, default=str)
+    with _compiled_lock:
+        compiled = _compiled.get(key)
+        if compiled is not None:
+            _compiled.move_to_end(key)
+            return compiled
+    compiled = CompiledCondition(conditions)
+    with _compiled_lock:
+        _compiled[key] = compiled
+        while len(_compiled) > _MAX_COMPILED:
+            _compiled.popitem(last=False)
+    return compiled
+
+
+def compile_reference(ref) -> CompiledReference:
+    """정렬 기준 같은 참조 하나를 컴파일 (잘못된 참조면 ValueError)"""
+    return CompiledReference(ref)
+
 
 class ConditionStrategy(BaseStrategy):
     """
     사용자 조건식 전략
     params.conditions 예시:
       [{"indicator": "change_rate", "operator": ">", "value": 3.0}]
+      [{"any": [{"indicator": "rsi(14)", "operator": "<", "value": 30},
+                {"indicator": "ma(5)", "operator": "cross_above", "value": "ma(20)"}]},
+       {"indicator": "vol_ratio(20)", "operator": ">=", "value": 2}]
     params.action: "buy" | "sell" | "both"
     """
 
-    def _evaluate(self, conditions: list, current: dict) -> bool:
-        for cond in conditions:
-            ind = cond.get("indicator", "")
-            op = cond.get("operator", ">")
-            val = float(cond.get("value", 0))
-            actual = float(current.get(ind, 0))
-            fn = OPERATORS.get(op)
-            if fn is None or not fn(actual, val):
-                return False
-        return True
+    def _condition(self) -> CompiledCondition:
+        return compile_conditions(self.params.get("conditions", []))
+
+    def _matches(self, ohlcv: list, current: dict) -> bool:
+        if ohlcv:
+            ind = for_bars(self.stock_code, ohlcv)
+        else:  # 저장된 일봉이 없으면 현재가만으로
+            ind = IndicatorSet([{"date": "", "close": current.get("price", 0),
+                                 **{f: current.get(f, 0) for f in ("open", "high", "low", "volume")}}])
+        return self._condition().latest(ind, current)
 
     def should_buy(self, ohlcv: list, current: dict) -> bool:
         action = self.params.get("action", "buy")
         if action not in ("buy", "both"):
             return False
-        return self._evaluate(self.params.get("conditions", []), current)
+        return self._matches(ohlcv, current)
 
     def should_sell(self, ohlcv: list, current: dict) -> bool:
         action = self.params.get("action", "sell")
         if action not in ("sell", "both"):
             return False
-        return self._evaluate(self.params.get("conditions", []), current)
+        return self._matches(ohlcv, current)
+
+    def signals(self, ind: IndicatorSet) -> tuple:
+        matched = self._condition().evaluate(ind)
+        never = np.zeros(matched.shape, dtype=bool)
+        buy = matched if self.params.get("action", "buy") in ("buy", "both") else never
+        sell = matched if self.params.get("action", "sell") in ("sell", "both") else never
+        return buy, sell
@@ -0,0 +1,204 @@
+"""
+ML 특성 저장소 (종목별)
+- 저장된 일봉(bar_store) 전 구간의 특성 행렬을 models/features/<code>.joblib 에 보관
+  → 학습(train_model)과 추론(MLStrategy)이 같은 행을 읽어 계산 구간 차이로 값이 어긋나지 않음
+- 새 완결 봉이 생기면 함께 저장한 증분 상태(IndicatorStream 노드)로 그 행만 이어 계산해 붙임
+- 특성 정의(FEATURE_DEFS)마다 버전이 있어 정의가 바뀌거나 새로 생긴 열만 전 구간에서 다시 계산
+- 앞쪽 봉이 바뀌면(bar_store 재적재, 수정주가) 전부 다시 계산
+- 장중 아직 저장되지 않은 최신 봉은 저장된 증분 상태에 peek 해서 한 행만 계산 (저장하지 않음)
+- 파일 mtime·크기로 프로세스 메모리 사본을 검증 (재학습 스레드가 쓴 파일을 다른 워커도 읽음)
+"""
+import copy
+import os
+import threading
+from collections import OrderedDict
+import joblib
+import numpy as np
+from bar_store import load_matrix
+from .indicators import FIELDS, IndicatorSet, Macd, PctChange, Rsi, Sma, VolumeRatio
+
+FEATURE_DIR = os.path.join(os.path.dirname(__file__), "../models/features")
+_MAX_ENTRIES = 256
+
+
+class Feature:
+    """특성 하나 — 배치 계산(IndicatorSet → 배열)과 같은 값을 내는 증분 노드, 정의가 바뀌면 version 을 올림"""
+
+    def __init__(self, version: int, batch, node, pick=None):
+        self.version = version
+        self.batch = batch
+        self.node = node
+        self.pick = pick or (lambda value: value)
+
+
+FEATURE_DEFS = {
+    "ma5":       Feature(1, lambda ind: ind.sma(5), lambda: Sma(5)),
+    "ma20":      Feature(1, lambda ind: ind.sma(20), lambda: Sma(20)),
+    "ma60":      Feature(1, lambda ind: ind.sma(60), lambda: Sma(60)),
+    "rsi":       Feature(1, lambda ind: ind.rsi(14), lambda: Rsi(14)),
+    "macd_diff": Feature(1, lambda ind: ind.macd(12, 26, 9)[2], lambda: Macd(12, 26, 9), lambda v: v[2]),
+    "vol_ratio": Feature(1, lambda ind: ind.volume_ratio(20), lambda: VolumeRatio(20)),
+    "ret1":      Feature(1, lambda ind: ind.pct_change(1), lambda: PctChange(1)),
+    "ret5":      Feature(1, lambda ind: ind.pct_change(5), lambda: PctChange(5)),
+}
+
+
+def feature_versions(names: list) -> dict:
+    return {name: FEATURE_DEFS[name].version for name in names}
+
+
+def _bars(fields: dict, start: int, stop: int):
+    for i in range(start, stop):
+        yield {f: int(fields[f][i]) for f in FIELDS}
+
+
+class FeatureStore:
+    """항목: {"dates": U8[n], "closes": int64[n], "columns": {이름: float64[n]},
+    "versions": {이름: 버전}, "nodes": {이름: 마지막 저장 봉까지 push 한 노드}}
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: OrderedDict = OrderedDict()   # code → (stamp, entry)
+        self._lock = threading.Lock()
+        self._sync_locks: dict = {}
+        self._stats = {"appended": 0, "recomputed": 0, "rebuilt": 0, "peek": 0}
+
+    def _file(self, stock_code: str) -> str:
+        return os.path.join(self.path, f"{stock_code}.joblib")
+
+    def _entry(self, stock_code: str):
+        try:
+            st = os.stat(self._file(stock_code))
+        except FileNotFoundError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._entries.get(stock_code)
+            if cached and cached[0] == stamp:
+                self._entries.move_to_end(stock_code)
+                return cached[1]
+        entry = joblib.load(self._file(stock_code))
+        self._remember(stock_code, stamp, entry)
+        return entry
+
+    def _remember(self, stock_code: str, stamp: tuple, entry: dict) -> None:
+        with self._lock:
+            self._entries[stock_code] = (stamp, entry)
+            self._entries.move_to_end(stock_code)
+            while len(self._entries) > _MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def _write(self, stock_code: str, entry: dict) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        path = self._file(stock_code)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        joblib.dump(entry, tmp)
+        os.replace(tmp, path)  # 읽는 쪽이 쓰다 만 파일을 보지 않도록 교체
+        st = os.stat(path)
+        self._remember(stock_code, (st.st_mtime_ns, st.st_size), entry)
+
+    def sync(self, stock_code: str) -> dict:
+        """저장된 일봉에 맞춰 특성 갱신 (앱 컨텍스트 필요) → {"rows", "appended", "recomputed", "rebuilt"}
+
+        앞부분 봉이 그대로면 새 봉만 노드로 이어 계산하고, 버전이 다른 열만 전 구간 재계산한다.
+        """
+        with self._lock:
+            sync_lock = self._sync_locks.setdefault(stock_code, threading.Lock())
+        with sync_lock:
+            old = self._entry(stock_code)
+            dates, fields, _ = load_matrix([stock_code])
+            fields = {f: v[:, 0] for f, v in fields.items()}
+            n_old = len(old["dates"]) if old else 0
+            prefix = bool(old) and n_old <= len(dates) \
+                and np.array_equal(old["dates"], dates[:n_old]) \
+                and np.array_equal(old["closes"], fields["close"][:n_old])
+            appended = len(dates) - n_old if prefix else 0
+            stale = [name for name, spec in FEATURE_DEFS.items()
+                     if not prefix or old["versions"].get(name) != spec.version]
+            if prefix and not appended and not stale and set(old["columns"]) == set(FEATURE_DEFS):
+                return {"rows": n_old, "appended": 0, "recomputed": [], "rebuilt": False}
+
+            entry = {"dates": dates, "closes": fields["close"], "columns": {}, "versions": {}, "nodes": {}}
+            ind = IndicatorSet.from_arrays(dates, **fields) if stale else None
+            for name, spec in FEATURE_DEFS.items():
+                if name in stale:
+                    node = spec.node()
+                    for bar in _bars(fields, 0, len(dates)):
+                        node.push(bar)
+                    column = spec.batch(ind).astype(np.float64)
+                else:
+                    node = copy.deepcopy(old["nodes"][name])
+                    values = []
+                    for bar in _bars(fields, n_old, len(dates)):
+                        node.push(bar)
+                        values.append(spec.pick(node.last))
+                    column = np.concatenate([old["columns"][name], np.array(values, dtype=np.float64)])
+                entry["columns"][name] = column
+                entry["versions"][name] = spec.version
+                entry["nodes"][name] = node
+            self._write(stock_code, entry)
+            with self._lock:
+                self._stats["appended"] += appended
+                self._stats["recomputed"] += len(stale)
+                self._stats["rebuilt"] += int(not prefix)
+            return {"rows": len(dates), "appended": appended, "recomputed": stale, "rebuilt": not prefix}
+
+    def matrix(self, stock_code: str, names: list, count: int = None) -> tuple:
+        """저장된 특성 (dates[n], X[n, len(names)]) — 날짜 오름차순, count 면 최근 count 행"""
+        entry = self._entry(stock_code)
+        if entry is None:
+            return np.zeros(0, dtype="<U8"), np.zeros((0, len(names)))
+        start = max(len(entry["dates"]) - count, 0) if count else 0
+        return entry["dates"][start:], np.column_stack([entry["columns"][n][start:] for n in names])
+
+    def latest(self, stock_code: str, names: list, ohlcv: list):
+        """ohlcv(load_bars 결과)의 최신 봉 특성 행 [len(names)] — 저장소로 답할 수 없으면 None
+
+        최신 봉이 저장된 마지막 봉이면 저장 행을, 그 다음 봉(장중 봉 등)이면 증분 상태에 peek 한 값을 준다.
+        완결 봉이 저장소보다 앞서 있으면 sync() 후 다시 본다.
+        """
+        if not ohlcv:
+            return None
+        bars = ohlcv if len(ohlcv) < 2 or ohlcv[0]["date"] > ohlcv[-1]["date"] else ohlcv[::-1]
+        newest, prev = bars[0], (bars[1] if len(bars) > 1 else None)
+
+        def serve(entry):
+            if entry is None or not len(entry["dates"]):
+                return None
+            last = entry["dates"][-1]
+            if newest["date"] == last and newest["close"] == entry["closes"][-1]:
+                return np.array([entry["columns"][n][-1] for n in names])
+            if newest["date"] > last and (prev is None or (
+                    prev["date"] == last and prev["close"] == entry["closes"][-1])):
+                with self._lock:
+                    self._stats["peek"] += 1
+                return np.array([FEATURE_DEFS[n].pick(entry["nodes"][n].peek(newest)) for n in names])
+            return None
+
+        entry = self._entry(stock_code)
+        row = serve(entry)
+        if row is None and (entry is None or not len(entry["dates"])
+                            or entry["versions"] != feature_versions(FEATURE_DEFS)
+                            or newest["date"] >= entry["dates"][-1]):
+            self.sync(stock_code)
+            row = serve(self._entry(stock_code))
+        return row
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> FeatureStore:
+    """프로세스 공용 특성 저장소"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FeatureStore(FEATURE_DIR)
+    return _store
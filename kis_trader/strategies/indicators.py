@@ -0,0 +1,427 @@
+"""
+NumPy 지표 엔진 (전략 공용)
+- ohlcv(list of dict, 순서 무관) → 날짜 오름차순 배열, 지표별 결과를 한 번만 계산해 보관
+- for_bars(): (종목, 행 수, 첫/마지막 봉, 마지막 종가·거래량) 키로 IndicatorSet 을 공유
+  → 같은 종목을 보는 전략들이 한 사이클에서 같은 계산을 반복하지 않는다
+- 결과는 기존 pandas/ta 경로와 비트 단위로 같다
+  · SMA: 정수 누적합 차분 (pandas rolling mean 과 동일하게 정확)
+  · EMA: pandas ewm(adjust=False) 재귀식 그대로 (min_periods, NaN 선행 구간 포함)
+  · RSI/MACD: ta.momentum.RSIIndicator / ta.trend.MACD 와 같은 정의
+- IndicatorStream: 같은 지표를 봉·틱 단위로 증분 계산 (BaseStrategy 가 전략별로 유지)
+"""
+import math
+import threading
+from collections import OrderedDict, deque
+import numpy as np
+
+FIELDS = ("open", "high", "low", "close", "volume")
+_MAX_SETS = 512
+
+
+def ewm_mean(values: np.ndarray, alpha: float, min_periods: int) -> np.ndarray:
+    """pandas Series.ewm(alpha=..., adjust=False, min_periods=...).mean() 와 같은 결과
+
+    2차원(봉 × 종목)이면 열마다 같은 재귀를 종목 축 배열 연산으로 한 번에 진행한다.
+    """
+    if values.ndim == 2:
+        return _ewm_mean_2d(values, alpha, min_periods)
+    out = np.full(len(values), np.nan)
+    if not len(values):
+        return out
+    factor = 1.0 - alpha
+    minp = max(int(min_periods), 1)
+    weighted = float(values[0])
+    nobs = int(weighted == weighted)
+    if nobs >= minp:
+        out[0] = weighted
+    old_wt = 1.0
+    for i in range(1, len(values)):
+        cur = float(values[i])
+        is_obs = cur == cur
+        nobs += is_obs
+        if weighted == weighted:
+            old_wt *= factor
+            if is_obs:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        elif is_obs:
+            weighted = cur
+        if nobs >= minp:
+            out[i] = weighted
+    return out
+
+
+def _ewm_mean_2d(values: np.ndarray, alpha: float, min_periods: int) -> np.ndarray:
+    out = np.full(values.shape, np.nan)
+    if not len(values):
+        return out
+    factor = 1.0 - alpha
+    minp = max(int(min_periods), 1)
+    weighted = values[0].astype(np.float64)
+    nobs = (weighted == weighted).astype(np.int64)
+    out[0] = np.where(nobs >= minp, weighted, np.nan)
+    old_wt = np.ones(values.shape[1])
+    with np.errstate(invalid="ignore"):
+        for i in range(1, len(values)):
+            cur = values[i]
+            is_obs = cur == cur
+            nobs += is_obs
+            started = weighted == weighted
+            old_wt = np.where(started, old_wt * factor, old_wt)
+            update = started & is_obs & (weighted != cur)
+            blended = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+            weighted = np.where(update, blended, np.where(~started & is_obs, cur, weighted))
+            old_wt = np.where(started & is_obs, 1.0, old_wt)
+            out[i] = np.where(nobs >= minp, weighted, np.nan)
+    return out
+
+
+def span_alpha(span: int) -> float:
+    """pandas 와 같은 순서로 span → alpha 변환 (com 경유)"""
+    com = (span - 1) / 2
+    return 1.0 / (1.0 + com)
+
+
+def window_alpha(window: int) -> float:
+    """ta RSI 의 alpha=1/window 를 pandas 가 com 으로 바꿨다가 되돌리는 값"""
+    alpha = 1 / window
+    com = (1 - alpha) / alpha
+    return 1.0 / (1.0 + com)
+
+
+def rsi_from_averages(avg_up: np.ndarray, avg_down: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(avg_down == 0, 100, 100 - (100 / (1 + avg_up / avg_down)))
+
+
+class IndicatorSet:
+    """한 종목 일봉 배열 + 계산된 지표 메모
+
+    from_arrays() 로 (봉 × 종목) 2차원 배열을 넣으면 모든 지표가 열(종목)별로 계산된다.
+    이때 각 열은 그 종목의 봉을 위에서부터 채우고 남는 아래쪽은 0 으로 둔다 (백테스트용).
+    """
+
+    def __init__(self, ohlcv: list):
+        dates = np.array([r["date"] for r in ohlcv])
+        order = np.argsort(dates, kind="stable")
+        self.dates = dates[order]
+        for f in FIELDS:
+            setattr(self, f, np.array([r[f] for r in ohlcv], dtype=np.int64)[order])
+        self._memo: dict = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_arrays(cls, dates, **fields) -> "IndicatorSet":
+        """날짜 오름차순 배열로 생성 (fields: open/high/low/close/volume, 정수)"""
+        ind = cls.__new__(cls)
+        ind.dates = dates
+        for f in FIELDS:
+            setattr(ind, f, np.asarray(fields[f], dtype=np.int64))
+        ind._memo = {}
+        ind._lock = threading.Lock()
+        return ind
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def _get(self, key: tuple, compute):
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+        value = compute()
+        with self._lock:
+            return self._memo.setdefault(key, value)
+
+    def sma(self, period: int, field: str = "close") -> np.ndarray:
+        """rolling(period).mean() — 정수 누적합 차분이라 오차 없음"""
+        def compute():
+            values = getattr(self, field)
+            out = np.full(values.shape, np.nan)
+            if period <= len(values):
+                csum = np.cumsum(values, axis=0)
+                csum = np.concatenate((np.zeros((1,) + values.shape[1:], dtype=csum.dtype), csum))
+                out[period - 1:] = (csum[period:] - csum[:-period]).astype(np.float64) / period
+            return out
+        return self._get(("sma", field, period), compute)
+
+    def ema(self, span: int) -> np.ndarray:
+        """종가 ewm(span, adjust=False, min_periods=span) — ta 의 _ema"""
+        return self._get(("ema", span), lambda: ewm_mean(
+            self.close.astype(np.float64), span_alpha(span), span))
+
+    def rsi(self, period: int = 14) -> np.ndarray:
+        """ta.momentum.RSIIndicator(close, period).rsi()"""
+        def compute():
+            close = self.close.astype(np.float64)
+            diff = np.diff(close, axis=0, prepend=np.full((1,) + close.shape[1:], np.nan))
+            up = np.where(diff > 0, diff, 0.0)
+            down = -np.where(diff < 0, diff, 0.0)
+            alpha = window_alpha(period)
+            return rsi_from_averages(ewm_mean(up, alpha, period), ewm_mean(down, alpha, period))
+        return self._get(("rsi", period), compute)
+
+    def macd(self, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple:
+        """ta.trend.MACD → (macd, macd_signal, macd_diff)"""
+        def compute():
+            line = self.ema(fast) - self.ema(slow)
+            sig = ewm_mean(line, span_alpha(signal), signal)
+            return line, sig, line - sig
+        return self._get(("macd", fast, slow, signal), compute)
+
+    def pct_change(self, periods: int = 1) -> np.ndarray:
+        def compute():
+            close = self.close.astype(np.float64)
+            out = np.full(close.shape, np.nan)
+            if periods < len(close):
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    out[periods:] = close[periods:] / close[:-periods] - 1
+            return out
+        return self._get(("pct_change", periods), compute)
+
+    def volume_ratio(self, period: int = 20) -> np.ndarray:
+        """거래량 / 거래량 period 일 평균"""
+        def compute():
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return self.volume / self.sma(period, "volume")
+        return self._get(("volume_ratio", period), compute)
+
+
+_sets: OrderedDict = OrderedDict()
+_sets_lock = threading.Lock()
+
+
+def for_bars(stock_code: str, ohlcv: list) -> IndicatorSet:
+    """같은 봉 묶음이면 같은 IndicatorSet 반환 (장중 당일 봉은 종가·거래량이 키에 들어감)"""
+    if not ohlcv:
+        return IndicatorSet([])
+    first, last = min(ohlcv, key=lambda r: r["date"]), max(ohlcv, key=lambda r: r["date"])
+    key = (stock_code, len(ohlcv), first["date"], last["date"], last["close"], last["volume"])
+    with _sets_lock:
+        ind = _sets.get(key)
+        if ind is not None:
+            _sets.move_to_end(key)
+            return ind
+    ind = IndicatorSet(ohlcv)
+    with _sets_lock:
+        ind = _sets.setdefault(key, ind)
+        _sets.move_to_end(key)
+        while len(_sets) > _MAX_SETS:
+            _sets.popitem(last=False)
+    return ind
+
+
+def clear() -> None:
+    with _sets_lock:
+        _sets.clear()
+
+
+# ── 스트리밍(증분) 상태 ──────────────────────────────────────────
+# 확정 봉(마지막 봉 이전)까지는 재귀 상태를 누적해 두고, 마지막 봉(장중 당일 봉)은
+# 매번 상태를 복사해 한 단계만 더 진행한다 → 틱마다 O(1), 위 배치 계산과 같은 값.
+# 노드: push(bar) 로 확정 봉 반영, last = 마지막 확정 봉 값, peek(bar) = 그 다음 봉 값
+_NAN = float("nan")
+
+
+def _div(a: float, b: float) -> float:
+    """NumPy 나눗셈과 같은 결과 (분모 0 이면 inf/nan)"""
+    if b == 0:
+        return _NAN if a == 0 or a != a else math.copysign(math.inf, a)
+    return a / b
+
+
+def _rsi_value(avg_up: float, avg_down: float) -> float:
+    if avg_down == 0:
+        return 100.0
+    return 100 - (100 / (1 + avg_up / avg_down))
+
+
+class EwmState:
+    """ewm_mean 의 재귀 상태 (한 값씩)"""
+    __slots__ = ("alpha", "factor", "minp", "weighted", "old_wt", "nobs", "started", "value")
+
+    def __init__(self, alpha: float, min_periods: int):
+        self.alpha = alpha
+        self.factor = 1.0 - alpha
+        self.minp = max(int(min_periods), 1)
+        self.weighted = _NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+        self.started = False
+        self.value = _NAN
+
+    def copy(self) -> "EwmState":
+        other = EwmState.__new__(EwmState)
+        for name in EwmState.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
+
+    def push(self, x: float) -> float:
+        x = float(x)
+        is_obs = x == x
+        if not self.started:
+            self.started = True
+            self.weighted = x
+            self.nobs = int(is_obs)
+        else:
+            self.nobs += is_obs
+            if self.weighted == self.weighted:
+                self.old_wt *= self.factor
+                if is_obs:
+                    if self.weighted != x:
+                        self.weighted = (self.old_wt * self.weighted + self.alpha * x) / (self.old_wt + self.alpha)
+                    self.old_wt = 1.0
+            elif is_obs:
+                self.weighted = x
+        self.value = self.weighted if self.nobs >= self.minp else _NAN
+        return self.value
+
+    def peek(self, x: float) -> float:
+        return self.copy().push(x)
+
+
+class Sma:
+    """rolling(period).mean() — 최근 period 개 정수 합"""
+
+    def __init__(self, period: int, field: str = "close"):
+        self.period = period
+        self.field = field
+        self.window = deque(maxlen=period)
+        self.total = 0
+        self.last = _NAN
+
+    def push(self, bar: dict) -> None:
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        value = bar[self.field]
+        self.window.append(value)
+        self.total += value
+        self.last = float(self.total) / self.period if len(self.window) == self.period else _NAN
+
+    def peek(self, bar: dict) -> float:
+        if len(self.window) < self.period - 1:
+            return _NAN
+        total = self.total - (self.window[0] if len(self.window) == self.period else 0)
+        return float(total + bar[self.field]) / self.period
+
+
+class Rsi:
+    """ta RSI (Wilder 평균 = ewm(alpha=1/period))"""
+
+    def __init__(self, period: int = 14):
+        alpha = window_alpha(period)
+        self.up = EwmState(alpha, period)
+        self.down = EwmState(alpha, period)
+        self.prev_close = None
+        self.last = _NAN
+
+    def _moves(self, bar: dict) -> tuple:
+        diff = _NAN if self.prev_close is None else float(bar["close"]) - self.prev_close
+        return (diff if diff > 0 else 0.0), -(diff if diff < 0 else 0.0)
+
+    def push(self, bar: dict) -> None:
+        up, down = self._moves(bar)
+        self.last = _rsi_value(self.up.push(up), self.down.push(down))
+        self.prev_close = float(bar["close"])
+
+    def peek(self, bar: dict) -> float:
+        up, down = self._moves(bar)
+        return _rsi_value(self.up.peek(up), self.down.peek(down))
+
+
+class Macd:
+    """ta MACD → (macd, macd_signal, macd_diff)"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EwmState(span_alpha(fast), fast)
+        self.slow = EwmState(span_alpha(slow), slow)
+        self.signal = EwmState(span_alpha(signal), signal)
+        self.last = (_NAN, _NAN, _NAN)
+
+    def push(self, bar: dict) -> None:
+        close = float(bar["close"])
+        line = self.fast.push(close) - self.slow.push(close)
+        sig = self.signal.push(line)
+        self.last = (line, sig, line - sig)
+
+    def peek(self, bar: dict) -> tuple:
+        close = float(bar["close"])
+        line = self.fast.peek(close) - self.slow.peek(close)
+        sig = self.signal.peek(line)
+        return line, sig, line - sig
+
+
+class PctChange:
+    def __init__(self, periods: int = 1):
+        self.periods = periods
+        self.window = deque(maxlen=periods)
+        self.last = _NAN
+
+    def _value(self, bar: dict) -> float:
+        if len(self.window) < self.periods:
+            return _NAN
+        return float(bar["close"]) / float(self.window[0]) - 1
+
+    def push(self, bar: dict) -> None:
+        self.last = self._value(bar)
+        self.window.append(bar["close"])
+
+    def peek(self, bar: dict) -> float:
+        return self._value(bar)
+
+
+class VolumeRatio:
+    def __init__(self, period: int = 20):
+        self.sma = Sma(period, "volume")
+        self.last = _NAN
+
+    def push(self, bar: dict) -> None:
+        self.sma.push(bar)
+        self.last = _div(float(bar["volume"]), self.sma.last)
+
+    def peek(self, bar: dict) -> float:
+        return _div(float(bar["volume"]), self.sma.peek(bar))
+
+
+class IndicatorStream:
+    """노드 묶음의 증분 상태 (ohlcv 는 최신순 또는 날짜 오름차순)
+
+    update() 는 {이름: (직전 봉 값, 최신 봉 값)} 을 돌려준다. 확정 구간이 그대로면
+    최신 봉만 한 단계 계산하고, 확정 봉이 뒤에 하나 붙었으면 그 봉만 반영한다.
+    앞쪽 봉이 바뀌면(읽는 구간이 밀림, 수정주가) 배치와 같은 값을 위해 처음부터 다시 쌓는다.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._nodes = None
+        self._key = None
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def update(self, ohlcv: list) -> dict:
+        n = len(ohlcv)
+        newest_first = n > 1 and ohlcv[0]["date"] > ohlcv[-1]["date"]
+
+        def at(i: int) -> dict:
+            return ohlcv[n - 1 - i] if newest_first else ohlcv[i]
+
+        m = n - 1  # 확정 봉 수
+        key = (m, at(0)["date"], at(m - 1)["date"], at(m - 1)["close"]) if m > 0 else (0,)
+        with self._lock:
+            prev = self._key
+            if key != prev:
+                if (m > 1 and prev and prev[0] == m - 1 and prev[1] == key[1]
+                        and (at(m - 2)["date"], at(m - 2)["close"]) == prev[2:]):
+                    for node in self._nodes.values():
+                        node.push(at(m - 1))
+                else:
+                    self._nodes = self._factory()
+                    self.rebuilds += 1
+                    for i in range(m):
+                        bar = at(i)
+                        for node in self._nodes.values():
+                            node.push(bar)
+                self._key = key
+            latest = at(m) if n else None
+            return {name: (node.last, node.peek(latest) if latest else _NAN)
+                    for name, node in self._nodes.items()}
@@ -1,32 +1,34 @@
-import pandas as pd
+import numpy as np
 from .base import BaseStrategy
+from .indicators import IndicatorSet, Sma
 
 class MAStrategy(BaseStrategy):
     """이동평균선 골든크로스/데드크로스 전략"""
 
-    def _calc_ma(self, ohlcv: list) -> pd.DataFrame:
-        df = pd.DataFrame(ohlcv)
-        if df.empty:
-            return df
-        df = df.sort_values("date")
+    def _calc_ma(self, ohlcv: list) -> tuple:
+        """((직전 봉 ma_short, ma_long), (최신 봉 ma_short, ma_long))"""
         short = int(self.params.get("short_period", 5))
         long_ = int(self.params.get("long_period", 20))
-        df["ma_short"] = df["close"].rolling(short).mean()
-        df["ma_long"] = df["close"].rolling(long_).mean()
-        return df
+        v = self._stream("ma", lambda: {"short": Sma(short), "long": Sma(long_)}).update(ohlcv)
+        return (v["short"][0], v["long"][0]), (v["short"][1], v["long"][1])
 
     def should_buy(self, ohlcv: list, current: dict) -> bool:
-        df = self._calc_ma(ohlcv)
-        if len(df) < 2:
+        if len(ohlcv) < 2:
             return False
-        prev, last = df.iloc[-2], df.iloc[-1]
-        return (prev["ma_short"] <= prev["ma_long"] and
-                last["ma_short"] > last["ma_long"])
+        (prev_short, prev_long), (short, long_) = self._calc_ma(ohlcv)
+        return prev_short <= prev_long and short > long_
 
     def should_sell(self, ohlcv: list, current: dict) -> bool:
-        df = self._calc_ma(ohlcv)
-        if len(df) < 2:
+        if len(ohlcv) < 2:
             return False
-        prev, last = df.iloc[-2], df.iloc[-1]
-        return (prev["ma_short"] >= prev["ma_long"] and
-                last["ma_short"] < last["ma_long"])
+        (prev_short, prev_long), (short, long_) = self._calc_ma(ohlcv)
+        return prev_short >= prev_long and short < long_
+
+    def signals(self, ind: IndicatorSet) -> tuple:
+        short = ind.sma(int(self.params.get("short_period", 5)))
+        long_ = ind.sma(int(self.params.get("long_period", 20)))
+        buy = np.zeros(short.shape, dtype=bool)
+        sell = np.zeros(short.shape, dtype=bool)
+        buy[1:] = (short[:-1] <= long_[:-1]) & (short[1:] > long_[1:])
+        sell[1:] = (short[:-1] >= long_[:-1]) & (short[1:] < long_[1:])
+        return buy, sell
@@ -1,62 +1,78 @@
 import os
 import joblib
-import pandas as pd
-import ta
+import numpy as np
 from .base import BaseStrategy
+from .feature_store import FEATURE_DEFS, get_store
+from .indicators import IndicatorSet, for_bars
+from .model_registry import get_registry
 
 MODEL_DIR = os.path.join(os.path.dirname(__file__), "../models")
 os.makedirs(MODEL_DIR, exist_ok=True)
 
+# 모델 입력 열 순서 — 정의는 feature_store.FEATURE_DEFS (바꾸면 그 특성의 버전을 올릴 것)
+FEATURES = ["ma5", "ma20", "ma60", "rsi", "macd_diff", "vol_ratio", "ret1", "ret5"]
 
-def _build_features(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy().sort_values("date")
-    df["ma5"]  = df["close"].rolling(5).mean()
-    df["ma20"] = df["close"].rolling(20).mean()
-    df["ma60"] = df["close"].rolling(60).mean()
-    df["rsi"]  = ta.momentum.RSIIndicator(df["close"], 14).rsi()
-    macd = ta.trend.MACD(df["close"])
-    df["macd_diff"] = macd.macd_diff()
-    df["vol_ratio"] = df["volume"] / df["volume"].rolling(20).mean()
-    df["ret1"] = df["close"].pct_change(1)
-    df["ret5"] = df["close"].pct_change(5)
-    return df.dropna()
 
-FEATURES = ["ma5", "ma20", "ma60", "rsi", "macd_diff", "vol_ratio", "ret1", "ret5"]
+def _build_features(ind: IndicatorSet) -> np.ndarray:
+    """FEATURES 순서의 특성 행렬 (날짜 오름차순, 앞쪽 워밍업 행은 NaN 포함)"""
+    return np.column_stack([FEATURE_DEFS[name].batch(ind) for name in FEATURES])
 
 
-def train_model(stock_code: str, ohlcv: list) -> None:
-    """RandomForest 모델 학습 및 저장 (joblib)"""
+def train_model(stock_code: str, ohlcv: list, warm_start: bool = False,
+                add_trees: int = 20, max_trees: int = 300, features: np.ndarray = None) -> dict:
+    """RandomForest 모델 학습 및 저장 (joblib) → {"rows", "n_estimators", "warm"} (봉 부족 시 None)
+
+    warm_start 면 기존 모델에 add_trees 개 트리만 새 데이터로 더한다 (max_trees 를 넘으면 새로 학습).
+    features 는 특성 저장소에서 읽은 같은 봉들의 FEATURES 행렬(날짜 오름차순) — 없으면 ohlcv 로 계산.
+    """
     from sklearn.ensemble import RandomForestClassifier
-    df = pd.DataFrame(ohlcv)
-    if len(df) < 70:
-        return
-    df = _build_features(df)
-    df["target"] = (df["close"].shift(-1) > df["close"]).astype(int)
-    df = df.dropna()
-    X = df[FEATURES].values
-    y = df["target"].values
-    clf = RandomForestClassifier(n_estimators=100, random_state=42)
-    clf.fit(X, y)
+    if len(ohlcv) < 70:
+        return None
+    ind = IndicatorSet(ohlcv)  # 학습용 긴 구간은 공유 캐시에 넣지 않음
+    X = features if features is not None and len(features) == len(ind) else _build_features(ind)
+    valid = ~np.isnan(X).any(axis=1)
+    y = np.append(ind.close[1:] > ind.close[:-1], False).astype(int)  # 마지막 행은 0
     model_path = os.path.join(MODEL_DIR, f"{stock_code}.joblib")
-    joblib.dump(clf, model_path)
+    clf = None
+    if warm_start and os.path.exists(model_path):
+        clf = joblib.load(model_path)
+        if clf.n_estimators + add_trees > max_trees or clf.n_features_in_ != X.shape[1]:
+            clf = None
+        else:
+            clf.set_params(warm_start=True, n_estimators=clf.n_estimators + add_trees)
+    warm = clf is not None
+    if clf is None:
+        clf = RandomForestClassifier(n_estimators=100, random_state=42)
+    clf.fit(X[valid], y[valid])
+    tmp_path = f"{model_path}.{os.getpid()}.tmp"
+    joblib.dump(clf, tmp_path)
+    os.replace(tmp_path, model_path)  # 읽는 쪽이 쓰다 만 파일을 보지 않도록 교체
+    get_registry().invalidate(stock_code)
+    return {"rows": int(valid.sum()), "n_estimators": clf.n_estimators, "warm": warm}
 
 
 class MLStrategy(BaseStrategy):
     """RandomForest 예측 기반 전략"""
 
     def _predict(self, ohlcv: list) -> float:
-        model_path = os.path.join(MODEL_DIR, f"{self.stock_code}.joblib")
-        if not os.path.exists(model_path):
+        clf = get_registry().get(self.stock_code)
+        if clf is None:
             return 0.5
-        clf = joblib.load(model_path)
-        df = pd.DataFrame(ohlcv)
-        df = _build_features(df)
-        if df.empty:
+        X = self._latest_features(ohlcv)
+        if X is None:
             return 0.5
-        X = df[FEATURES].values[-1:]
         prob = clf.predict_proba(X)[0][1]
         return float(prob)
 
+    def _latest_features(self, ohlcv: list):
+        """최신 봉의 특성 (1, len(FEATURES)) — 특성 저장소(학습과 같은 전 구간 기준)에서, 안 되면 ohlcv 로 계산"""
+        row = get_store().latest(self.stock_code, FEATURES, ohlcv)
+        if row is not None and not np.isnan(row).any():
+            return row[None, :]
+        X = _build_features(for_bars(self.stock_code, ohlcv))
+        X = X[~np.isnan(X).any(axis=1)]
+        return X[-1:] if len(X) else None
+
     def should_buy(self, ohlcv: list, current: dict) -> bool:
         threshold = float(self.params.get("buy_threshold", 0.65))
         return self._predict(ohlcv) >= threshold
@@ -64,3 +80,15 @@ class MLStrategy(BaseStrategy):
     def should_sell(self, ohlcv: list, current: dict) -> bool:
         threshold = float(self.params.get("sell_threshold", 0.35))
         return self._predict(ohlcv) <= threshold
+
+    def signals(self, ind: IndicatorSet) -> tuple:
+        """종목 하나(1차원)만 지원 — 현재 저장된 모델로 전 구간 확률을 한 번에 계산"""
+        prob = np.full(len(ind), 0.5)
+        clf = get_registry().get(self.stock_code)
+        if clf is not None:
+            X = _build_features(ind)
+            valid = ~np.isnan(X).any(axis=1)
+            if valid.any():
+                prob[valid] = clf.predict_proba(X[valid])[:, 1]
+        return (prob >= float(self.params.get("buy_threshold", 0.65)),
+                prob <= float(self.params.get("sell_threshold", 0.35)))
@@ -0,0 +1,96 @@
+"""
+ML 모델 레지스트리 (프로세스 공용)
+- models/<code>.joblib 을 한 번만 읽어 메모리에 보관
+- 조회마다 파일 mtime·크기를 확인해 train_model 이 새로 쓴 모델이면 다시 읽음 (워커 간에도 동작)
+- 메모리 상한(ML_MODEL_CACHE_MB, 파일 크기 기준) 초과 시 가장 오래 안 쓴 모델부터 제거
+- ML_MODEL_MMAP 이면 joblib mmap_mode="r" 로 읽어 큰 ndarray 를 워커 간 페이지 공유
+  (sklearn 트리는 역직렬화 때 노드 배열을 복사하므로 RandomForest 는 이득이 거의 없음)
+"""
+import os
+import threading
+from collections import OrderedDict
+import joblib
+from flask import current_app, has_app_context
+
+
+class ModelRegistry:
+    def __init__(self, model_dir: str, max_bytes: int, mmap: bool = False):
+        self.model_dir = model_dir
+        self.max_bytes = max_bytes
+        self.mmap = mmap
+        self._models: OrderedDict = OrderedDict()   # code → (stamp, size, model)
+        self._lock = threading.Lock()
+        self._load_locks: dict = {}
+        self._stats = {"hit": 0, "load": 0, "evict": 0}
+
+    def path(self, stock_code: str) -> str:
+        return os.path.join(self.model_dir, f"{stock_code}.joblib")
+
+    def get(self, stock_code: str):
+        """종목 모델 (파일이 없으면 None)"""
+        path = self.path(stock_code)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.invalidate(stock_code)
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._models.get(stock_code)
+            if entry and entry[0] == stamp:
+                self._models.move_to_end(stock_code)
+                self._stats["hit"] += 1
+                return entry[2]
+            load_lock = self._load_locks.setdefault(stock_code, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._models.get(stock_code)
+                if entry and entry[0] == stamp:
+                    return entry[2]
+            model = joblib.load(path, mmap_mode="r" if self.mmap else None)
+            with self._lock:
+                self._stats["load"] += 1
+                self._models[stock_code] = (stamp, st.st_size, model)
+                self._models.move_to_end(stock_code)
+                self._evict()
+            return model
+
+    def _evict(self) -> None:
+        total = sum(size for _, size, _ in self._models.values())
+        while total > self.max_bytes and len(self._models) > 1:
+            _, (_, size, _) = self._models.popitem(last=False)
+            total -= size
+            self._stats["evict"] += 1
+
+    def invalidate(self, stock_code: str = None) -> None:
+        with self._lock:
+            if stock_code is None:
+                self._models.clear()
+            else:
+                self._models.pop(stock_code, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "models": len(self._models),
+                    "bytes": sum(size for _, size, _ in self._models.values())}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """프로세스 공용 레지스트리 (앱 컨텍스트 밖에서는 기본 설정)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                from .ml_strategy import MODEL_DIR
+                cfg = current_app.config if has_app_context() else {}
+                _registry = ModelRegistry(
+                    MODEL_DIR,
+                    max_bytes=int(float(cfg.get("ML_MODEL_CACHE_MB", 512)) * 1024 * 1024),
+                    mmap=bool(cfg.get("ML_MODEL_MMAP", False)),
+                )
+    return _registry
@@ -0,0 +1,120 @@
+from datetime import datetime
+import numpy as np
+from .base import BaseStrategy
+from .condition import compile_conditions, compile_reference
+
+WEIGHTINGS = ("equal", "inverse_vol")
+
+
+class PortfolioStrategy(BaseStrategy):
+    """
+    횡단면 포트폴리오 전략 — 전략 하나가 params.universe 의 여러 종목을 한 번에 순위 매겨 상위 top_n 을 보유
+    (stock_code 는 쓰지 않음, runner 가 사이클마다 한 번 rebalance 경로로 실행)
+
+    params 예시:
+      {"universe": ["005930", "000660", ...], "rank_by": "change(60)", "order": "desc",
+       "filter": [{"indicator": "vol_ratio(20)", "operator": ">=", "value": 1}],
+       "top_n": 10, "weighting": "equal", "max_weight": 0.2, "capital": 50000000,
+       "rebalance_days": 5, "rebalance_hhmm": 1500, "rebalance_band_pct": 10}
+    rank_by 는 조건식 참조 하나 (모멘텀 "change(60)", 평균회귀는 "change(5)" + "order": "asc" 등)
+    weighting: equal(동일 비중) | inverse_vol(최근 vol_window 봉 일간 수익률 표준편차의 역수)
+    """
+
+    def universe(self) -> list:
+        return list(dict.fromkeys(str(c) for c in self.params.get("universe", [])))
+
+    def check(self, max_universe: int = None) -> None:
+        """저장 전 검사 (잘못된 파라미터면 ValueError)"""
+        codes = self.universe()
+        if not codes:
+            raise ValueError("universe is required")
+        if max_universe and len(codes) > max_universe:
+            raise ValueError(f"universe has more than {max_universe} stocks")
+        compile_reference(self.params.get("rank_by", "change(60)"))
+        compile_conditions(self.params.get("filter", []))
+        if self.top_n <= 0:
+            raise ValueError("top_n must be positive")
+        if self.params.get("weighting", "equal") not in WEIGHTINGS:
+            raise ValueError(f"weighting must be one of {', '.join(WEIGHTINGS)}")
+        if self.capital <= 0:
+            raise ValueError("capital must be positive")
+
+    @property
+    def top_n(self) -> int:
+        return int(self.params.get("top_n", 10))
+
+    @property
+    def capital(self) -> float:
+        return float(self.params.get("capital", 0))
+
+    def rebalance_due(self, now: datetime, last_rebalanced: datetime = None) -> bool:
+        """rebalance_hhmm 이후이고 마지막 리밸런싱(주문 유무와 무관)으로부터 rebalance_days 일이 지났으면 True"""
+        if now.hour * 100 + now.minute < int(self.params.get("rebalance_hhmm", 1500)):
+            return False
+        if last_rebalanced is None:
+            return True
+        return (now.date() - last_rebalanced.date()).days >= int(self.params.get("rebalance_days", 1))
+
+    def target_weights(self, codes: list, ind, current: dict, last: np.ndarray) -> tuple:
+        """(봉 × 종목) 지표 입력에서 목표 비중 → ({code: 비중}, {code: 순위 점수})
+
+        ind·current·last 는 BarMatrix.with_quotes 결과 (열 순서 = codes).
+        """
+        rank = compile_reference(self.params.get("rank_by", "change(60)"))
+        with np.errstate(invalid="ignore"):
+            passed = compile_conditions(self.params.get("filter", [])).latest_many(ind, last, current)
+            scores = rank.latest_many(ind, last, current)
+        eligible = passed & np.isfinite(scores) & (current["price"] > 0)
+        picks = np.flatnonzero(eligible)
+        descending = self.params.get("order", "desc") != "asc"
+        picks = picks[np.argsort(-scores[picks] if descending else scores[picks], kind="stable")][:self.top_n]
+        if not len(picks):
+            return {}, {}
+
+        if self.params.get("weighting", "equal") == "inverse_vol":
+            raw = 1.0 / self._volatility(ind, last, picks)
+            raw[~np.isfinite(raw)] = 0.0
+        else:
+            raw = np.ones(len(picks))
+        total = raw.sum()
+        weights = raw / total if total > 0 else raw
+        weights = np.minimum(weights, float(self.params.get("max_weight", 1.0)))  # 넘는 몫은 현금으로
+        return ({codes[j]: float(w) for j, w in zip(picks, weights) if w > 0},
+                {codes[j]: float(scores[j]) for j in picks})
+
+    def _volatility(self, ind, last: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        window = int(self.params.get("vol_window", 20))
+        returns = ind.pct_change(1)
+        rows = last[cols][None, :] - np.arange(window)[:, None]
+        values = np.where(rows >= 0, returns[np.maximum(rows, 0), cols[None, :]], np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.nanstd(values, axis=0)
+
+    def rebalance_orders(self, weights: dict, prices: dict, holdings: dict) -> list:
+        """목표 비중 ↔ 보유 수량 차이 → 주문 목록 [{"stock_code", "side", "quantity", "price"}] (매도 먼저)
+
+        holdings 는 이 전략이 주문으로 쌓은 유니버스 안 보유 수량 {code: qty} (수동·다른 전략 보유분 제외).
+        목표에서 빠진 종목은 그 수량을 전량 매도하고,
+        계속 보유하는 종목은 차이 금액이 목표 금액의 rebalance_band_pct % 미만이면 건드리지 않는다.
+        """
+        band = float(self.params.get("rebalance_band_pct", 10)) / 100
+        orders = []
+        for code in list(holdings) + [c for c in weights if c not in holdings]:
+            price = prices.get(code, 0)
+            held = int(holdings.get(code, 0))
+            if price <= 0:
+                continue
+            target_value = self.capital * weights.get(code, 0.0)
+            target = int(target_value // price)
+            diff = target - held
+            if not diff or (target and held and abs(diff) * price < band * target_value):
+                continue
+            orders.append({"stock_code": code, "side": "buy" if diff > 0 else "sell",
+                           "quantity": abs(diff), "price": price})
+        return sorted(orders, key=lambda o: o["side"] != "sell")
+
+    def should_buy(self, ohlcv: list, current: dict) -> bool:
+        return False  # 종목별 판단 없음 — rebalance_orders 로만 주문
+
+    def should_sell(self, ohlcv: list, current: dict) -> bool:
+        return False
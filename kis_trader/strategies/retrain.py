@@ -0,0 +1,180 @@
+"""
+ML 재학습 파이프라인
+- 일봉 동기화/로드는 스레드 풀(배치 레인)에서 동시에, 학습은 프로세스 풀(spawn)에서 코어별로 병렬
+- 조회가 끝난 종목부터 바로 학습 프로세스로 넘김 → 조회와 학습이 겹쳐 진행
+- 학습 특성은 특성 저장소(feature_store)에서 읽음 — 조회 스레드가 새 봉만 이어 붙임
+- 학습 데이터 지문(models/<code>.meta.json, 특성 정의 버전 포함)이 같으면 건너뜀
+- ML_RETRAIN_WARM_START 면 기존 모델에 트리만 추가 (train_model 참조)
+- 종목별 조회/학습 시간은 로그와 last_report() (/api/settings/ml-retrain) 로 공개
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+_last_report: dict = {}
+_run_lock = threading.Lock()
+
+
+def _meta_path(model_dir: str, stock_code: str) -> str:
+    return os.path.join(model_dir, f"{stock_code}.meta.json")
+
+
+def _fingerprint(ohlcv: list, versions: dict = None) -> str:
+    return hashlib.sha1(json.dumps([ohlcv, versions], sort_keys=True).encode()).hexdigest()
+
+
+def _unchanged(model_dir: str, stock_code: str, fingerprint: str) -> bool:
+    if not os.path.exists(os.path.join(model_dir, f"{stock_code}.joblib")):
+        return False
+    try:
+        with open(_meta_path(model_dir, stock_code)) as f:
+            return json.load(f).get("data_hash") == fingerprint
+    except (OSError, ValueError):
+        return False
+
+
+def _write_meta(model_dir: str, stock_code: str, meta: dict) -> None:
+    path = _meta_path(model_dir, stock_code)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, path)
+
+
+def _fit(stock_code: str, ohlcv: list, features, warm_start: bool, add_trees: int, max_trees: int) -> dict:
+    """학습 프로세스에서 실행 → train_model 결과 + 학습 시간"""
+    from strategies.ml_strategy import train_model
+    start = time.perf_counter()
+    info = train_model(stock_code, ohlcv, warm_start=warm_start,
+                       add_trees=add_trees, max_trees=max_trees, features=features)
+    return {**(info or {}), "fit_ms": round((time.perf_counter() - start) * 1000, 1),
+            "trained": info is not None}
+
+
+def _load(app, stock_code: str, mode: str, count: int) -> tuple:
+    """일봉·특성 동기화 후 학습 구간 로드 → (ohlcv, 특성 행렬 또는 None, 조회 시간 ms)"""
+    from bar_store import load_bars, sync_bars
+    from db import db
+    from .feature_store import get_store
+    from .ml_strategy import FEATURES
+    start = time.perf_counter()
+    with app.app_context():
+        try:
+            sync_bars(stock_code, mode)
+        except Exception:
+            db.session.rollback()
+            raise
+        ohlcv = load_bars(stock_code, count=count)
+        store = get_store()
+        store.sync(stock_code)
+        dates, X = store.matrix(stock_code, FEATURES, count=len(ohlcv))
+    if list(dates) != [r["date"] for r in reversed(ohlcv)]:
+        X = None  # 저장소와 봉이 어긋나면 train_model 이 ohlcv 로 계산
+    return ohlcv, X, round((time.perf_counter() - start) * 1000, 1)
+
+
+def retrain_all(app) -> dict:
+    """활성 ML 전략 종목 전체 재학습 → 리포트 (이미 실행 중이면 건너뜀)"""
+    global _last_report
+    if not _run_lock.acquire(blocking=False):
+        logger.warning("ML retrain already running, skipped")
+        return _last_report
+    try:
+        report = _retrain_all(app)
+        _last_report = report
+        return report
+    finally:
+        _run_lock.release()
+
+
+def _retrain_all(app) -> dict:
+    from kis_api import lane
+    from models import Strategy
+    from .feature_store import feature_versions
+    from .ml_strategy import FEATURES, MODEL_DIR
+    from .model_registry import get_registry
+
+    cfg = app.config
+    count = int(cfg.get("ML_TRAIN_BARS", 120))
+    warm_start = bool(cfg.get("ML_RETRAIN_WARM_START", False))
+    add_trees = int(cfg.get("ML_WARM_START_TREES", 20))
+    max_trees = int(cfg.get("ML_MAX_TREES", 300))
+    with app.app_context():
+        targets = {s.stock_code: s.mode
+                   for s in Strategy.query.filter_by(strategy_type="ml", is_active=True).all()}
+
+    started = time.perf_counter()
+    results = {code: {"stock_code": code, "status": "pending"} for code in targets}
+    fetchers = ThreadPoolExecutor(max_workers=int(cfg.get("ML_RETRAIN_FETCH_CONCURRENCY", 4)),
+                                  thread_name_prefix="ml-fetch")
+    # 스케줄러·웹서버 스레드가 도는 프로세스라 fork 대신 spawn
+    fitters = ProcessPoolExecutor(max_workers=int(cfg.get("ML_RETRAIN_WORKERS") or os.cpu_count() or 1),
+                                  mp_context=multiprocessing.get_context("spawn"))
+    try:
+        with lane("batch"):
+            loads = {fetchers.submit(contextvars.copy_context().run, _load, app, code, mode, count): code
+                     for code, mode in targets.items()}
+        fits = {}
+        for fut in as_completed(loads):
+            code = loads[fut]
+            try:
+                ohlcv, features, results[code]["fetch_ms"] = fut.result()
+            except Exception as e:
+                results[code].update(status="error", error=f"fetch: {e}")
+                continue
+            fingerprint = _fingerprint(ohlcv, feature_versions(FEATURES))
+            if _unchanged(MODEL_DIR, code, fingerprint):
+                results[code]["status"] = "skipped"
+                continue
+            results[code]["data_hash"] = fingerprint
+            results[code]["last_date"] = ohlcv[0]["date"] if ohlcv else None
+            fits[fitters.submit(_fit, code, ohlcv, features, warm_start, add_trees, max_trees)] = code
+
+        for fut in as_completed(fits):
+            code = fits[fut]
+            r = results[code]
+            try:
+                info = fut.result()
+            except Exception as e:
+                r.update(status="error", error=f"fit: {e}")
+                continue
+            if not info.pop("trained"):
+                r.update(status="too_few_bars", fit_ms=info["fit_ms"])
+                continue
+            r.update(status="trained", **info)
+            _write_meta(MODEL_DIR, code, {
+                "data_hash": r.pop("data_hash"), "last_date": r["last_date"], "rows": info["rows"],
+                "n_estimators": info["n_estimators"], "trained_at": datetime.now().isoformat(),
+            })
+            get_registry().invalidate(code)
+            logger.info(f"ML retrained {code}: fetch {r.get('fetch_ms')}ms, fit {info['fit_ms']}ms, "
+                        f"{info['n_estimators']} trees{' (warm)' if info['warm'] else ''}")
+    finally:
+        fetchers.shutdown()
+        fitters.shutdown()
+
+    stocks = sorted(results.values(), key=lambda r: r["stock_code"])
+    for r in stocks:
+        r.pop("data_hash", None)
+        if r["status"] == "error":
+            logger.error(f"ML retrain error {r['stock_code']}: {r['error']}")
+    summary = {s: sum(1 for r in stocks if r["status"] == s)
+               for s in ("trained", "skipped", "too_few_bars", "error")}
+    report = {"finished_at": datetime.now().isoformat(),
+              "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+              "warm_start": warm_start, **summary, "stocks": stocks}
+    logger.info(f"ML retrain done in {report['elapsed_ms']:.0f}ms: {summary}")
+    return report
+
+
+def last_report() -> dict:
+    return _last_report
@@ -1,36 +1,44 @@
-import pandas as pd
-import ta
+import numpy as np
 from .base import BaseStrategy
+from .indicators import IndicatorSet, Macd, Rsi
 
 class RsiMacdStrategy(BaseStrategy):
     """RSI 과매도/과매수 + MACD 시그널 전략"""
 
-    def _calc(self, ohlcv: list) -> pd.DataFrame:
-        df = pd.DataFrame(ohlcv).sort_values("date")
-        if len(df) < 30:
-            return df
+    def _calc(self, ohlcv: list) -> dict:
+        """최신 봉의 rsi/macd/macd_signal (봉이 30개 미만이면 None)"""
+        if len(ohlcv) < 30:
+            return None
         rsi_p = int(self.params.get("rsi_period", 14))
         macd_f = int(self.params.get("macd_fast", 12))
         macd_s = int(self.params.get("macd_slow", 26))
         macd_sig = int(self.params.get("macd_signal", 9))
-        df["rsi"] = ta.momentum.RSIIndicator(df["close"], rsi_p).rsi()
-        macd = ta.trend.MACD(df["close"], macd_f, macd_s, macd_sig)
-        df["macd"] = macd.macd()
-        df["macd_signal"] = macd.macd_signal()
-        return df
+        v = self._stream("rsi_macd", lambda: {
+            "rsi": Rsi(rsi_p), "macd": Macd(macd_f, macd_s, macd_sig),
+        }).update(ohlcv)
+        macd, signal, _ = v["macd"][1]
+        return {"rsi": v["rsi"][1], "macd": macd, "macd_signal": signal}
 
     def should_buy(self, ohlcv: list, current: dict) -> bool:
-        df = self._calc(ohlcv)
-        if len(df) < 2 or "rsi" not in df.columns:
+        last = self._calc(ohlcv)
+        if last is None:
             return False
-        last = df.iloc[-1]
         oversold = float(self.params.get("rsi_oversold", 30))
-        return (last["rsi"] < oversold and last["macd"] > last["macd_signal"])
+        return last["rsi"] < oversold and last["macd"] > last["macd_signal"]
 
     def should_sell(self, ohlcv: list, current: dict) -> bool:
-        df = self._calc(ohlcv)
-        if len(df) < 2 or "rsi" not in df.columns:
+        last = self._calc(ohlcv)
+        if last is None:
             return False
-        last = df.iloc[-1]
         overbought = float(self.params.get("rsi_overbought", 70))
-        return (last["rsi"] > overbought and last["macd"] < last["macd_signal"])
+        return last["rsi"] > overbought and last["macd"] < last["macd_signal"]
+
+    def signals(self, ind: IndicatorSet) -> tuple:
+        rsi = ind.rsi(int(self.params.get("rsi_period", 14)))
+        macd, signal, _ = ind.macd(int(self.params.get("macd_fast", 12)),
+                                   int(self.params.get("macd_slow", 26)),
+                                   int(self.params.get("macd_signal", 9)))
+        enough = (np.arange(len(rsi)) >= 29).reshape((-1,) + (1,) * (rsi.ndim - 1))  # 봉 30개부터
+        buy = enough & (rsi < float(self.params.get("rsi_oversold", 30))) & (macd > signal)
+        sell = enough & (rsi > float(self.params.get("rsi_overbought", 70))) & (macd < signal)
+        return buy, sell
@@ -1,13 +1,29 @@
-"""전략 실행기: DB 전략 조회 → 지표 계산 → 주문 실행"""
+"""전략 실행기: DB 전략 조회 → 지표 계산 → 주문 실행
+
+(종목, 모드) 그룹마다 현재가·일봉을 한 번만 읽고, 그룹들은 제한된 스레드 풀에서 병렬 평가한다.
+포트폴리오 전략은 종목 그룹에 넣지 않고 전략마다 유니버스 전체를 한 번에 평가해 리밸런싱한다.
+"""
+import contextvars
 import logging
-from datetime import datetime
+import threading
+import time
+import numpy as np
+import metrics
+import profiling
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.sqlite import insert
 from db import db
-from models import Strategy, Order
-from kis_api import get_current_price, get_daily_ohlcv, get_balance, place_order
+from models import Strategy, Order, PortfolioRebalance
+from kis_api import MULTI_PRICE_MAX, get_current_price, get_multi_price, get_positions, lane, place_order
+from bar_store import load_bars, load_matrix, sync_bars, synced_codes
+from market_calendar import is_trading_day
 from .ma_strategy import MAStrategy
 from .rsi_macd import RsiMacdStrategy
 from .condition import ConditionStrategy
 from .ml_strategy import MLStrategy
+from .portfolio import PortfolioStrategy
 
 logger = logging.getLogger(__name__)
 
@@ -16,12 +32,25 @@ STRATEGY_MAP = {
     "rsi_macd":  RsiMacdStrategy,
     "condition": ConditionStrategy,
     "ml":        MLStrategy,
+    "portfolio": PortfolioStrategy,
 }
+# 종목 하나에 묶이지 않는 전략 (시세 그룹·실시간 구독·동시호가 알림 대상 아님)
+PORTFOLIO_TYPES = ("portfolio",)
+
+_CYCLE_SECONDS = metrics.histogram("strategy_cycle_seconds", "Full run_strategies cycle duration")
+_FETCH_SECONDS = metrics.histogram(
+    "strategy_fetch_seconds", "Quote and bar loading per stock group or portfolio", ("source",))
+_EVAL_SECONDS = metrics.histogram(
+    "strategy_eval_seconds", "Signal evaluation per strategy (orders excluded)", ("type",))
+_ORDER_SECONDS = metrics.histogram(
+    "strategy_order_seconds", "Order placement and recording per order", ("type", "side"))
+_RUNS = metrics.counter(
+    "strategy_evaluations_total", "Strategy evaluations by outcome", ("strategy", "type", "result"))
 
 
 def is_market_hours() -> bool:
     now = datetime.now()
-    if now.weekday() >= 5:
+    if not is_trading_day(now.date()):
         return False
     t = now.hour * 100 + now.minute
     return 900 <= t <= 1530
@@ -29,66 +58,331 @@ def is_market_hours() -> bool:
 
 def is_auction_time() -> bool:
     now = datetime.now()
-    if now.weekday() >= 5:
+    if not is_trading_day(now.date()):
         return False
     t = now.hour * 100 + now.minute
     return (800 <= t < 900) or (1520 <= t <= 1530)
 
 
 def run_strategies(app):
+    """활성 전략을 (종목, 모드) 그룹으로 묶어 그룹마다 시세를 한 번만 받고 그룹끼리 병렬 평가"""
+    with app.app_context():
+        if not is_market_hours() or is_auction_time():
+            return
+        groups, portfolios = active_groups()
+    run_cycle(app, groups, portfolios)
+
+
+def active_groups() -> tuple:
+    """활성 전략 → ({(종목, 모드): [전략 id]}, [포트폴리오 전략 id]) (앱 컨텍스트 필요)"""
+    groups: dict = {}
+    portfolios = []
+    for strat in Strategy.query.filter_by(is_active=True).all():
+        if strat.strategy_type in PORTFOLIO_TYPES:
+            portfolios.append(strat.id)
+        else:
+            groups.setdefault((strat.stock_code, strat.mode), []).append(strat.id)
+    return groups, portfolios
+
+
+def run_cycle(app, groups: dict, portfolios: list) -> list:
+    """주어진 종목 그룹·포트폴리오를 스레드 풀에서 한 번 평가 → 구간별 시간 목록"""
+    if not groups and not portfolios:
+        return []
+
+    start = time.perf_counter()
+    ex = _get_executor(app)
+    futures = {}
+    for (code, mode), ids in groups.items():
+        fut = ex.submit(contextvars.copy_context().run, _run_group, app, code, mode, ids, None, True)
+        futures[fut] = (code, mode)
+    for sid in portfolios:
+        futures[ex.submit(contextvars.copy_context().run, _run_portfolio, app, sid)] = (f"portfolio#{sid}", "")
+    timings = []
+    for fut in as_completed(futures):
+        try:
+            timing = fut.result()
+            if timing:
+                timings.append(timing)
+        except Exception as e:
+            code, mode = futures[fut]
+            logger.error(f"Strategy group {code}/{mode} error: {e}")
+    elapsed = time.perf_counter() - start
+    _CYCLE_SECONDS.observe(elapsed)
+    slowest = ", ".join(f"{t['stock_code']}/{t['mode']} {t['total_ms']:.0f}ms"
+                        for t in sorted(timings, key=lambda t: -t["total_ms"])[:5])
+    logger.info(f"Strategy cycle: {len(groups)} groups, "
+                f"{sum(len(ids) for ids in groups.values())} strategies, "
+                f"{elapsed * 1000:.0f}ms (slowest: {slowest})")
+    return timings
+
+
+def run_strategies_for(app, stock_code: str, mode: str, current: dict):
+    """실시간 시세 수신 시 해당 종목 전략만 즉시 평가
+
+    주문이 아직 잔고에 반영되지 않았을 수 있으므로 최근 주문이 있는 전략은 건너뛴다.
+    """
     with app.app_context():
         if not is_market_hours() or is_auction_time():
             return
-        strategies = Strategy.query.filter_by(is_active=True).all()
-        balance_cache = {}
-        for strat in strategies:
+        cooldown = int(app.config.get("REALTIME_ORDER_COOLDOWN_SECONDS", 60))
+        since = datetime.utcnow() - timedelta(seconds=cooldown)
+        strategies = Strategy.query.filter_by(is_active=True, stock_code=stock_code, mode=mode).all()
+        ids = [s.id for s in strategies
+               if not Order.query.filter_by(strategy_id=s.id).filter(Order.created_at >= since).first()]
+    if ids:
+        _run_group(app, stock_code, mode, ids, current)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(app) -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(app.config.get("RUNNER_CONCURRENCY", 4)),
+                    thread_name_prefix="strategy",
+                )
+    return _executor
+
+
+# 같은 종목을 분 주기 실행과 실시간 평가가 동시에 다루지 않도록 직렬화
+_stock_locks: dict = {}
+_stock_locks_guard = threading.Lock()
+# 주문 기록(SQLite 쓰기)은 그룹 스레드 간 직렬화
+_record_lock = threading.Lock()
+
+
+def _stock_lock(stock_code: str, mode: str) -> threading.Lock:
+    with _stock_locks_guard:
+        return _stock_locks.setdefault((mode, stock_code), threading.Lock())
+
+
+def _run_group(app, stock_code: str, mode: str, strategy_ids: list,
+               current: dict = None, sync: bool = False) -> dict:
+    """한 종목·모드의 전략들을 같은 시세·일봉으로 평가 (스레드마다 자체 앱 컨텍스트) → 구간별 시간"""
+    t0 = time.perf_counter()
+    with app.app_context(), _stock_lock(stock_code, mode), profiling.span(f"group {stock_code}/{mode}"):
+        if sync:
             try:
-                _execute_strategy(strat, balance_cache)
+                with profiling.span("sync_bars"):
+                    sync_bars(stock_code, mode)  # 종목별 하루 한두 번만 실제 호출
             except Exception as e:
+                db.session.rollback()
+                logger.error(f"Bar sync error {stock_code}: {e}")
+        if current is None:
+            current = get_current_price(stock_code, mode)
+        ohlcv = load_bars(stock_code, count=100, current=current)
+        t1 = time.perf_counter()
+        _FETCH_SECONDS.observe(t1 - t0, "cycle" if sync else "realtime")
+        for strat in Strategy.query.filter(Strategy.id.in_(strategy_ids)).all():
+            try:
+                with profiling.span(f"strategy {strat.id}", type=strat.strategy_type):
+                    _evaluate_and_order(strat, current, ohlcv)
+                _RUNS.inc(strat.id, strat.strategy_type, "ok")
+            except Exception as e:
+                db.session.rollback()
+                _RUNS.inc(strat.id, strat.strategy_type, "error")
                 logger.error(f"Strategy {strat.id} error: {e}")
+        t2 = time.perf_counter()
+    timing = {
+        "stock_code": stock_code, "mode": mode, "strategies": len(strategy_ids),
+        "fetch_ms": (t1 - t0) * 1000, "eval_ms": (t2 - t1) * 1000, "total_ms": (t2 - t0) * 1000,
+    }
+    logger.debug(f"Strategy group {stock_code}/{mode}: {len(strategy_ids)} strategies, "
+                 f"fetch {timing['fetch_ms']:.0f}ms, eval {timing['eval_ms']:.0f}ms")
+    return timing
 
 
-def _execute_strategy(strat: Strategy, balance_cache: dict):
+def _evaluate_and_order(strat: Strategy, current: dict, ohlcv: list):
     cls = STRATEGY_MAP.get(strat.strategy_type)
     if cls is None:
         return
-
+    start = time.perf_counter()
     engine = cls(strat.stock_code, strat.params or {})
-    ohlcv = get_daily_ohlcv(strat.stock_code, strat.mode, count=100)
-    current = get_current_price(strat.stock_code, strat.mode)
     price = current["price"]
 
-    cache_key = strat.mode
-    if cache_key not in balance_cache:
-        balance_cache[cache_key] = {r["stock_code"]: r for r in get_balance(strat.mode)}
-    holding = balance_cache[cache_key].get(strat.stock_code)
+    holding = get_positions(strat.mode).get(strat.stock_code)
 
+    order = None
     if holding:
         avg_p = holding["avg_price"]
-        if engine.check_stop_loss(avg_p, price) or engine.check_take_profit(avg_p, price):
-            _place_and_record(strat, "sell", price, holding["quantity"])
-            return
+        if engine.check_stop_loss(avg_p, price) or engine.check_take_profit(avg_p, price) \
+                or engine.should_sell(ohlcv, current):
+            order = ("sell", holding["quantity"])
+    elif engine.should_buy(ohlcv, current):
+        order = ("buy", engine.get_quantity())
+    _EVAL_SECONDS.observe(time.perf_counter() - start, strat.strategy_type)
+
+    if order:
+        _place_and_record(strat, order[0], price, order[1])
+
+
+def _place_and_record(strat: Strategy, order_type: str, price: float, qty: int, stock_code: str = None):
+    stock_code = stock_code or strat.stock_code
+    start = time.perf_counter()
+    with profiling.span(f"order {order_type} {stock_code}"):
+        result = place_order(stock_code, order_type, int(price), qty, strat.mode)
+        order = Order(
+            strategy_id=strat.id,
+            stock_code=stock_code,
+            order_type=order_type,
+            price=price,
+            quantity=qty,
+            status="submitted" if result["success"] else "pending",
+            trigger="auto",
+            mode=strat.mode,
+            kis_order_no=result.get("order_no", ""),
+        )
+        with _record_lock:
+            db.session.add(order)
+            db.session.commit()
+    _ORDER_SECONDS.observe(time.perf_counter() - start, strat.strategy_type, order_type)
+
+
+def _last_rebalanced(strategy_id: int):
+    state = db.session.get(PortfolioRebalance, strategy_id)
+    return state.rebalanced_at if state else None
+
+
+def _mark_rebalanced(strategy_id: int, orders: int) -> None:
+    """주문이 없었어도 평가를 마친 시각을 남김 → 다음 리밸런싱 주기까지 다시 평가하지 않음"""
+    now = datetime.now()
+    with _record_lock:
+        db.session.execute(
+            insert(PortfolioRebalance).values(strategy_id=strategy_id, rebalanced_at=now, orders=orders)
+            .on_conflict_do_update(index_elements=["strategy_id"], set_={"rebalanced_at": now, "orders": orders})
+        )
+        db.session.commit()
+
+
+def _strategy_holdings(strategy_id: int, positions: dict) -> dict:
+    """전략 자신의 접수된 주문으로 쌓은 종목별 순매수 수량 {code: qty} (계좌 보유 수량을 넘지 않게 자름)
+
+    수동 주문이나 다른 전략이 산 수량은 들어가지 않으므로 리밸런싱이 그 몫을 팔지 않는다.
+    지금 유니버스에 없는 종목도 포함 — 유니버스에서 빠진 보유 종목도 리밸런싱에서 매도되도록.
+    """
+    signed = case((Order.order_type == "buy", Order.quantity), else_=-Order.quantity)
+    rows = db.session.execute(
+        select(Order.stock_code, func.sum(signed))
+        .where(Order.strategy_id == strategy_id, Order.status.in_(("submitted", "filled")))
+        .group_by(Order.stock_code)
+    ).all()
+    holdings = {}
+    for code, qty in rows:
+        qty = min(int(qty or 0), int(positions.get(code, {}).get("quantity", 0)))
+        if qty > 0:
+            holdings[code] = qty
+    return holdings
 
-    if holding and engine.should_sell(ohlcv, current):
-        _place_and_record(strat, "sell", price, holding["quantity"])
-        return
 
-    if not holding and engine.should_buy(ohlcv, current):
-        _place_and_record(strat, "buy", price, engine.get_quantity())
-
-
-def _place_and_record(strat: Strategy, order_type: str, price: float, qty: int):
-    result = place_order(strat.stock_code, order_type, int(price), qty, strat.mode)
-    order = Order(
-        strategy_id=strat.id,
-        stock_code=strat.stock_code,
-        order_type=order_type,
-        price=price,
-        quantity=qty,
-        status="submitted" if result["success"] else "pending",
-        trigger="auto",
-        mode=strat.mode,
-        kis_order_no=result.get("order_no", ""),
-    )
-    db.session.add(order)
-    db.session.commit()
+def sync_portfolio_bars(app) -> dict:
+    """활성 포트폴리오 유니버스 일봉을 배치 레인에서 채움 (스케줄러 작업 — 최초 적재와 매일 증분)
+
+    리밸런싱은 일봉을 네트워크로 받지 않고, 여기서 적재가 끝난 종목만 순위에 넣는다.
+    """
+    start = time.perf_counter()
+    with app.app_context():
+        targets = {}
+        for strat in Strategy.query.filter(Strategy.is_active.is_(True),
+                                           Strategy.strategy_type.in_(PORTFOLIO_TYPES)).all():
+            for code in PortfolioStrategy(strat.stock_code, strat.params or {}).universe():
+                targets.setdefault(code, strat.mode)
+        added = errors = 0
+        with lane("batch"):
+            for code, mode in targets.items():
+                try:
+                    added += sync_bars(code, mode)
+                except Exception as e:
+                    db.session.rollback()
+                    errors += 1
+                    logger.error(f"Bar sync error {code}: {e}")
+    report = {"stocks": len(targets), "bars": added, "errors": errors,
+              "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)}
+    if targets:
+        logger.info(f"Portfolio bar sync: {report}")
+    return report
+
+
+def _multi_quotes(codes: list, mode: str) -> dict:
+    quotes = {}
+    for i in range(0, len(codes), MULTI_PRICE_MAX):
+        quotes.update(get_multi_price(codes[i:i + MULTI_PRICE_MAX], mode))
+    return quotes
+
+
+def _run_portfolio(app, strategy_id: int) -> dict:
+    """포트폴리오 전략 하나: 리밸런싱 시점이면 유니버스를 한 번에 순위 매겨 목표 비중 차이만큼 주문 → 구간별 시간
+
+    일봉은 sync_portfolio_bars 작업이 미리 채워 두고 여기서는 적재가 끝난 종목만 순위에 넣는다(첫 적재 전 종목은 제외).
+    보유 수량은 이 전략이 낸 주문 기준이고, 순위에 들지 못한 보유 종목(유니버스에서 빠졌거나 일봉이 없는 종목 포함)은
+    매도 대상. 현재가는 순위 종목과 보유 종목을 함께 멀티종목 시세로 30종목씩 받는다.
+    """
+    with app.app_context():
+        try:
+            return _rebalance(app, strategy_id)
+        except Exception as e:
+            db.session.rollback()
+            _RUNS.inc(strategy_id, "portfolio", "error")
+            logger.error(f"Portfolio {strategy_id} error: {e}")
+            return None
+
+
+def _rebalance(app, strategy_id: int) -> dict:
+    from backtest import BarMatrix
+    t0 = time.perf_counter()
+    with profiling.span(f"portfolio {strategy_id}"):
+        strat = db.session.get(Strategy, strategy_id)
+        if strat is None or not strat.is_active:
+            return None  # 사이클 시작 후 삭제·비활성화됨
+        engine = PortfolioStrategy(strat.stock_code, strat.params or {})
+        mode = strat.mode
+        now = datetime.now()
+        if not engine.rebalance_due(now, _last_rebalanced(strat.id)):
+            return None
+        universe = engine.universe()
+        ready = synced_codes(universe)
+        codes = [code for code in universe if code in ready]
+        if len(codes) < len(universe):
+            logger.info(f"Portfolio {strategy_id}: {len(universe) - len(codes)} stocks not backfilled yet, "
+                        f"left out of this rebalance")
+        if not codes:
+            return None
+        holdings = _strategy_holdings(strat.id, get_positions(strat.mode))
+        quotes = _multi_quotes(codes + [code for code in holdings if code not in codes], strat.mode)
+        start = now - timedelta(days=int(app.config.get("PORTFOLIO_HISTORY_DAYS", 400)))
+        dates, fields, mask = load_matrix(codes, start=start.strftime("%Y%m%d"))
+        matrix = BarMatrix.from_fields(dates, codes, fields, mask)
+        t1 = time.perf_counter()
+        _FETCH_SECONDS.observe(t1 - t0, "portfolio")
+
+        cols = np.array([j for j, code in enumerate(codes) if quotes.get(code, {}).get("price")], dtype=np.int64)
+        quoted = [codes[j] for j in cols]
+        snap = {f: np.array([quotes[code][f] for code in quoted], dtype=np.float64)
+                for f in ("price", "change_rate", "volume", "open", "high", "low")}
+        ind, current, last = matrix.with_quotes(cols, snap, now)
+        weights, scores = engine.target_weights(quoted, ind, current, last) if len(cols) else ({}, {})
+        prices = {code: q["price"] for code, q in quotes.items() if q.get("price")}
+        orders = engine.rebalance_orders(weights, prices, holdings)
+        t2 = time.perf_counter()
+        _EVAL_SECONDS.observe(t2 - t1, strat.strategy_type)
+        for o in orders:
+            try:
+                _place_and_record(strat, o["side"], o["price"], o["quantity"], o["stock_code"])
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Portfolio {strat.id} order {o['stock_code']} error: {e}")
+        if len(cols):
+            _mark_rebalanced(strat.id, len(orders))
+        t3 = time.perf_counter()
+    _RUNS.inc(strategy_id, "portfolio", "ok")
+    logger.info(f"Portfolio {strategy_id}: {len(codes)} stocks, {len(weights)} targets, {len(orders)} orders "
+                f"(fetch {(t1 - t0) * 1000:.0f}ms, rank {(t2 - t1) * 1000:.0f}ms)")
+    return {
+        "stock_code": f"portfolio#{strategy_id}", "mode": mode, "strategies": 1,
+        "fetch_ms": (t1 - t0) * 1000, "eval_ms": (t2 - t1) * 1000, "total_ms": (t3 - t0) * 1000,
+    }
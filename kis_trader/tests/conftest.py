@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 앱 모듈은 kis_trader/ 에서 평면 import (python run.py 와 같은 경로)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
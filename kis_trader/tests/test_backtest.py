@@ -0,0 +1,79 @@
+"""벡터화 시뮬레이터 — 고정 봉에서 체결가·현금·수수료/세금·MDD 를 손으로 계산한 값과 비교"""
+import numpy as np
+import pytest
+
+from backtest import BarMatrix, simulate
+
+COSTS = {"initial_cash": 10_000.0, "commission": 0.001, "slippage": 0.01, "sell_tax": 0.002}
+# 종가 100 이하에서 10주 매수, 손절 -5% / 익절 +10% 로만 청산
+SPEC = {"type": "condition", "stocks": ["A"],
+        "params": {"conditions": [{"indicator": "price", "operator": "<=", "value": 100}], "action": "buy",
+                   "buy_qty": 10, "stop_loss_pct": -5, "take_profit_pct": 10}}
+
+
+def _matrix(closes: list) -> BarMatrix:
+    """종목 A 하나의 일봉 (None 은 거래정지로 빠진 날)"""
+    mask = np.array([[c is not None] for c in closes])
+    close = np.array([[c or 0] for c in closes], dtype=np.int64)
+    fields = {f: close.copy() for f in ("open", "high", "low", "close")}
+    fields["volume"] = np.where(mask, 1000, 0).astype(np.int64)
+    dates = np.array([f"202601{d:02d}" for d in range(5, 5 + len(closes))])
+    return BarMatrix.from_fields(dates, ["A"], fields, mask)
+
+
+def test_fills_costs_and_drawdown():
+    result = simulate(_matrix([100, 105, 112, 100, 94, 100]), [SPEC], **COSTS)
+
+    buy_cost = 101 * 10 * 1.001               # 종가 + 슬리피지 1%, 수수료 0.1%
+    take = 110.88 * 10 * (1 - 0.001 - 0.002)  # 112 × 0.99, 수수료 + 거래세
+    stop = 93.06 * 10 * (1 - 0.001 - 0.002)   # 94 × 0.99 (101 대비 -6.9% → 손절)
+    cash = np.cumsum([-buy_cost, 0, take, -buy_cost, stop, -buy_cost])
+    held = np.array([10, 10, 0, 10, 0, 10])
+    closes = np.array([100, 105, 112, 100, 94, 100])
+    equity = 10_000 + cash + held * closes
+
+    assert [e["equity"] for e in result["equity"]] == [round(v) for v in equity]
+    trades = [(t["date"][-2:], t["side"], t["price"], t["quantity"], t.get("pnl"), t.get("reason"))
+              for t in result["trade_list"]]
+    assert trades == [
+        ("05", "buy", 101.0, 10, None, None),
+        ("07", "sell", 110.88, 10, round(take - buy_cost), "take_profit"),
+        ("08", "buy", 101.0, 10, None, None),
+        ("09", "sell", 93.06, 10, round(stop - buy_cost), "stop_loss"),
+        ("10", "buy", 101.0, 10, None, None),
+    ]
+    assert result["final_equity"] == round(equity[-1])
+    assert result["total_return_pct"] == round((equity[-1] / 10_000 - 1) * 100, 2)
+    assert result["mdd_pct"] == round((equity[-1] / equity[2] - 1) * 100, 2)
+    assert result["trades"] == 2 and result["win_rate_pct"] == 50.0
+    assert result["open_positions"] == 1
+    assert result["strategies"][0]["pnl_by_stock"] == {"A": round(equity[-1] - 10_000)}
+
+
+def test_missing_bar_holds_position_at_last_close():
+    """거래정지 날은 신호·청산 없이 직전 종가로 평가하고, 다음 봉 종가에서만 체결"""
+    result = simulate(_matrix([100, None, 120]), [SPEC], **COSTS)
+
+    buy_cost = 101 * 10 * 1.001
+    take = 118.8 * 10 * (1 - 0.001 - 0.002)
+    assert [e["equity"] for e in result["equity"]] == [
+        round(10_000 - buy_cost + 1000), round(10_000 - buy_cost + 1000), round(10_000 - buy_cost + take)]
+    assert [(t["date"][-2:], t["side"]) for t in result["trade_list"]] == [("05", "buy"), ("07", "sell")]
+
+
+def test_signal_uses_only_bars_up_to_its_own():
+    """미래 봉을 바꿔도 그 이전 봉의 신호·체결은 그대로 (look-ahead 없음)"""
+    spec = {**SPEC, "params": {**SPEC["params"],
+                               "conditions": [{"indicator": "price", "operator": "<", "value": "ma(3)"}]}}
+    base = [100, 104, 108, 103, 99, 110, 90]
+    head = simulate(_matrix(base[:5]), [spec], **COSTS)
+    full = simulate(_matrix(base), [spec], **COSTS)
+    assert full["trade_list"][:len(head["trade_list"])] == head["trade_list"]
+    assert full["equity"][:5] == head["equity"]
+
+
+@pytest.mark.parametrize("max_trades, expected", [(None, 5), (2, 2), (0, 0)])
+def test_max_trades_keeps_latest(max_trades, expected):
+    result = simulate(_matrix([100, 105, 112, 100, 94, 100]), [SPEC], **COSTS, max_trades=max_trades)
+    assert len(result["trade_list"]) == expected
+    assert result["trades"] == 2  # 요약은 전체 기준
@@ -0,0 +1,118 @@
+"""compile_conditions 가 예전 dict 목록 조건식과 같은 판정을 내는지, 새 문법이 배치 계산과 맞는지"""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategies.condition import ConditionStrategy, compile_conditions
+from strategies.indicators import FIELDS, IndicatorSet
+
+_LEGACY_OPS = {
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b,
+    ">=": lambda a, b: a >= b,
+    "<=": lambda a, b: a <= b,
+    "==": lambda a, b: a == b,
+}
+
+
+def _legacy(conditions: list, current: dict) -> bool:
+    """컴파일 도입 전 ConditionStrategy._evaluate — 현재가 dict 필드만 보고 모두 AND"""
+    for cond in conditions:
+        fn = _LEGACY_OPS.get(cond.get("operator", ">"))
+        actual = float(current.get(cond.get("indicator", ""), 0))
+        if fn is None or not fn(actual, float(cond.get("value", 0))):
+            return False
+    return True
+
+
+def _bars(n: int, seed: int) -> list:
+    rng = random.Random(seed)
+    price, rows = 5000, []
+    for i in range(n):
+        price = max(100, price + rng.randint(-30, 30) * 10)
+        rows.append({"date": f"{20200101 + i}", "open": price, "high": price + 50, "low": price - 50,
+                     "close": price, "volume": rng.randint(1000, 10 ** 6)})
+    return list(reversed(rows))  # load_bars 와 같은 최신순
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_legacy_conditions_match(seed):
+    rng = random.Random(seed)
+    ohlcv = _bars(50, seed)
+    for _ in range(15):
+        conditions = [{"indicator": rng.choice(["change_rate", "price", "volume", "high", "low", "open", "foo"]),
+                       "operator": rng.choice(list(_LEGACY_OPS)),
+                       "value": rng.choice([0, 1.5, -1, 5000, 10 ** 5])}
+                      for _ in range(rng.randint(0, 3))]
+        current = {"price": ohlcv[0]["close"], "change_rate": round(rng.uniform(-5, 5), 2),
+                   "volume": 123456, "high": 1, "low": 2, "open": 3}
+        strategy = ConditionStrategy("000001", {"conditions": conditions, "action": "both"})
+        expected = _legacy(conditions, current)
+        assert strategy.should_buy(ohlcv, current) == expected, conditions
+        assert strategy.should_sell(ohlcv, current) == expected, conditions
+        assert strategy.should_buy([], current) == expected, conditions  # 저장된 일봉이 없을 때
+
+
+def test_action_gates_side():
+    current = {"price": 1000, "change_rate": 5.0}
+    conditions = [{"indicator": "change_rate", "operator": ">", "value": 3}]
+    buy_only = ConditionStrategy("000001", {"conditions": conditions, "action": "buy"})
+    assert buy_only.should_buy([], current) and not buy_only.should_sell([], current)
+
+
+def test_cross_and_groups_match_pandas():
+    ohlcv = _bars(300, 7)
+    df = pd.DataFrame(ohlcv).sort_values("date")
+    ind = IndicatorSet(ohlcv)
+
+    ma5, ma20 = df.close.rolling(5).mean().values, df.close.rolling(20).mean().values
+    cross = np.zeros(len(df), dtype=bool)
+    cross[1:] = (ma5[:-1] <= ma20[:-1]) & (ma5[1:] > ma20[1:])
+    compiled = compile_conditions([{"indicator": "ma(5)", "operator": "cross_above", "value": "ma(20)"}])
+    assert np.array_equal(compiled.evaluate(ind), cross)
+
+    ema10 = df.close.ewm(span=10, adjust=False, min_periods=10).mean().values
+    vol_ratio = (df.volume / df.volume.rolling(20).mean()).values
+    compiled = compile_conditions({"any": [
+        {"indicator": "ma(5)", "operator": ">", "value": "ma(20)"},
+        {"all": [{"indicator": "vol_ratio(20)", "operator": ">=", "value": 1.5},
+                 {"not": {"indicator": "price", "operator": "<", "value": "ema(10)"}}]},
+    ]})
+    with np.errstate(invalid="ignore"):
+        expected = (ma5 > ma20) | ((vol_ratio >= 1.5) & ~(df.close.values < ema10))
+    assert np.array_equal(compiled.evaluate(ind), expected)
+
+
+def test_matrix_columns_match_single_stock():
+    """봉 × 종목 배열로 한 번에 평가한 열이 종목 하나씩 평가한 결과와 같음"""
+    compiled = compile_conditions([{"indicator": "rsi(14)", "operator": "<", "value": 45},
+                                   {"indicator": "change", "operator": ">", "value": 0}])
+    sets = [_bars(200, s) for s in range(5)]
+    arrays = {f: np.column_stack([[r[f] for r in reversed(b)] for b in sets]) for f in FIELDS}
+    matrix = compiled.evaluate(IndicatorSet.from_arrays(None, **arrays))
+    for j, bars in enumerate(sets):
+        assert np.array_equal(matrix[:, j], compiled.evaluate(IndicatorSet(bars)))
+
+
+@pytest.mark.parametrize("conditions, expected", [
+    ({"indicator": "3", "operator": ">", "value": 1}, True),
+    ([{"indicator": "3", "operator": "<", "value": 1}], False),
+    ({"not": {"indicator": "2", "operator": "==", "value": 2}}, False),
+])
+def test_constant_conditions_broadcast(conditions, expected):
+    ohlcv = _bars(30, 1)
+    compiled = compile_conditions(conditions)
+    assert np.array_equal(compiled.evaluate(IndicatorSet(ohlcv)), np.full(30, expected))
+    assert compiled.latest(IndicatorSet(ohlcv)) is expected
+    assert compiled.latest(IndicatorSet([])) is False
+
+
+@pytest.mark.parametrize("conditions", [
+    [{"indicator": "ma(x)"}], [{"indicator": "zz(3)"}],
+    [{"indicator": "price", "operator": "!="}], {"all": 3},
+])
+def test_invalid_conditions_raise(conditions):
+    with pytest.raises(ValueError):
+        compile_conditions(conditions)
@@ -0,0 +1,54 @@
+"""IndicatorStream(증분) 과 IndicatorSet(배치) 이 같은 봉에서 같은 값을 내는지"""
+import random
+
+import numpy as np
+import pytest
+
+from strategies.indicators import IndicatorSet, IndicatorStream, Macd, PctChange, Rsi, Sma, VolumeRatio
+
+
+def _nodes():
+    return {"sma5": Sma(5), "sma20": Sma(20), "rsi14": Rsi(14), "rsi3": Rsi(3),
+            "macd": Macd(12, 26, 9), "vol_ratio": VolumeRatio(20), "ret1": PctChange(1), "ret5": PctChange(5)}
+
+
+def _batch(rows: list) -> dict:
+    ind = IndicatorSet(rows)
+    return {"sma5": ind.sma(5), "sma20": ind.sma(20), "rsi14": ind.rsi(14), "rsi3": ind.rsi(3),
+            "macd": np.column_stack(ind.macd(12, 26, 9)), "vol_ratio": ind.volume_ratio(20),
+            "ret1": ind.pct_change(1), "ret5": ind.pct_change(5)}
+
+
+def _history(seed: int, n: int = 120) -> list:
+    rng = random.Random(seed)
+    price, rows = rng.randint(100, 5000) * 10, []
+    for i in range(n):
+        price = max(10, price + rng.randint(-5, 5) * 10)
+        rows.append({"date": f"{20200000 + i}", "open": price, "high": price, "low": price, "close": price,
+                     "volume": rng.choice([0, rng.randint(0, 10 ** 6)])})
+    return rows
+
+
+def _same(a, b) -> bool:
+    return np.array_equal(np.asarray(a, float), np.asarray(b, float), equal_nan=True)
+
+
+@pytest.mark.parametrize("seed,window", [(0, 1000), (1, 1000), (2, 60), (3, 60)])
+def test_stream_matches_batch(seed, window):
+    """장중 틱마다 당일 봉이 바뀌고 하루씩 봉이 완결돼도 (창이 밀려 재구성돼도) 마지막 두 값이 배치와 같음"""
+    rng = random.Random(seed)
+    hist = _history(seed)
+    stream = IndicatorStream(_nodes)
+    for day in range(1, len(hist)):
+        done = hist[max(0, day - window + 1):day]
+        for tick in range(3):
+            close = max(10, hist[day]["close"] + rng.randint(-3, 3) * 10)
+            rows = done + [{**hist[day], "close": close, "volume": hist[day]["volume"] + tick}]
+            got = stream.update(list(reversed(rows)))  # load_bars 와 같은 최신순
+            ref = _batch(rows)
+            for name, (prev, cur) in got.items():
+                assert _same(cur, ref[name][-1]), (day, tick, name)
+                if len(rows) >= 2:
+                    assert _same(prev, ref[name][-2]), (day, tick, name)
+    # 창이 밀리지 않으면 처음 한 번만 쌓고 이후는 증분, 밀리면 그때마다 재구성
+    assert stream.rebuilds == 1 if window >= len(hist) else stream.rebuilds > 1
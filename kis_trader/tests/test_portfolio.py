@@ -0,0 +1,89 @@
+"""포트폴리오 리밸런싱 주문 계산과 전략 자신의 보유 수량 집계"""
+from datetime import datetime
+
+import pytest
+
+from strategies.portfolio import PortfolioStrategy
+
+
+def _engine(**params) -> PortfolioStrategy:
+    return PortfolioStrategy("", {"universe": ["A", "B", "C"], "capital": 1_000_000, **params})
+
+
+def test_sells_dropped_then_buys_new_target():
+    orders = _engine().rebalance_orders({"B": 0.5}, {"B": 1000, "C": 500}, {"C": 10})
+    assert orders == [
+        {"stock_code": "C", "side": "sell", "quantity": 10, "price": 500},
+        {"stock_code": "B", "side": "buy", "quantity": 500, "price": 1000},
+    ]
+
+
+def test_band_skips_small_adjustments():
+    engine = _engine(rebalance_band_pct=10)
+    prices = {"A": 1000}
+    assert engine.rebalance_orders({"A": 0.5}, prices, {"A": 480}) == []   # 2만 원 차이 < 목표 50만 원의 10%
+    assert engine.rebalance_orders({"A": 0.5}, prices, {"A": 400}) == [
+        {"stock_code": "A", "side": "buy", "quantity": 100, "price": 1000}]
+    assert engine.rebalance_orders({"A": 0.3}, prices, {"A": 500}) == [
+        {"stock_code": "A", "side": "sell", "quantity": 200, "price": 1000}]
+
+
+def test_missing_price_and_untouched_codes():
+    orders = _engine().rebalance_orders({"A": 0.5, "B": 0.5}, {"A": 0, "B": 2000}, {"A": 10})
+    assert orders == [{"stock_code": "B", "side": "buy", "quantity": 250, "price": 2000}]
+    assert _engine().rebalance_orders({}, {"A": 1000}, {}) == []
+
+
+@pytest.mark.parametrize("last, hhmm, expected", [
+    (None, 1500, True),
+    (None, 1459, False),
+    (datetime(2026, 3, 2, 15, 0), 1500, False),   # 같은 날 이미 리밸런싱 (주문이 없었어도)
+    (datetime(2026, 3, 1, 15, 0), 1500, True),
+])
+def test_rebalance_due(last, hhmm, expected):
+    now = datetime(2026, 3, 2, hhmm // 100, hhmm % 100)
+    assert _engine(rebalance_hhmm=1500, rebalance_days=1).rebalance_due(now, last) is expected
+
+
+@pytest.fixture
+def app(tmp_path):
+    from app import create_app
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 't.db'}",
+                      "QUOTE_CACHE_PATH": str(tmp_path / "c.db")})
+    with app.app_context():
+        yield app
+
+
+def test_holdings_count_only_own_orders(app):
+    from db import db
+    from models import Order, Strategy
+    from strategies.runner import _strategy_holdings
+
+    mine, other = Strategy(name="p", stock_code="", strategy_type="portfolio"), \
+        Strategy(name="m", stock_code="A", strategy_type="ma")
+    db.session.add_all([mine, other])
+    db.session.flush()
+    for sid, code, side, qty, status in [
+        (mine.id, "A", "buy", 30, "submitted"), (mine.id, "A", "sell", 10, "submitted"),
+        (mine.id, "B", "buy", 50, "pending"),    # 접수 실패
+        (mine.id, "C", "buy", 40, "submitted"),  # 계좌에는 25주만 남음
+        (other.id, "A", "buy", 100, "submitted"), (None, "D", "buy", 7, "submitted"),
+    ]:
+        db.session.add(Order(strategy_id=sid, stock_code=code, order_type=side, quantity=qty, status=status))
+    db.session.commit()
+
+    positions = {code: {"quantity": q} for code, q in {"A": 120, "B": 50, "C": 25, "D": 7}.items()}
+    assert _strategy_holdings(mine.id, positions) == {"A": 20, "C": 25}
+
+
+def test_missing_or_inactive_strategy_is_skipped(app):
+    from db import db
+    from models import Strategy
+    from strategies.runner import _run_portfolio
+
+    strat = Strategy(name="p", stock_code="", strategy_type="portfolio", is_active=False,
+                     params={"universe": ["A"], "capital": 1000})
+    db.session.add(strat)
+    db.session.commit()
+    assert _run_portfolio(app, strat.id) is None
+    assert _run_portfolio(app, strat.id + 1) is None
@@ -0,0 +1,72 @@
+"""워커 공유 토큰 버킷(SharedBucket) — 여러 연결·프로세스 합계가 한도를 넘지 않는지, 레인 우선순위"""
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from kis_api import RateLimiter, SharedBucket
+
+
+def test_connections_share_one_bucket(tmp_path):
+    path = str(tmp_path / "c.db")
+    a = SharedBucket(path, "kis:paper", rate=0.001, capacity=5)
+    b = SharedBucket(path, "kis:paper", rate=0.001, capacity=5)
+    granted = [bucket.take() == 0 for _ in range(5) for bucket in (a, b)]
+    assert sum(granted) == 5
+    assert a.take() > 0 and b.take() > 0
+    assert SharedBucket(path, "kis:real", rate=0.001, capacity=5).take() == 0  # 키(모드)마다 따로
+
+
+def _burst(path: str, rate: float, capacity: int, calls: int, queue) -> None:
+    limiter = RateLimiter(rate, capacity, SharedBucket(path, "kis:paper", rate, capacity))
+    stamps = []
+    for _ in range(calls):
+        limiter.acquire("strategy")
+        stamps.append(time.time())
+    queue.put(stamps)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="fork only")
+def test_processes_stay_within_rate(tmp_path):
+    rate, capacity, calls = 20.0, 5, 15
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=_burst, args=(str(tmp_path / "c.db"), rate, capacity, calls, queue))
+             for _ in range(2)]
+    for p in procs:
+        p.start()
+    stamps = sorted(queue.get(timeout=30) + queue.get(timeout=30))
+    for p in procs:
+        p.join(timeout=10)
+
+    assert len(stamps) == 2 * calls
+    assert stamps[-1] - stamps[0] >= (len(stamps) - capacity) / rate * 0.9
+    window = 0.5
+    for i, start in enumerate(stamps):
+        in_window = sum(1 for t in stamps[i:] if t - start <= window)
+        assert in_window <= capacity + rate * window + 1
+
+
+def test_higher_lane_goes_first(tmp_path):
+    limiter = RateLimiter(10, 1, SharedBucket(str(tmp_path / "c.db"), "kis:paper", 10, 1))
+    limiter.acquire("batch")  # 버킷을 비워 둠
+    finished, lock = [], threading.Lock()
+
+    def call(name):
+        limiter.acquire(name)
+        with lock:
+            finished.append(name)
+
+    batch = [threading.Thread(target=call, args=("batch",)) for _ in range(3)]
+    for t in batch:
+        t.start()
+    time.sleep(0.03)
+    order = threading.Thread(target=call, args=("order",))
+    order.start()
+    for t in batch + [order]:
+        t.join(timeout=5)
+
+    assert finished[0] == "order"
+    stats = limiter.stats()
+    assert stats["order"]["count"] == 1 and stats["batch"]["count"] == 4
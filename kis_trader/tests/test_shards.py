@@ -0,0 +1,42 @@
+"""일관 해시 링 — 작업 프로세스가 빠지거나 들어와도 그 프로세스 몫의 키만 옮겨 가는지"""
+from collections import Counter
+
+import pytest
+
+from shards import HashRing
+
+WORKERS = [f"host:{pid}" for pid in (101, 202, 303, 404)]
+KEYS = [f"{i:06d}" for i in range(2000)] + [f"portfolio#{i}" for i in range(50)]
+
+
+def _owners(ring: HashRing) -> dict:
+    return {key: ring.owner(key) for key in KEYS}
+
+
+@pytest.mark.parametrize("leaving", WORKERS)
+def test_worker_leaving_moves_only_its_keys(leaving):
+    before = _owners(HashRing(WORKERS))
+    after = _owners(HashRing([w for w in WORKERS if w != leaving]))
+    for key in KEYS:
+        if before[key] == leaving:
+            assert after[key] != leaving
+        else:
+            assert after[key] == before[key], key
+
+
+def test_worker_joining_takes_keys_only_for_itself():
+    before = _owners(HashRing(WORKERS))
+    after = _owners(HashRing(WORKERS + ["host:505"]))
+    moved = [key for key in KEYS if after[key] != before[key]]
+    assert moved and all(after[key] == "host:505" for key in moved)
+
+
+def test_ring_is_order_independent_and_balanced():
+    assert _owners(HashRing(WORKERS)) == _owners(HashRing(list(reversed(WORKERS))))
+    counts = Counter(_owners(HashRing(WORKERS)).values())
+    assert set(counts) == set(WORKERS)
+    assert max(counts.values()) < 2 * len(KEYS) / len(WORKERS)
+
+
+def test_empty_ring_has_no_owner():
+    assert HashRing([]).owner("005930") is None